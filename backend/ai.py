@@ -1,40 +1,285 @@
+import asyncio
+import hashlib
 import logging
 import tempfile
 import os
-from ai_providers import OpenAIProvider
+import re
+import shutil
+import subprocess
+import threading
+import weakref
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from ai_providers import OpenAIProvider, LocalProvider
 from ai_providers.base import BaseProvider
+from ai_providers.cache import CachedProvider, AI_CACHE_ENABLED, file_digest
+from ai_providers.resilience import ResilientProvider
+import metrics
+from concurrency import run_blocking
+from ttl_cache import TTLCache
+from uploads import spool_bytes
 
-# Try to import mutagen for audio duration detection
-try:
-    from mutagen import File as MutagenFile
-    HAS_MUTAGEN = True
-except ImportError:
-    HAS_MUTAGEN = False
 
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.ogg', '.webm')
 
-def get_audio_duration(file_content: bytes, filename: str) -> float:
-    """Get audio duration in seconds using mutagen."""
-    if not HAS_MUTAGEN:
+
+def detect_input_kind(filename: str) -> Optional[str]:
+    """Return "txt" or "audio" for a supported upload filename, None otherwise."""
+    filename = filename.lower()
+    if filename.endswith('.txt'):
+        return "txt"
+    if filename.endswith(AUDIO_EXTENSIONS):
+        return "audio"
+    return None
+
+
+def get_file_duration(path: str) -> float:
+    """Get audio duration in seconds using mutagen, which only reads the headers it needs."""
+    # Imported on first use to keep it out of startup
+    try:
+        from mutagen import File as MutagenFile
+    except ImportError:
         return 0.0
-    
+
     try:
-        suffix = os.path.splitext(filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_file.write(file_content)
-            temp_path = temp_file.name
-        
-        try:
-            audio = MutagenFile(temp_path)
-            if audio and audio.info:
-                return audio.info.length
-        finally:
-            os.unlink(temp_path)
+        audio = MutagenFile(path)
+        if audio and audio.info:
+            return audio.info.length
     except Exception as e:
         logging.warning(f"Could not get audio duration: {e}")
-    
+
     return 0.0
 
 
+def get_audio_duration(file_content: bytes, filename: str) -> float:
+    """Get audio duration in seconds of audio held in memory."""
+    with spool_bytes(file_content, filename) as spooled:
+        return get_file_duration(spooled.path)
+
+# Long recordings are split into overlapping chunks and transcribed concurrently
+AUDIO_CHUNK_SECONDS = float(os.getenv("AUDIO_CHUNK_SECONDS", "600"))
+AUDIO_CHUNK_OVERLAP_SECONDS = float(os.getenv("AUDIO_CHUNK_OVERLAP_SECONDS", "4"))
+# Fast conversational speech; bounds how many words two chunks can share
+SPEECH_MAX_WORDS_PER_SECOND = 4
+OVERLAP_MAX_WORDS = max(3, round(AUDIO_CHUNK_OVERLAP_SECONDS * SPEECH_MAX_WORDS_PER_SECOND))
+# Whisper rejects uploads over 25 MB, so anything close to that is split too
+AUDIO_MAX_UPLOAD_BYTES = int(os.getenv("AUDIO_MAX_UPLOAD_BYTES", str(24 * 1024 * 1024)))
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "4"))
+
+HAS_FFMPEG = shutil.which("ffmpeg") is not None
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+
+def needs_segmentation(file_size: int, duration: float) -> bool:
+    """Whether a recording is long or large enough to be transcribed in chunks."""
+    if not HAS_FFMPEG:
+        return False
+    return duration > AUDIO_CHUNK_SECONDS * 1.2 or file_size > AUDIO_MAX_UPLOAD_BYTES
+
+
+def probe_duration(path: str) -> float:
+    """Duration in seconds according to ffprobe, for formats mutagen can't read."""
+    proc = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        capture_output=True, text=True
+    )
+    try:
+        return float(proc.stdout.strip())
+    except ValueError:
+        return 0.0
+
+
+def detect_silences(path: str, noise_db: int = -30, min_silence: float = 0.5) -> list[tuple[float, float]]:
+    """Return (start, end) pairs of silent stretches found by ffmpeg's silencedetect filter."""
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", path,
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+    silences = []
+    start = None
+    for kind, value in _SILENCE_RE.findall(proc.stderr):
+        if kind == "start":
+            start = max(float(value), 0.0)
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return silences
+
+
+def plan_audio_segments(
+    duration: float,
+    silences: list[tuple[float, float]],
+    chunk_seconds: float = AUDIO_CHUNK_SECONDS,
+    overlap: float = AUDIO_CHUNK_OVERLAP_SECONDS
+) -> list[tuple[float, float]]:
+    """
+    Plan (start, end) offsets covering the recording in roughly chunk_seconds pieces.
+
+    Each cut is moved to the middle of the latest silence in the last 20% of the
+    chunk, so words are rarely split; without one the cut is made at the target.
+    Consecutive chunks overlap by `overlap` seconds so nothing is lost at the cut.
+    """
+    segments = []
+    start = 0.0
+    while duration - start > chunk_seconds * 1.2:
+        target = start + chunk_seconds
+        window_start = target - chunk_seconds * 0.2
+        cut = target
+        for silence_start, silence_end in silences:
+            middle = (silence_start + silence_end) / 2
+            if window_start <= middle <= target:
+                cut = middle
+        segments.append((start, min(cut + overlap / 2, duration)))
+        start = max(cut - overlap / 2, 0.0)
+    segments.append((start, duration))
+    return segments
+
+
+def split_audio(path: str, segments: list[tuple[float, float]], out_dir: str) -> list[str]:
+    """Cut the recording into mono 16 kHz mp3 chunks, small enough for any provider upload limit."""
+    paths = []
+    for index, (start, end) in enumerate(segments):
+        out_path = os.path.join(out_dir, f"chunk_{index:04d}.mp3")
+        subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+             "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", path,
+             "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", "64k", out_path],
+            check=True, capture_output=True
+        )
+        paths.append(out_path)
+    return paths
+
+
+def _normalize_words(text: str) -> list[str]:
+    return [re.sub(r"[^\w']", "", word.lower()) for word in text.split()]
+
+
+def merge_transcripts(texts: list[str], max_overlap_words: int = OVERLAP_MAX_WORDS) -> str:
+    """
+    Join chunk transcripts in order, dropping the words repeated in each overlap.
+
+    The overlap is found by matching the tail of the previous chunk against the
+    head of the next one, ignoring case and punctuation. It can't be longer than
+    AUDIO_CHUNK_OVERLAP_SECONDS of speech, so at most max_overlap_words of the
+    next chunk are ever dropped; without a convincing match the chunk is kept whole.
+    """
+    merged: list[str] = []
+    for text in texts:
+        words = text.split()
+        if not merged:
+            merged.extend(words)
+            continue
+
+        tail = _normalize_words(" ".join(merged[-max_overlap_words:]))
+        head = _normalize_words(" ".join(words[:max_overlap_words]))
+        skip = 0
+
+        # Longest exact suffix/prefix match
+        for size in range(min(len(tail), len(head)), 2, -1):
+            if tail[-size:] == head[:size]:
+                skip = size
+                break
+
+        # Otherwise, chunk boundaries transcribe slightly differently: find where a
+        # short run of the previous tail reappears at the very start of the new head,
+        # allowing for a few garbled words before it
+        if not skip:
+            probe = 3
+            max_lead = max(2, max_overlap_words // 4)
+            for i in range(len(tail) - probe, -1, -1):
+                run = tail[i:i + probe]
+                for j in range(min(max_lead, len(head) - probe) + 1):
+                    if head[j:j + probe] == run and j + len(tail) - i <= max_overlap_words:
+                        skip = j + len(tail) - i
+                        break
+                if skip:
+                    break
+
+        merged.extend(words[skip:])
+    return " ".join(merged)
+
+
+def _prepare_chunks(source_path: str, filename: str, duration: float, work_dir: str) -> list[str]:
+    """Find silences in the recording and cut it into chunk files in work_dir."""
+    if duration <= 0:
+        duration = probe_duration(source_path)
+    if duration <= 0:
+        logging.warning(f"Could not determine duration of {filename}, transcribing it in one request")
+        return [source_path]
+
+    with metrics.stage("split_audio"):
+        segments = plan_audio_segments(duration, detect_silences(source_path))
+        logging.info(f"Transcribing {filename} ({duration:.0f}s) in {len(segments)} chunks")
+        return split_audio(source_path, segments, work_dir)
+
+
+# Optional async callback receiving the current pipeline stage ("transcribing", "generating")
+ProgressCallback = Optional[Callable[[str], Awaitable[None]]]
+
+
+async def _report(progress: ProgressCallback, stage: str) -> None:
+    if progress is not None:
+        await progress(stage)
+
+
+# Providers (and their HTTP clients) are reused across requests for the same key
+PROVIDER_CACHE_ENTRIES = int(os.getenv("PROVIDER_CACHE_ENTRIES", "256"))
+PROVIDER_CACHE_TTL_SECONDS = int(os.getenv("PROVIDER_CACHE_TTL_SECONDS", "1800"))
+
+# Providers dropped from the cache, each with the AI instances still using it;
+# their clients are closed once those are gone (close_retired_providers)
+_retired: list[tuple[BaseProvider, weakref.WeakSet]] = []
+_retired_lock = threading.Lock()
+
+
+def _retire(key: tuple, entry: tuple[BaseProvider, weakref.WeakSet]) -> None:
+    with _retired_lock:
+        _retired.append(entry)
+
+
+_providers = TTLCache(PROVIDER_CACHE_ENTRIES, PROVIDER_CACHE_TTL_SECONDS, on_evict=_retire)
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Stable identifier for an API key that doesn't reveal it."""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def forget_provider(provider_name: str, api_key: str) -> None:
+    """Drop the cached provider for a key, e.g. after the user replaced it."""
+    key = (provider_name, key_fingerprint(api_key))
+    entry = _providers.pop(key)
+    if entry is not None:
+        _retire(key, entry)
+
+
+async def _close(provider: BaseProvider) -> None:
+    try:
+        await provider.aclose()
+    except Exception as e:
+        logging.warning(f"Could not close {type(provider).__name__} client: {e}")
+
+
+async def close_retired_providers() -> None:
+    """Close the clients of providers that left the cache and that no AI instance uses any more."""
+    with _retired_lock:
+        idle = [provider for provider, users in _retired if not users]
+        _retired[:] = [entry for entry in _retired if entry[1]]
+    for provider in idle:
+        await _close(provider)
+
+
+async def close_providers() -> None:
+    """Close every provider's client, cached or retired. Called at shutdown."""
+    with _retired_lock:
+        entries, _retired[:] = list(_retired), []
+    entries.extend(_providers.values())
+    _providers.clear()
+    for provider, _ in entries:
+        await _close(provider)
+
+
 class AI:
     """
     Generic AI wrapper that delegates to provider-specific implementations.
@@ -43,6 +288,8 @@ class AI:
 
     PROVIDERS = {
         "OpenAI": OpenAIProvider,
+        # Offline: local Whisper and an extractive summarizer, no API key
+        "Local": LocalProvider,
         # Future providers:
         # "Anthropic": AnthropicProvider,
         # "Google": GoogleProvider,
@@ -54,35 +301,121 @@ class AI:
         self.provider = self._init_provider()
 
     def _init_provider(self) -> BaseProvider:
-        """Initialize the appropriate AI provider."""
+        """Get the provider for this key, reusing a cached one (and its warm connections) if possible."""
         provider_class = self.PROVIDERS.get(self.provider_name)
         if not provider_class:
             raise ValueError(f"Unsupported provider: {self.provider_name}")
-        return provider_class(api_key=self.api_key)
+        registry_key = (self.provider_name, key_fingerprint(self.api_key))
+        entry = _providers.get(registry_key)
+        if entry is None:
+            provider = provider_class(api_key=self.api_key)
+            if provider_class.REMOTE:
+                # Retries sit inside the cache, so a cache hit never waits on a failing provider
+                provider = ResilientProvider(provider)
+            if AI_CACHE_ENABLED:
+                provider = CachedProvider(provider)
+            entry = (provider, weakref.WeakSet())
+            _providers.set(registry_key, entry)
+        # Keeps the provider's client open for as long as this instance is alive
+        entry[1].add(self)
+        return entry[0]
+
+    def _error_result(self, e: Exception) -> dict:
+        """Failure result for a provider exception, flagged if a retry could succeed."""
+        return {
+            "success": False,
+            "error": self.provider.format_error(e),
+            "retryable": self.provider.is_retryable(e)
+        }
+
+    async def _atranscribe(self, path: str, filename: str, audio_duration: float) -> str:
+        """
+        Transcribe in one request, or in concurrent chunks for long recordings;
+        at most TRANSCRIBE_CONCURRENCY chunks are in flight. Local providers
+        transcribe one file at a time, so splitting would only add ffmpeg passes.
+        """
+        remote = self.PROVIDERS[self.provider_name].REMOTE
+        if not remote or not needs_segmentation(os.path.getsize(path), audio_duration):
+            return await self.provider.atranscribe_audio_file(path, filename)
+
+        # Cache the stitched transcript of the whole file, so a re-submission skips the split too
+        return await self.provider.acached(
+            "transcript", None,
+            lambda: self._atranscribe_chunked(path, filename, audio_duration),
+            digest=await run_blocking(file_digest, path)
+        )
+
+    async def _atranscribe_chunked(self, path: str, filename: str, audio_duration: float) -> str:
+        with tempfile.TemporaryDirectory() as work_dir:
+            chunk_paths = await run_blocking(_prepare_chunks, path, filename, audio_duration, work_dir)
+            semaphore = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+
+            async def transcribe_chunk(chunk_path: str) -> str:
+                async with semaphore:
+                    return await self.provider.atranscribe_audio_file(chunk_path, os.path.basename(chunk_path))
+
+            tasks = [asyncio.create_task(transcribe_chunk(chunk_path)) for chunk_path in chunk_paths]
+            try:
+                texts = await asyncio.gather(*tasks)
+            except BaseException:
+                # One chunk failed (or we were cancelled): stop the others before
+                # their files are deleted, and raise the original error so it can
+                # still be classified as retryable
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        return merge_transcripts(texts)
 
-    def handle_audio_file(self, file_content: bytes, filename: str) -> dict:
+    async def ahandle_audio_file(self, file_content: bytes, filename: str, progress: ProgressCallback = None) -> dict:
         """
         Handle audio file: transcribe, then generate minutes.
+        For callers holding the audio in memory; see ahandle_audio_path.
 
         Args:
             file_content: Raw bytes of the audio file
             filename: Original filename (for extension detection)
+            progress: Called with each pipeline stage as it starts
+
+        Returns:
+            dict with meeting minutes in JSON format
+        """
+        spooled = await run_blocking(spool_bytes, file_content, filename)
+        try:
+            return await self.ahandle_audio_path(spooled.path, filename, progress)
+        finally:
+            await run_blocking(spooled.close)
+
+    async def ahandle_audio_path(self, path: str, filename: str, progress: ProgressCallback = None) -> dict:
+        """
+        Handle an audio file already on disk: transcribe, then generate minutes.
+        The file is streamed to the provider, never loaded into memory whole.
+
+        Args:
+            path: Path of the audio file
+            filename: Original filename (for extension detection)
+            progress: Called with each pipeline stage as it starts
 
         Returns:
             dict with meeting minutes in JSON format
         """
         try:
             # Get audio duration before processing
-            audio_duration = get_audio_duration(file_content, filename)
-            
+            with metrics.stage("probe_duration"):
+                audio_duration = await run_blocking(get_file_duration, path)
+
             # Step 1: Transcribe audio
-            transcript = self.provider.transcribe_audio(file_content, filename)
+            await _report(progress, "transcribing")
+            with metrics.stage("transcribe"):
+                transcript = await self._atranscribe(path, filename, audio_duration)
 
             if not transcript.strip():
                 return {"success": False, "error": "Transcription resulted in empty text"}
 
             # Step 2: Generate minutes from transcript
-            minutes = self.provider.generate_minutes(transcript)
+            await _report(progress, "generating")
+            with metrics.stage("generate_minutes"):
+                minutes = await self.provider.agenerate_minutes(transcript)
 
             return {
                 "success": True,
@@ -94,43 +427,38 @@ class AI:
 
         except Exception as e:
             logging.error(f"Audio processing error: {e}")
-            return {"success": False, "error": self.provider.format_error(e)}
+            return self._error_result(e)
 
-    def handle_txt_file(self, file_content: bytes) -> dict:
+    async def ahandle_txt_file(self, file_content: bytes, progress: ProgressCallback = None) -> dict:
         """
         Handle text file: decode and generate minutes.
 
         Args:
             file_content: Raw bytes of the text file
+            progress: Called with each pipeline stage as it starts
 
         Returns:
             dict with meeting minutes in JSON format
         """
         try:
-            transcript = file_content.decode('utf-8')
-
-            if not transcript.strip():
-                return {"success": False, "error": "File is empty"}
-
-            minutes = self.provider.generate_minutes(transcript)
-
-            return {
-                "success": True,
-                "minutes": minutes,
-                "transcript": transcript,
-                "transcript_length": len(transcript)
-            }
-
+            with metrics.stage("decode_text"):
+                transcript = file_content.decode('utf-8')
         except Exception as e:
             logging.error(f"Text file processing error: {e}")
-            return {"success": False, "error": self.provider.format_error(e)}
+            return self._error_result(e)
 
-    def handle_text(self, transcript: str) -> dict:
+        if not transcript.strip():
+            return {"success": False, "error": "File is empty"}
+
+        return await self.ahandle_text(transcript, progress)
+
+    async def ahandle_text(self, transcript: str, progress: ProgressCallback = None) -> dict:
         """
         Handle raw text input: generate minutes directly.
-        
+
         Args:
             transcript: The transcript text
+            progress: Called with each pipeline stage as it starts
 
         Returns:
             dict with meeting minutes in JSON format
@@ -139,7 +467,9 @@ class AI:
             if not transcript.strip():
                 return {"success": False, "error": "Transcript is empty"}
 
-            minutes = self.provider.generate_minutes(transcript)
+            await _report(progress, "generating")
+            with metrics.stage("generate_minutes"):
+                minutes = await self.provider.agenerate_minutes(transcript)
 
             return {
                 "success": True,
@@ -150,4 +480,75 @@ class AI:
 
         except Exception as e:
             logging.error(f"Text processing error: {e}")
-            return {"success": False, "error": self.provider.format_error(e)}
\ No newline at end of file
+            return self._error_result(e)
+
+    # Streaming variants. Each yields {"event": "stage", "stage": ...} as the pipeline
+    # advances, the provider's "field" / "item" events while minutes are written, and
+    # ends with either {"event": "minutes", "success": True, ...} (the same fields as
+    # the matching ahandle_* result) or {"event": "error", "success": False, ...}.
+
+    async def _astream_minutes(self, transcript: str, **extra) -> AsyncIterator[dict]:
+        yield {"event": "stage", "stage": "generating"}
+        try:
+            # Includes the time the client takes to read the events
+            with metrics.stage("stream_minutes"):
+                async for event in self.provider.astream_minutes(transcript):
+                    if event["event"] == "minutes":
+                        event = {
+                            "event": "minutes",
+                            "success": True,
+                            "minutes": event["minutes"],
+                            "transcript": transcript,
+                            "transcript_length": len(transcript),
+                            **extra
+                        }
+                    yield event
+        except Exception as e:
+            logging.error(f"Minutes streaming error: {e}")
+            yield {"event": "error", **self._error_result(e)}
+
+    async def astream_audio_path(self, path: str, filename: str) -> AsyncIterator[dict]:
+        """Streaming variant of ahandle_audio_path."""
+        try:
+            with metrics.stage("probe_duration"):
+                audio_duration = await run_blocking(get_file_duration, path)
+            yield {"event": "stage", "stage": "transcribing"}
+            with metrics.stage("transcribe"):
+                transcript = await self._atranscribe(path, filename, audio_duration)
+        except Exception as e:
+            logging.error(f"Audio processing error: {e}")
+            yield {"event": "error", **self._error_result(e)}
+            return
+
+        if not transcript.strip():
+            yield {"event": "error", "success": False, "error": "Transcription resulted in empty text"}
+            return
+
+        async for event in self._astream_minutes(transcript, audio_duration=audio_duration):
+            yield event
+
+    async def astream_txt_file(self, file_content: bytes) -> AsyncIterator[dict]:
+        """Streaming variant of ahandle_txt_file."""
+        try:
+            with metrics.stage("decode_text"):
+                transcript = file_content.decode('utf-8')
+        except Exception as e:
+            logging.error(f"Text file processing error: {e}")
+            yield {"event": "error", **self._error_result(e)}
+            return
+
+        if not transcript.strip():
+            yield {"event": "error", "success": False, "error": "File is empty"}
+            return
+
+        async for event in self._astream_minutes(transcript):
+            yield event
+
+    async def astream_text(self, transcript: str) -> AsyncIterator[dict]:
+        """Streaming variant of ahandle_text."""
+        if not transcript.strip():
+            yield {"event": "error", "success": False, "error": "Transcript is empty"}
+            return
+
+        async for event in self._astream_minutes(transcript):
+            yield event
@@ -1,4 +1,5 @@
 from .openai import OpenAIProvider
+from .local import LocalProvider
 from .base import BaseProvider
 
-__all__ = ['OpenAIProvider', 'BaseProvider']
+__all__ = ['OpenAIProvider', 'LocalProvider', 'BaseProvider']
@@ -1,4 +1,11 @@
+import asyncio
+import json
+import os
 from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from concurrency import run_blocking
+from .mapreduce import CHUNK_PROMPT, REDUCE_PROMPT, chunk_transcript, merge_partial_minutes, reduce_prompt_input
+from .streaming import MinutesStreamParser, minutes_events, normalize_minutes
 
 
 class BaseProvider(ABC):
@@ -31,19 +38,147 @@ Given a transcript, create well-structured meeting minutes and return them as a
 
 Return ONLY valid JSON, no markdown formatting or additional text."""
 
+    # Transcripts longer than this are summarized per chunk and then merged
+    CHUNK_TOKENS = int(os.getenv("MINUTES_CHUNK_TOKENS", "12000"))
+    # Number of chunks summarized concurrently
+    MAP_CONCURRENCY = int(os.getenv("MINUTES_MAP_CONCURRENCY", "4"))
+    MINUTES_MAX_TOKENS = 2000
+    REDUCE_MAX_TOKENS = 500
+    # Bump when SYSTEM_PROMPT or the map-reduce prompts change, so cached results are not reused
+    PROMPT_VERSION = "1"
+    CHAT_MODEL = ""
+    TRANSCRIPTION_MODEL = ""
+    # Providers that run on this server (see local.py) work without a user API key
+    REQUIRES_API_KEY = True
+    # Calls go over the network: AI wraps the provider in resilience.ResilientProvider
+    REMOTE = True
+
     def __init__(self, api_key: str):
         self.api_key = api_key
 
+    # Every call is async: the API and the job workers run on an event loop.
+    # Providers whose work blocks (a local model, a sync SDK) run it through
+    # concurrency.run_blocking so the loop stays free.
+
     @abstractmethod
-    def transcribe_audio(self, file_content: bytes, filename: str) -> str:
+    async def atranscribe_audio(self, file_content: bytes, filename: str) -> str:
         """Transcribe audio file to text."""
         pass
 
     @abstractmethod
-    def generate_minutes(self, transcript: str) -> dict:
-        """Generate meeting minutes JSON from transcript."""
+    async def acomplete_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        """Run one chat completion in JSON mode and return the parsed object."""
         pass
 
+    async def astream_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """
+        Stream a JSON-mode completion as text deltas.
+        Providers with a streaming API should override this; the default
+        yields the whole acomplete_json result as a single delta.
+        """
+        yield json.dumps(await self.acomplete_json(system_prompt, user_prompt, max_tokens))
+
+    async def atranscribe_audio_file(self, path: str, filename: str) -> str:
+        """
+        Transcribe an audio file on disk.
+        Providers that can stream an upload from a file should override this;
+        the default reads the file into memory and calls atranscribe_audio.
+        """
+        with open(path, "rb") as f:
+            file_content = await run_blocking(f.read)
+        return await self.atranscribe_audio(file_content, filename)
+
+    async def acached(self, kind: str, data: bytes, compute: Callable[[], Awaitable[Any]], digest: Optional[str] = None) -> Any:
+        """
+        Return a cached result for data if the provider has a cache, else compute it.
+        Callers that already know the sha256 hex digest of the input can pass it instead of data.
+        """
+        return await compute()
+
+    async def aclose(self) -> None:
+        """Release the provider's HTTP connections; it is not used again afterwards."""
+
+    @staticmethod
+    def _minutes_prompt(transcript: str) -> str:
+        return f"Create meeting minutes from this transcript:\n\n{transcript}"
+
+    @staticmethod
+    def _chunk_prompt(chunk: str, index: int, total: int) -> str:
+        return f"Part {index} of {total} of the meeting transcript:\n\n{chunk}"
+
+    async def agenerate_minutes(self, transcript: str) -> dict:
+        """
+        Generate meeting minutes JSON from transcript.
+
+        Transcripts that fit in CHUNK_TOKENS are handled in one completion.
+        Longer ones are split, each chunk is summarized concurrently (map), at
+        most MAP_CONCURRENCY at a time, and the partial minutes are merged with a
+        final title/summary call (reduce).
+        """
+        chunks = chunk_transcript(transcript, self.CHUNK_TOKENS)
+        if len(chunks) == 1:
+            return await self.acomplete_json(self.SYSTEM_PROMPT, self._minutes_prompt(transcript), self.MINUTES_MAX_TOKENS)
+
+        semaphore = asyncio.Semaphore(self.MAP_CONCURRENCY)
+
+        async def summarize_chunk(index: int, chunk: str) -> dict:
+            async with semaphore:
+                return await self.acomplete_json(
+                    CHUNK_PROMPT, self._chunk_prompt(chunk, index, len(chunks)), self.MINUTES_MAX_TOKENS
+                )
+
+        partials = await asyncio.gather(*(
+            summarize_chunk(index, chunk) for index, chunk in enumerate(chunks, start=1)
+        ))
+
+        overview = await self.acomplete_json(REDUCE_PROMPT, reduce_prompt_input(partials), self.REDUCE_MAX_TOKENS)
+        return self._reduce(partials, overview)
+
+    async def astream_minutes(self, transcript: str) -> AsyncIterator[dict]:
+        """
+        Generate meeting minutes, yielding parts of them as soon as they are known.
+
+        Yields "field" and "item" events (see streaming.MinutesStreamParser) while
+        the model writes, then one {"event": "minutes", "minutes": ...} with the
+        complete, normalized object. Transcripts that need map-reduce can only be
+        reported once the merge is done, so their parts all arrive at the end.
+        """
+        if len(chunk_transcript(transcript, self.CHUNK_TOKENS)) > 1:
+            minutes = normalize_minutes(await self.agenerate_minutes(transcript))
+            for event in minutes_events(minutes):
+                yield event
+        else:
+            parser = MinutesStreamParser()
+            async for delta in self.astream_json(self.SYSTEM_PROMPT, self._minutes_prompt(transcript), self.MINUTES_MAX_TOKENS):
+                for event in parser.feed(delta):
+                    yield event
+            minutes = parser.result()
+        yield {"event": "minutes", "minutes": minutes}
+
+    @staticmethod
+    def _reduce(partials: list[dict], overview: dict) -> dict:
+        minutes = merge_partial_minutes(partials)
+        minutes["title"] = overview.get("title") or minutes["title"]
+        minutes["summary"] = overview.get("summary") or minutes["summary"]
+        return minutes
+
+    @staticmethod
+    def is_retryable(e: Exception) -> bool:
+        """Whether an error is transient (rate limit, timeout, connection, 5xx) and worth retrying."""
+        error_str = str(e).lower()
+
+        # Out of quota or bad key won't fix itself on retry
+        if "quota" in error_str or "insufficient" in error_str or "invalid_api_key" in error_str:
+            return False
+
+        status = getattr(e, "status_code", None)
+        if isinstance(status, int):
+            return status == 429 or status >= 500
+
+        return any(marker in error_str for marker in (
+            "429", "rate_limit", "timeout", "timed out", "connection", "502", "503", "504"
+        ))
+
     @staticmethod
     def format_error(e: Exception) -> str:
         """Convert API exceptions to user-friendly error messages."""
@@ -67,3 +202,58 @@ Return ONLY valid JSON, no markdown formatting or additional text."""
         
         # Fallback for unknown errors
         return "An unexpected error occurred. Please try again."
+
+
+class DelegatingProvider(BaseProvider):
+    """
+    Base for wrappers that add behaviour around another provider.
+    Every call is passed through to the wrapped provider unless overridden.
+    """
+
+    def __init__(self, inner: BaseProvider):
+        super().__init__(inner.api_key)
+        self.inner = inner
+        # Keep the wrapped provider's tuning so inherited map-reduce behaves the same
+        self.CHUNK_TOKENS = inner.CHUNK_TOKENS
+        self.MAP_CONCURRENCY = inner.MAP_CONCURRENCY
+        self.MINUTES_MAX_TOKENS = inner.MINUTES_MAX_TOKENS
+        self.REDUCE_MAX_TOKENS = inner.REDUCE_MAX_TOKENS
+        self.PROMPT_VERSION = inner.PROMPT_VERSION
+        self.CHAT_MODEL = inner.CHAT_MODEL
+        self.TRANSCRIPTION_MODEL = inner.TRANSCRIPTION_MODEL
+
+    @property
+    def provider_name(self) -> str:
+        return getattr(self.inner, "provider_name", type(self.inner).__name__)
+
+    async def atranscribe_audio(self, file_content: bytes, filename: str) -> str:
+        return await self.inner.atranscribe_audio(file_content, filename)
+
+    async def atranscribe_audio_file(self, path: str, filename: str) -> str:
+        return await self.inner.atranscribe_audio_file(path, filename)
+
+    async def acomplete_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        return await self.inner.acomplete_json(system_prompt, user_prompt, max_tokens)
+
+    async def astream_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        async for delta in self.inner.astream_json(system_prompt, user_prompt, max_tokens):
+            yield delta
+
+    async def agenerate_minutes(self, transcript: str) -> dict:
+        return await self.inner.agenerate_minutes(transcript)
+
+    async def astream_minutes(self, transcript: str) -> AsyncIterator[dict]:
+        async for event in self.inner.astream_minutes(transcript):
+            yield event
+
+    async def acached(self, kind: str, data: bytes, compute: Callable[[], Awaitable[Any]], digest: Optional[str] = None) -> Any:
+        return await self.inner.acached(kind, data, compute, digest)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def is_retryable(self, e: Exception) -> bool:
+        return self.inner.is_retryable(e)
+
+    def format_error(self, e: Exception) -> str:
+        return self.inner.format_error(e)
@@ -0,0 +1,193 @@
+"""
+Content-addressed cache for provider results.
+
+Results are keyed by a hash of the input bytes together with the provider,
+model, prompt version and the caller's API key fingerprint (so one user's
+submission never answers another's). Lookups go to a process-wide in-memory
+LRU first, then to the "ai_cache" Mongo collection; entries expire after
+AI_CACHE_TTL_SECONDS and the collection is trimmed to AI_CACHE_MAX_ENTRIES.
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from ttl_cache import TTLCache
+from database import Database
+from concurrency import run_blocking
+from metrics import stage
+from .base import BaseProvider, DelegatingProvider
+from .streaming import minutes_events, normalize_minutes
+
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "256"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000"))
+# Trim the persistent tier once every this many writes
+_TRIM_EVERY = 100
+
+_memory = TTLCache(AI_CACHE_MEMORY_ENTRIES, AI_CACHE_TTL_SECONDS)
+_counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "errors": 0}
+_writes = 0
+_collections: dict[str, Any] = {}
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for both tiers."""
+    return {**_counters, "memory_entries": len(_memory)}
+
+
+def _collection(kind: str):
+    """The "ai_cache" collection, sync or async; None if the database is not configured."""
+    if kind not in _collections:
+        try:
+            database = Database("ai_cache")
+            _collections[kind] = database.get_async_collection() if kind == "async" else database.get_collection()
+        except ValueError:
+            _collections[kind] = None
+    return _collections[kind]
+
+
+def ensure_indexes() -> None:
+    """TTL index for expiry and a created_at index for size-based trimming."""
+    collection = _collection("sync")
+    if collection is None:
+        return
+    collection.create_index("expires_at", expireAfterSeconds=0)
+    collection.create_index("created_at")
+
+
+def file_digest(path: str) -> str:
+    """sha256 hex digest of a file, read in chunks; equal to hashing its bytes in memory."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=AI_CACHE_TTL_SECONDS)
+
+
+class CachedProvider(DelegatingProvider):
+    """Wraps a provider so repeated transcriptions and minutes are served from cache."""
+
+    def __init__(self, inner: BaseProvider):
+        super().__init__(inner)
+        self.scope = hashlib.sha256(inner.api_key.encode()).hexdigest()[:16]
+
+    def _key(self, kind: str, data: Optional[bytes], digest: Optional[str] = None) -> str:
+        model = self.TRANSCRIPTION_MODEL if kind == "transcript" else self.CHAT_MODEL
+        digest = digest or hashlib.sha256(data).hexdigest()
+        parts = [kind, self.provider_name, model, self.PROMPT_VERSION, str(self.CHUNK_TOKENS), self.scope, digest]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    # Persistent tier
+
+    async def _aload(self, key: str) -> Optional[Any]:
+        collection = _collection("async")
+        if collection is None:
+            return None
+        try:
+            with stage("ai_cache_read"):
+                entry = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"value": 1})
+            return entry["value"] if entry else None
+        except Exception as e:
+            _counters["errors"] += 1
+            logging.warning(f"AI cache read failed: {e}")
+            return None
+
+    def _entry(self, kind: str, value: Any) -> dict:
+        return {"kind": kind, "value": value, "created_at": datetime.now(timezone.utc), "expires_at": _expiry()}
+
+    async def _astore(self, key: str, kind: str, value: Any) -> None:
+        collection = _collection("async")
+        if collection is None:
+            return
+        try:
+            await collection.replace_one({"_id": key}, self._entry(kind, value), upsert=True)
+            if self._should_trim():
+                cursor = collection.find({}, {"created_at": 1}).sort("created_at", -1).skip(AI_CACHE_MAX_ENTRIES).limit(1)
+                cutoff = await cursor.to_list(1)
+                if cutoff:
+                    await collection.delete_many({"created_at": {"$lte": cutoff[0]["created_at"]}})
+        except Exception as e:
+            _counters["errors"] += 1
+            logging.warning(f"AI cache write failed: {e}")
+
+    @staticmethod
+    def _should_trim() -> bool:
+        global _writes
+        _writes += 1
+        return _writes % _TRIM_EVERY == 0
+
+    # Lookup
+
+    def _from_memory(self, key: str) -> Optional[Any]:
+        value = _memory.get(key)
+        if value is not None:
+            _counters["memory_hits"] += 1
+            return copy.deepcopy(value)
+        return None
+
+    def _remember(self, key: str, value: Any) -> Any:
+        _memory.set(key, copy.deepcopy(value))
+        return value
+
+    async def _alookup(self, key: str) -> Optional[Any]:
+        """Cached value from either tier, or None (counted as a miss)."""
+        value = self._from_memory(key)
+        if value is not None:
+            return value
+
+        value = await self._aload(key)
+        if value is not None:
+            _counters["persistent_hits"] += 1
+            return self._remember(key, value)
+
+        _counters["misses"] += 1
+        return None
+
+    async def acached(self, kind: str, data: Optional[bytes], compute: Callable[[], Awaitable[Any]], digest: Optional[str] = None) -> Any:
+        key = self._key(kind, data, digest)
+        value = await self._alookup(key)
+        if value is not None:
+            return value
+
+        started = time.monotonic()
+        value = await compute()
+        await self._astore(key, kind, value)
+        logging.debug(f"AI cache miss for {kind}, computed in {time.monotonic() - started:.1f}s")
+        return self._remember(key, value)
+
+    # Cached provider calls
+
+    async def atranscribe_audio(self, file_content: bytes, filename: str) -> str:
+        return await self.acached("transcript", file_content, lambda: self.inner.atranscribe_audio(file_content, filename))
+
+    async def atranscribe_audio_file(self, path: str, filename: str) -> str:
+        digest = await run_blocking(file_digest, path)
+        return await self.acached(
+            "transcript", None, lambda: self.inner.atranscribe_audio_file(path, filename), digest=digest
+        )
+
+    async def agenerate_minutes(self, transcript: str) -> dict:
+        return await self.acached("minutes", transcript.encode("utf-8"), lambda: self.inner.agenerate_minutes(transcript))
+
+    async def astream_minutes(self, transcript: str) -> AsyncIterator[dict]:
+        """Replay cached minutes as events, or stream them from the provider and cache the result."""
+        key = self._key("minutes", transcript.encode("utf-8"))
+        minutes = await self._alookup(key)
+        if minutes is not None:
+            minutes = normalize_minutes(minutes)
+            for event in minutes_events(minutes):
+                yield event
+            yield {"event": "minutes", "minutes": minutes}
+            return
+
+        async for event in self.inner.astream_minutes(transcript):
+            if event["event"] == "minutes":
+                await self._astore(key, "minutes", event["minutes"])
+                self._remember(key, event["minutes"])
+            yield event
@@ -0,0 +1,281 @@
+"""
+Offline provider: Whisper running on this machine for transcription, and a
+deterministic extractive summarizer for minutes.
+
+Selected with ai_config.ai_provider = "Local". No API key is needed and nothing
+leaves the server. Audio needs the optional openai-whisper package (and ffmpeg);
+each Whisper model is loaded once per process and shared by all requests.
+The summarizer picks sentences out of the transcript instead of writing new
+ones, so the same transcript always gives the same minutes, which is what
+offline runs and benchmarks of the pipeline need.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from concurrency import run_blocking
+from metrics import provider_call
+from .base import BaseProvider
+
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "base")
+LOCAL_WHISPER_DEVICE = os.getenv("LOCAL_WHISPER_DEVICE", "cpu")
+
+# Whisper takes minutes per file and one model runs one file at a time, so it gets
+# its own thread: queued transcriptions wait here instead of holding threads of the
+# shared blocking pool that every endpoint needs
+_whisper_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
+
+
+async def _run_whisper(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_whisper_executor, func, *args)
+
+SUMMARY_SENTENCES = 3
+MAX_TOPICS = 5
+MAX_LIST_ITEMS = 10
+
+STOPWORDS = frozenset("""
+a about above after again against all already also am an and any are around as at back be because been before
+behind being below better between bit both but by can could did do does doing done down during each else even ever
+every few first for from further get gets going gonna got had has have having he her here hers him his how i i'd
+i'll i'm i've if in into is it it's its itself just know last let let's like lot make many may maybe me more most
+much must my need new next no nor not now of off ok okay on once one only or other our ours out over own pretty
+quick really right said same say see she should so some still such sure take than thank thanks that that's the
+their them then there there's these they they're thing things think this those though through to today too under
+until up us very want was we we'll we're we've well went were what what's when where which while who why will with
+would yeah yep yes you you'll you're your
+""".split())
+
+_SPEAKER = re.compile(r"^\s*([A-Z][\w.'-]*(?: [A-Z][\w.'-]*){0,2})\s*:\s*(.+)$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9'%-]*")
+_MONTH = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.?"
+_DATE = re.compile(
+    rf"\b(?:{_MONTH} \d{{1,2}}(?:st|nd|rd|th)?(?:,? \d{{4}})?|\d{{1,2}}(?:st|nd|rd|th)? (?:of )?{_MONTH}(?:,? \d{{4}})?"
+    r"|\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{2,4})"
+)
+_DUE = re.compile(
+    r"\b(?:by|before|until|on)\s+((?:next |this )?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+    r"|week|month|quarter|sprint)|tomorrow|(?:the )?end of (?:the )?(?:day|week|month|quarter|sprint|q\d))\b"
+    r"|\b(tomorrow|next week|next month)\b",
+    re.IGNORECASE
+)
+_DECISION = re.compile(r"\b(?:decided|agreed|approved|decision|we'll go with|let's go with|final call|signed off)\b", re.IGNORECASE)
+_ACTION = re.compile(
+    r"\b(?:i'll|i will|i can take|let me|we'll|we will|action item|needs? to|is going to|will (?:own|handle|send|share|follow|draft|prepare|set up|schedule|update|review))\b",
+    re.IGNORECASE
+)
+_NEXT_STEP = re.compile(r"\b(?:next steps?|next meeting|follow[ -]up|going forward|circle back|reconvene|sync again)\b", re.IGNORECASE)
+_FIRST_PERSON = re.compile(r"\b(?:i'll|i will|i can|let me|i'm going to)\b", re.IGNORECASE)
+# Prefixes of the prompts built by BaseProvider, stripped before summarizing
+_PROMPT_PREFIX = re.compile(r"^(?:Create meeting minutes from this transcript|Part \d+ of \d+ of the meeting transcript):\n\n")
+
+
+class LocalModelUnavailable(RuntimeError):
+    """Whisper isn't installed, or the configured model couldn't be loaded."""
+
+
+def _words(text: str) -> list[str]:
+    return [word.lower().strip("'-") for word in _WORD.findall(text)]
+
+
+def _content_words(text: str) -> list[str]:
+    return [word for word in _words(text) if len(word) > 2 and word not in STOPWORDS]
+
+
+def _utterances(transcript: str) -> list[tuple[Optional[str], str]]:
+    """(speaker, text) per line; speaker is None for lines without a "Name:" prefix."""
+    utterances = []
+    for line in transcript.splitlines():
+        if not line.strip():
+            continue
+        match = _SPEAKER.match(line)
+        if match:
+            utterances.append((match.group(1), match.group(2).strip()))
+        else:
+            utterances.append((None, line.strip()))
+    return utterances
+
+
+def _sentences(utterances: list[tuple[Optional[str], str]]) -> list[tuple[Optional[str], str]]:
+    return [
+        (speaker, sentence.strip())
+        for speaker, text in utterances
+        for sentence in _SENTENCE_END.split(text)
+        if sentence.strip()
+    ]
+
+
+def _score(sentence: str, frequencies: Counter) -> float:
+    """Average frequency of a sentence's content words; very short or very long sentences score 0."""
+    words = _content_words(sentence)
+    if len(_words(sentence)) < 6 or len(words) > 60 or not words:
+        return 0.0
+    return sum(frequencies[word] for word in words) / len(words)
+
+
+def _top_sentences(sentences: list[str], frequencies: Counter, count: int) -> list[str]:
+    """The best scoring sentences, in transcript order."""
+    ranked = sorted(range(len(sentences)), key=lambda index: (-_score(sentences[index], frequencies), index))
+    return [sentences[index] for index in sorted(ranked[:count]) if _score(sentences[index], frequencies) > 0]
+
+
+def _keywords(text: str, count: int) -> list[str]:
+    return [word for word, _ in sorted(Counter(_content_words(text)).items(), key=lambda item: (-item[1], item[0]))[:count]]
+
+
+def _label(words: list[str], transcript: str) -> str:
+    """Join keywords for a title, each in its usual spelling in the transcript (e.g. "GTM", "Q3")."""
+    spellings = Counter(word.strip("'-") for word in _WORD.findall(transcript))
+    labels = []
+    for word in words:
+        spelling = max((form for form in spellings if form.lower() == word), key=lambda form: (spellings[form], form), default=word)
+        labels.append(spelling if spelling != spelling.lower() else spelling.capitalize())
+    return labels[0] if len(labels) == 1 else ", ".join(labels[:-1]) + " and " + labels[-1]
+
+
+def _matching(sentences: list[tuple[Optional[str], str]], pattern: re.Pattern) -> list[tuple[Optional[str], str]]:
+    seen = set()
+    matches = []
+    for speaker, sentence in sentences:
+        if pattern.search(sentence) and sentence not in seen:
+            seen.add(sentence)
+            matches.append((speaker, sentence))
+    return matches[:MAX_LIST_ITEMS]
+
+
+def _owner(speaker: Optional[str], sentence: str, attendees: list[str]) -> str:
+    for name in attendees:
+        if re.search(rf"\b{re.escape(name)}\b,? (?:will|can|to|is going to)\b", sentence):
+            return name
+    if speaker and _FIRST_PERSON.search(sentence):
+        return speaker
+    return "Unassigned"
+
+
+def summarize_transcript(transcript: str) -> dict:
+    """Minutes in the SYSTEM_PROMPT shape, built only from sentences of the transcript."""
+    transcript = transcript.replace("\u2019", "'")
+    utterances = _utterances(transcript)
+    sentences = _sentences(utterances)
+    texts = [sentence for _, sentence in sentences]
+    frequencies = Counter(_content_words(transcript))
+
+    attendees = list(dict.fromkeys(speaker for speaker, _ in utterances if speaker))
+    date = _DATE.search(transcript)
+
+    # Contiguous stretches of the meeting, one discussion point each
+    topic_count = max(1, min(MAX_TOPICS, len(texts) // 4))
+    size = -(-len(texts) // topic_count) if texts else 0
+    discussion_points = []
+    for start in range(0, len(texts), size or 1):
+        segment = texts[start:start + size]
+        keywords = _keywords(" ".join(segment), 2)
+        details = _top_sentences(segment, frequencies, 2)
+        if keywords and details:
+            discussion_points.append({"topic": _label(keywords, transcript), "details": " ".join(details)})
+
+    action_items = []
+    for speaker, sentence in _matching(sentences, _ACTION):
+        due = _DUE.search(sentence)
+        action_items.append({
+            "task": sentence,
+            "owner": _owner(speaker, sentence, attendees),
+            "due_date": (due.group(1) or due.group(2)) if due else None
+        })
+
+    keywords = _keywords(transcript, 3)
+    return {
+        "title": f"Meeting on {_label(keywords, transcript)}" if keywords else "Meeting Minutes",
+        "date": date.group(0) if date else "Not specified",
+        "attendees": attendees,
+        "summary": " ".join(_top_sentences(texts, frequencies, SUMMARY_SENTENCES)),
+        "discussion_points": discussion_points,
+        "decisions": [sentence for _, sentence in _matching(sentences, _DECISION)],
+        "action_items": action_items,
+        "next_steps": [sentence for _, sentence in _matching(sentences, _NEXT_STEP)]
+    }
+
+
+class LocalProvider(BaseProvider):
+    """Whisper on this machine for transcripts, extractive summaries for minutes; needs no API key."""
+
+    CHAT_MODEL = "extractive-1"
+    TRANSCRIPTION_MODEL = f"whisper-{LOCAL_WHISPER_MODEL}"
+    REQUIRES_API_KEY = False
+    REMOTE = False
+    # The summarizer reads the whole transcript in one pass; never map-reduce
+    CHUNK_TOKENS = sys.maxsize
+
+    # Loaded Whisper models, shared by every LocalProvider in the process.
+    # Each has its own lock: Whisper's decoder isn't safe to run concurrently on one model.
+    _models: dict[str, tuple[object, threading.Lock]] = {}
+    _models_lock = threading.Lock()
+
+    @classmethod
+    def _model(cls) -> tuple[object, threading.Lock]:
+        if LOCAL_WHISPER_MODEL not in cls._models:
+            with cls._models_lock:
+                if LOCAL_WHISPER_MODEL not in cls._models:
+                    try:
+                        import whisper
+                    except ImportError:
+                        raise LocalModelUnavailable(
+                            "Local transcription needs the openai-whisper package installed on the server."
+                        )
+                    try:
+                        model = whisper.load_model(LOCAL_WHISPER_MODEL, device=LOCAL_WHISPER_DEVICE)
+                    except Exception as e:
+                        raise LocalModelUnavailable(f"Could not load the local Whisper model '{LOCAL_WHISPER_MODEL}': {e}")
+                    cls._models[LOCAL_WHISPER_MODEL] = (model, threading.Lock())
+        return cls._models[LOCAL_WHISPER_MODEL]
+
+    # Whisper runs on its own thread, the summarizer in the blocking pool
+
+    def _transcribe_path(self, path: str) -> str:
+        model, lock = self._model()
+        with lock, provider_call("Local", "transcription"):
+            result = model.transcribe(path, fp16=LOCAL_WHISPER_DEVICE != "cpu")
+        return result["text"].strip()
+
+    def _transcribe_bytes(self, file_content: bytes, filename: str) -> str:
+        # Whisper reads audio through ffmpeg, which needs a file
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, "audio" + os.path.splitext(filename)[1].lower())
+            with open(path, "wb") as f:
+                f.write(file_content)
+            return self._transcribe_path(path)
+
+    @staticmethod
+    def _summarize(transcript: str) -> dict:
+        with provider_call("Local", "minutes"):
+            return summarize_transcript(transcript)
+
+    async def atranscribe_audio_file(self, path: str, filename: str) -> str:
+        """Transcribe an audio file on disk with the local Whisper model."""
+        return await _run_whisper(self._transcribe_path, path)
+
+    async def atranscribe_audio(self, file_content: bytes, filename: str) -> str:
+        return await _run_whisper(self._transcribe_bytes, file_content, filename)
+
+    async def acomplete_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        """Summarize the text of any of the minutes prompts; the system prompt only shapes LLM output."""
+        return await run_blocking(self._summarize, _PROMPT_PREFIX.sub("", user_prompt))
+
+    async def agenerate_minutes(self, transcript: str) -> dict:
+        return await run_blocking(self._summarize, transcript)
+
+    @staticmethod
+    def is_retryable(e: Exception) -> bool:
+        return False
+
+    @staticmethod
+    def format_error(e: Exception) -> str:
+        if isinstance(e, LocalModelUnavailable):
+            return str(e)
+        return BaseProvider.format_error(e)
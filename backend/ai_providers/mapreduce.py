@@ -0,0 +1,224 @@
+"""
+Helpers for generating minutes from transcripts larger than one model context.
+
+The transcript is split into token-bounded chunks, each chunk is turned into
+partial minutes (map), and the partials are merged and de-duplicated into one
+SYSTEM_PROMPT-shaped object (reduce). See BaseProvider.agenerate_minutes.
+"""
+
+import functools
+import re
+from typing import Optional
+
+CHARS_PER_TOKEN = 4
+
+CHUNK_PROMPT = """You are an expert at creating professional meeting minutes.
+You are given ONE PART of a longer meeting transcript. Extract what is said in this part only and return a JSON object with the following structure:
+
+{
+    "title": "Subject of this part of the meeting",
+    "date": "Date if mentioned, otherwise 'Not specified'",
+    "attendees": ["People speaking or mentioned as present in this part"],
+    "summary": "1-2 sentence summary of this part",
+    "discussion_points": [
+        {
+            "topic": "Topic name",
+            "details": "Key points discussed"
+        }
+    ],
+    "decisions": ["Decisions made in this part"],
+    "action_items": [
+        {
+            "task": "Description of the action item",
+            "owner": "Person responsible (if mentioned, otherwise 'Unassigned')",
+            "due_date": "Due date if mentioned, otherwise null"
+        }
+    ],
+    "next_steps": ["Next steps or follow-up items mentioned in this part"]
+}
+
+Return ONLY valid JSON, no markdown formatting or additional text."""
+
+REDUCE_PROMPT = """You are an expert at creating professional meeting minutes.
+You are given the titles and summaries of consecutive parts of one meeting, in order.
+Return a JSON object with the following structure:
+
+{
+    "title": "Meeting title/subject (inferred from all parts)",
+    "summary": "Brief 2-3 sentence summary of the whole meeting"
+}
+
+Return ONLY valid JSON, no markdown formatting or additional text."""
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken gives exact counts for OpenAI models; without it we estimate. Loaded on first use."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text (estimated if tiktoken is not installed)."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _split_units(text: str) -> list[str]:
+    """Split into the largest natural units: paragraphs, then lines, then sentences."""
+    for pattern in (r"\n\s*\n", r"\n", r"(?<=[.!?])\s+"):
+        parts = [part for part in re.split(pattern, text) if part.strip()]
+        if len(parts) > 1:
+            return parts
+    return [text]
+
+
+def _split_words(words: list[str], total_tokens: int, max_tokens: int) -> list[str]:
+    """Pieces of at most max_tokens; sized from the average word, then shrunk where words run longer."""
+    step = max(1, len(words) * max_tokens // total_tokens)
+    pieces = []
+    start = 0
+    while start < len(words):
+        size = step
+        while size > 1 and count_tokens(" ".join(words[start:start + size])) > max_tokens:
+            size = max(1, size * 9 // 10)
+        pieces.append(" ".join(words[start:start + size]))
+        start += size
+    return pieces
+
+
+def chunk_transcript(transcript: str, max_tokens: int) -> list[str]:
+    """
+    Split a transcript into pieces of at most max_tokens, breaking at paragraph,
+    line or sentence boundaries where possible and at words otherwise.
+    """
+    if count_tokens(transcript) <= max_tokens:
+        return [transcript]
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    def flush() -> None:
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n".join(current))
+        current, current_tokens = [], 0
+
+    for unit in _split_units(transcript):
+        unit_tokens = count_tokens(unit)
+        if unit_tokens > max_tokens:
+            flush()
+            sub_units = _split_units(unit)
+            if len(sub_units) > 1:
+                chunks.extend(chunk_transcript("\n".join(sub_units), max_tokens))
+            else:
+                chunks.extend(_split_words(unit.split(), unit_tokens, max_tokens))
+            continue
+        if current_tokens + unit_tokens > max_tokens:
+            flush()
+        current.append(unit)
+        current_tokens += unit_tokens
+
+    flush()
+    return chunks
+
+
+def _key(text) -> str:
+    """Normalized form used to spot duplicates across chunks."""
+    return re.sub(r"[^\w]+", " ", str(text or "").lower()).strip()
+
+
+def _unique(values: list) -> list:
+    seen = set()
+    result = []
+    for value in values:
+        key = _key(value)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
+
+
+def _entry(value, field: str) -> Optional[dict]:
+    """A discussion point or action item as a dict; models sometimes write a bare string."""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value.strip():
+        return {field: value}
+    return None
+
+
+def merge_partial_minutes(partials: list[dict]) -> dict:
+    """
+    Merge per-chunk minutes, in transcript order, into one minutes object.
+
+    List fields are concatenated and de-duplicated; discussion points on the same
+    topic are combined. title and summary are taken from the first partial and
+    are expected to be replaced by the reduce call.
+    """
+    merged = {
+        "title": "Meeting Minutes",
+        "date": "Not specified",
+        "attendees": [],
+        "summary": "",
+        "discussion_points": [],
+        "decisions": [],
+        "action_items": [],
+        "next_steps": []
+    }
+    topics: dict[str, dict] = {}
+    action_keys = set()
+
+    for partial in partials:
+        date = partial.get("date")
+        if merged["date"] == "Not specified" and date and date != "Not specified":
+            merged["date"] = date
+
+        merged["attendees"].extend(partial.get("attendees") or [])
+        merged["decisions"].extend(partial.get("decisions") or [])
+        merged["next_steps"].extend(partial.get("next_steps") or [])
+
+        for point in partial.get("discussion_points") or []:
+            point = _entry(point, "topic")
+            if point is None:
+                continue
+            key = _key(point.get("topic"))
+            if key in topics:
+                existing = topics[key]
+                details = point.get("details", "")
+                if details and _key(details) not in _key(existing.get("details", "")):
+                    existing["details"] = f"{existing.get('details', '')} {details}".strip()
+            else:
+                topics[key] = dict(point)
+                merged["discussion_points"].append(topics[key])
+
+        for item in partial.get("action_items") or []:
+            item = _entry(item, "task")
+            if item is None:
+                continue
+            key = _key(item.get("task"))
+            if key and key not in action_keys:
+                action_keys.add(key)
+                merged["action_items"].append(item)
+
+    merged["attendees"] = _unique(merged["attendees"])
+    merged["decisions"] = _unique(merged["decisions"])
+    merged["next_steps"] = _unique(merged["next_steps"])
+    if partials:
+        merged["title"] = partials[0].get("title") or merged["title"]
+        merged["summary"] = " ".join(p.get("summary", "") for p in partials if p.get("summary"))
+    return merged
+
+
+def reduce_prompt_input(partials: list[dict]) -> str:
+    """User message for the reduce call: the title and summary of each part, in order."""
+    return "\n\n".join(
+        f"Part {index}: {partial.get('title', '')}\n{partial.get('summary', '')}"
+        for index, partial in enumerate(partials, start=1)
+    )
@@ -1,53 +1,93 @@
-import tempfile
 import os
 import json
-from openai import OpenAI, AuthenticationError, APIError
+from typing import AsyncIterator
+from metrics import count_tokens, provider_call, stage
 from .base import BaseProvider
+from .resilience import PROVIDER_TIMEOUT_SECONDS, PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS
 
 
 class OpenAIProvider(BaseProvider):
     """OpenAI-specific implementation of the AI provider."""
 
+    CHAT_MODEL = "gpt-4o-mini"
+    TRANSCRIPTION_MODEL = "whisper-1"
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
-        self.client = OpenAI(api_key=self.api_key)
+        # The SDK is large; import it when the first provider is built, not at startup
+        from openai import AsyncOpenAI
+        # ResilientProvider does the retrying and enforces deadlines; the SDK timeout is a backstop
+        self.async_client = AsyncOpenAI(api_key=self.api_key, timeout=PROVIDER_TIMEOUT_SECONDS, max_retries=0)
 
-    def transcribe_audio(self, file_content: bytes, filename: str) -> str:
+    async def atranscribe_audio(self, file_content: bytes, filename: str) -> str:
         """Transcribe audio file using OpenAI Whisper."""
-        suffix = os.path.splitext(filename)[1]
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_file.write(file_content)
-            temp_path = temp_file.name
-
-        try:
-            with open(temp_path, "rb") as audio_file:
-                transcription = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-            return transcription.text
-        finally:
-            os.unlink(temp_path)
-
-    def generate_minutes(self, transcript: str) -> dict:
-        """Generate meeting minutes JSON from transcript using GPT."""
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
+        with provider_call("OpenAI", "transcription"):
+            transcription = await self.async_client.audio.transcriptions.create(
+                model=self.TRANSCRIPTION_MODEL,
+                file=(os.path.basename(filename), file_content),
+                timeout=PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS
+            )
+        return transcription.text
+
+    async def atranscribe_audio_file(self, path: str, filename: str) -> str:
+        """Transcribe an audio file on disk, streaming it to the API instead of reading it into memory."""
+        with open(path, "rb") as audio_file, provider_call("OpenAI", "transcription"):
+            transcription = await self.async_client.audio.transcriptions.create(
+                model=self.TRANSCRIPTION_MODEL,
+                file=(os.path.basename(filename), audio_file),
+                timeout=PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS
+            )
+        return transcription.text
+
+    def _completion_request(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        """Chat completion arguments shared by the plain and streaming calls."""
+        return dict(
+            model=self.CHAT_MODEL,
             messages=[
-                {"role": "system", "content": self.SYSTEM_PROMPT},
-                {"role": "user", "content": f"Create meeting minutes from this transcript:\n\n{transcript}"}
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
             ],
-            max_tokens=2000,
+            max_tokens=max_tokens,
             response_format={"type": "json_object"},
             store=False  # Disable logging in OpenAI
         )
 
-        return json.loads(response.choices[0].message.content)
+    def _parse(self, response) -> dict:
+        if response.usage:
+            count_tokens("OpenAI", self.CHAT_MODEL, response.usage.prompt_tokens, response.usage.completion_tokens)
+        with stage("json_parse"):
+            return json.loads(response.choices[0].message.content)
+
+    async def acomplete_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        """Run one GPT completion in JSON mode."""
+        with provider_call("OpenAI", "chat"):
+            response = await self.async_client.chat.completions.create(**self._completion_request(system_prompt, user_prompt, max_tokens))
+        return self._parse(response)
+
+    async def astream_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """Stream a GPT completion in JSON mode, yielding content deltas as they arrive."""
+        with provider_call("OpenAI", "chat_stream"):
+            stream = await self.async_client.chat.completions.create(
+                **self._completion_request(system_prompt, user_prompt, max_tokens),
+                stream=True,
+                # The last chunk then carries the token counts
+                stream_options={"include_usage": True}
+            )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.usage:
+                        count_tokens("OpenAI", self.CHAT_MODEL, chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+
+    async def aclose(self) -> None:
+        """Close the SDK client and its connection pool."""
+        await self.async_client.close()
 
     @staticmethod
     def format_error(e: Exception) -> str:
         """Convert OpenAI API exceptions to user-friendly error messages."""
+        from openai import AuthenticationError, APIError
         error_str = str(e)
 
         # Handle OpenAI-specific authentication errors
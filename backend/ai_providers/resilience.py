@@ -0,0 +1,279 @@
+"""
+Retries, deadlines and a circuit breaker around provider calls.
+
+ResilientProvider wraps a network provider so that every transcription and
+completion call:
+
+- gets a deadline (PROVIDER_TIMEOUT_SECONDS, PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS),
+- is retried up to PROVIDER_MAX_RETRIES times on retryable errors, after a
+  jittered exponential backoff or the provider's Retry-After, whichever is longer,
+- fails fast with ProviderUnavailable while that provider's circuit is open.
+
+A circuit opens after CIRCUIT_FAILURE_THRESHOLD consecutive outage errors
+(timeouts, connection errors, 5xx; not rate limits or bad keys, which are about
+one caller) and lets a single trial call through after CIRCUIT_RESET_SECONDS.
+Breakers are shared per provider name across all users and wrappers.
+"""
+
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from .base import BaseProvider, DelegatingProvider
+
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", "120"))
+PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS", "600"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "3"))
+PROVIDER_BACKOFF_BASE_SECONDS = float(os.getenv("PROVIDER_BACKOFF_BASE_SECONDS", "1"))
+PROVIDER_BACKOFF_MAX_SECONDS = float(os.getenv("PROVIDER_BACKOFF_MAX_SECONDS", "30"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+
+class ProviderUnavailable(Exception):
+    """The provider's circuit is open; calls are refused until retry_after seconds have passed."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is unavailable, circuit open for another {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class ProviderTimeout(TimeoutError):
+    """A provider call did not finish within its deadline."""
+
+
+def retry_after(e: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms headers), if any."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_outage(e: Exception) -> bool:
+    """Errors that say the provider itself is down or slow, as opposed to this caller being limited."""
+    if isinstance(e, ProviderTimeout):
+        return True
+    status = getattr(e, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    return BaseProvider.is_retryable(e) and "429" not in str(e) and "rate_limit" not in str(e).lower()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with closed, open and half-open states; safe to share across threads."""
+
+    def __init__(self, name: str, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.counters = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+            "timeouts": 0, "rejected": 0, "opened": 0
+        }
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise ProviderUnavailable if the circuit is open; in half-open, admit one trial call."""
+        with self._lock:
+            self.counters["calls"] += 1
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            remaining = self.opened_at + self.reset_seconds - now
+            if remaining <= 0:
+                # Open long enough, or a half-open trial never reported back: let one call through
+                self.state = "half_open"
+                self.opened_at = now
+                return
+            self.counters["rejected"] += 1
+            raise ProviderUnavailable(self.name, max(remaining, 1.0))
+
+    def retried(self) -> None:
+        with self._lock:
+            self.counters["retries"] += 1
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.counters["successes"] += 1
+            self.failures = 0
+            self.state = "closed"
+
+    def failed(self, e: Exception) -> None:
+        with self._lock:
+            self.counters["failures"] += 1
+            if isinstance(e, ProviderTimeout):
+                self.counters["timeouts"] += 1
+            if not _is_outage(e):
+                # The provider answered; only a trial call's outcome decides a half-open circuit
+                if self.state == "half_open":
+                    self.state = "closed"
+                    self.failures = 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.counters["opened"] += 1
+                    logging.warning(f"Circuit for {self.name} opened after {self.failures} failures: {e}")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures, **self.counters}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def resilience_stats() -> dict:
+    """Breaker state and call counters per provider."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+def _backoff(attempt: int, e: Exception) -> float:
+    """Full-jitter exponential backoff, never shorter than the provider's Retry-After."""
+    delay = random.uniform(0, min(PROVIDER_BACKOFF_MAX_SECONDS, PROVIDER_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    requested = retry_after(e)
+    return max(delay, requested) if requested is not None else delay
+
+
+class ResilientProvider(DelegatingProvider):
+    """Wraps a network provider with per-call deadlines, retries and a shared circuit breaker."""
+
+    def __init__(self, inner: BaseProvider):
+        super().__init__(inner)
+        self.breaker = breaker_for(self.provider_name)
+
+    def _should_retry(self, e: Exception, attempt: int) -> Optional[float]:
+        """Delay before the next attempt, or None to give up."""
+        if attempt >= PROVIDER_MAX_RETRIES or isinstance(e, ProviderUnavailable) or not self.inner.is_retryable(e):
+            return None
+        delay = _backoff(attempt, e)
+        if delay > PROVIDER_BACKOFF_MAX_SECONDS:
+            # Asked to wait longer than we're willing to hold the request; let the caller decide
+            return None
+        self.breaker.retried()
+        return delay
+
+    async def _acall(self, func: Callable[[], Awaitable[Any]], timeout: float) -> Any:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                try:
+                    result = await asyncio.wait_for(func(), timeout)
+                except asyncio.TimeoutError:
+                    raise ProviderTimeout(f"{self.provider_name} call timed out after {timeout:.0f}s")
+            except Exception as e:
+                self.breaker.failed(e)
+                delay = self._should_retry(e, attempt)
+                if delay is None:
+                    raise
+                logging.info(f"{self.provider_name} call failed ({e}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.succeeded()
+            return result
+
+    async def atranscribe_audio(self, file_content: bytes, filename: str) -> str:
+        return await self._acall(lambda: self.inner.atranscribe_audio(file_content, filename), PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS)
+
+    async def atranscribe_audio_file(self, path: str, filename: str) -> str:
+        return await self._acall(lambda: self.inner.atranscribe_audio_file(path, filename), PROVIDER_TRANSCRIBE_TIMEOUT_SECONDS)
+
+    async def acomplete_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> dict:
+        return await self._acall(lambda: self.inner.acomplete_json(system_prompt, user_prompt, max_tokens), PROVIDER_TIMEOUT_SECONDS)
+
+    async def astream_json(self, system_prompt: str, user_prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """
+        Retried only until the first delta arrives; after that a failure ends the stream.
+        PROVIDER_TIMEOUT_SECONDS applies to the wait for each delta, not the whole stream.
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            stream = self.inner.astream_json(system_prompt, user_prompt, max_tokens)
+            started = False
+            try:
+                while True:
+                    try:
+                        delta = await asyncio.wait_for(anext(stream), PROVIDER_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise ProviderTimeout(f"{self.provider_name} stream timed out after {PROVIDER_TIMEOUT_SECONDS:.0f}s without data")
+                    started = True
+                    yield delta
+            except Exception as e:
+                self.breaker.failed(e)
+                delay = None if started else self._should_retry(e, attempt)
+                if delay is None:
+                    raise
+                logging.info(f"{self.provider_name} stream failed ({e}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                await stream.aclose()
+            self.breaker.succeeded()
+            return
+
+    # Minutes are built from the calls above, so each chunk, reduce and stream is
+    # retried on its own. A provider with its own minutes logic is passed through.
+
+    async def agenerate_minutes(self, transcript: str) -> dict:
+        if type(self.inner).agenerate_minutes is BaseProvider.agenerate_minutes:
+            return await BaseProvider.agenerate_minutes(self, transcript)
+        return await self.inner.agenerate_minutes(transcript)
+
+    async def astream_minutes(self, transcript: str) -> AsyncIterator[dict]:
+        if type(self.inner).astream_minutes is BaseProvider.astream_minutes:
+            events = BaseProvider.astream_minutes(self, transcript)
+        else:
+            events = self.inner.astream_minutes(transcript)
+        async for event in events:
+            yield event
+
+    def is_retryable(self, e: Exception) -> bool:
+        if isinstance(e, ProviderUnavailable):
+            # A later attempt (e.g. a queued job's next try) can succeed once the circuit closes
+            return True
+        return self.inner.is_retryable(e)
+
+    def format_error(self, e: Exception) -> str:
+        if isinstance(e, ProviderUnavailable):
+            return "The AI provider is temporarily unavailable. Please try again in a minute."
+        if isinstance(e, ProviderTimeout):
+            return "The AI provider took too long to respond. Please try again."
+        return self.inner.format_error(e)
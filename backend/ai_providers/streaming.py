@@ -0,0 +1,158 @@
+"""
+Incremental parsing of minutes JSON while the model is still writing it.
+
+MinutesStreamParser is fed text deltas from a streaming completion and reports
+each top-level field of the SYSTEM_PROMPT object as soon as its value is
+complete, and each element of a top-level list (attendees, discussion_points,
+action_items, ...) as soon as that element is complete. The full object is
+parsed and normalized once the stream ends.
+"""
+
+import json
+from typing import Any, Iterator
+
+# The SYSTEM_PROMPT schema: every list field and its default
+LIST_FIELDS = ("attendees", "discussion_points", "decisions", "action_items", "next_steps")
+TEXT_FIELDS = {"title": "Meeting Minutes", "date": "Not specified", "summary": ""}
+
+
+class MinutesStreamParser:
+    """
+    Character-level scanner over a JSON object that tracks nesting and string
+    state, so it knows when a top-level value or list element has just ended.
+
+    feed() returns events:
+        {"event": "field", "name": ..., "value": ...} for a completed non-list field
+        {"event": "item", "name": ..., "index": ..., "value": ...} for a completed list element
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        # Top-level member being read: its key, and where its value / current element starts
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._value_is_list = False
+        self._item_start = None
+        self._item_index = 0
+
+    def feed(self, delta: str) -> list[dict]:
+        self.text += delta
+        events = []
+        while self._pos < len(self.text):
+            events.extend(self._step(self.text[self._pos]))
+            self._pos += 1
+        return events
+
+    def _step(self, char: str) -> Iterator[dict]:
+        pos = self._pos
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and self._key is None and self._key_start is not None:
+                    self._key = json.loads(self.text[self._key_start:pos + 1])
+                    self._key_start = None
+            return
+
+        if char.isspace():
+            return
+
+        # A list element begins at the first significant character inside a top-level list
+        if self._depth == 2 and self._value_is_list and self._item_start is None and char not in ",]":
+            self._item_start = pos
+
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._key is None and self._value_start is None:
+                self._key_start = pos
+            elif self._depth == 1 and self._value_start is None:
+                self._value_start = pos
+        elif char in "{[":
+            if self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = pos
+                self._value_is_list = char == "["
+                self._item_index = 0
+            self._depth += 1
+        elif char in "}]":
+            if self._depth == 2 and self._value_is_list and char == "]":
+                yield from self._finish_item(pos)
+            self._depth -= 1
+            if self._depth == 1 and self._value_is_list and char == "]":
+                self._reset_member()
+            elif self._depth == 0:
+                yield from self._finish_scalar(pos)
+        elif char == ",":
+            if self._depth == 2 and self._value_is_list:
+                yield from self._finish_item(pos)
+            elif self._depth == 1:
+                yield from self._finish_scalar(pos)
+        elif char == ":":
+            pass
+        elif self._depth == 1 and self._key is not None and self._value_start is None:
+            # Number, true, false or null
+            self._value_start = pos
+
+    def _finish_item(self, end: int) -> Iterator[dict]:
+        if self._item_start is None:
+            return
+        value = self._loads(self.text[self._item_start:end])
+        self._item_start = None
+        if value is not None:
+            yield {"event": "item", "name": self._key, "index": self._item_index, "value": value}
+            self._item_index += 1
+
+    def _finish_scalar(self, end: int) -> Iterator[dict]:
+        if self._key is not None and self._value_start is not None and not self._value_is_list:
+            value = self._loads(self.text[self._value_start:end])
+            yield {"event": "field", "name": self._key, "value": value}
+        self._reset_member()
+
+    def _reset_member(self) -> None:
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._value_is_list = False
+        self._item_start = None
+
+    @staticmethod
+    def _loads(fragment: str) -> Any:
+        try:
+            return json.loads(fragment)
+        except ValueError:
+            return None
+
+    def result(self) -> dict:
+        """The complete object, normalized. Raises ValueError if the stream wasn't valid JSON."""
+        return normalize_minutes(json.loads(self.text))
+
+
+def normalize_minutes(minutes: Any) -> dict:
+    """Coerce a model's output into the SYSTEM_PROMPT shape: every field present with the right type."""
+    if not isinstance(minutes, dict):
+        raise ValueError("Minutes must be a JSON object")
+    normalized = dict(minutes)
+    for name, default in TEXT_FIELDS.items():
+        value = normalized.get(name)
+        normalized[name] = value if isinstance(value, str) and value else default
+    for name in LIST_FIELDS:
+        value = normalized.get(name)
+        normalized[name] = value if isinstance(value, list) else []
+    return normalized
+
+
+def minutes_events(minutes: dict) -> Iterator[dict]:
+    """The events a parser would have produced for an already complete minutes object."""
+    for name, value in minutes.items():
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                yield {"event": "item", "name": name, "index": index, "value": item}
+        else:
+            yield {"event": "field", "name": name, "value": value}
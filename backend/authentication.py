@@ -1,21 +1,164 @@
 from database import Database
+from ttl_cache import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import logging
+import threading
+import time
 import bcrypt
 import jwt
 import os
 from datetime import datetime, timedelta, timezone
-
-db = Database("users").get_collection()
+from pymongo.errors import DuplicateKeyError
 
 # Secret key for signing JWTs - should be in .env in production
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
+# Verified tokens are remembered until they expire, capped at this many seconds
+AUTH_TOKEN_CACHE_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_ENTRIES", "10000"))
+AUTH_TOKEN_CACHE_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "300"))
+
+# bcrypt cost for new hashes, and the dedicated pool that runs all bcrypt work
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(max((os.cpu_count() or 2) // 2, 1))))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "32"))
+# Login attempts allowed per client IP, and failed logins per account, in each window
+LOGIN_WINDOW_SECONDS = int(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_MAX_FAILURES_PER_ACCOUNT = int(os.getenv("LOGIN_MAX_FAILURES_PER_ACCOUNT", "10"))
+# Counters kept at once; when this many windows are open, new clients are refused until some close
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+
+_verified_tokens = TTLCache(AUTH_TOKEN_CACHE_ENTRIES, AUTH_TOKEN_CACHE_TTL_SECONDS)
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_bcrypt_slots = threading.BoundedSemaphore(BCRYPT_MAX_PENDING)
+
+
+class AuthBusy(Exception):
+    """Too much password hashing is already queued; the caller should retry later."""
+
+
+class TooManyAttempts(Exception):
+    """The client or account is over its login limit."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Too many attempts")
+        self.retry_after = retry_after
+
+
+def _users():
+    """The users collection, resolved on first use instead of at import."""
+    return Database("users").get_async_collection()
+
+
+@functools.lru_cache(maxsize=1)
+def _dummy_hash() -> bytes:
+    """Hash checked when the account doesn't exist, so both paths take as long. Computed once."""
+    return bcrypt.hashpw(b"dummy", bcrypt.gensalt(BCRYPT_ROUNDS))
+
+
+def _check_dummy(password: bytes) -> bool:
+    return bcrypt.checkpw(password, _dummy_hash())
+
+
+async def _run_bcrypt(func, *args):
+    """Run a bcrypt call in the dedicated pool; AuthBusy if its queue is full."""
+    if not _bcrypt_slots.acquire(blocking=False):
+        raise AuthBusy()
+    try:
+        future = _bcrypt_executor.submit(func, *args)
+    except Exception:
+        _bcrypt_slots.release()
+        raise
+    future.add_done_callback(lambda _: _bcrypt_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+class LoginThrottle:
+    """
+    Fixed-window counters of login attempts per client IP and failures per
+    account and client IP. Failures are counted per (account, IP) so that
+    nobody can lock an account's owner out just by knowing the username.
+
+    Counters are never evicted before their window ends, so flooding the table
+    can't reset someone else's count; when LOGIN_THROTTLE_MAX_KEYS windows are
+    open, attempts that would need a new counter are refused instead.
+    """
+
+    def __init__(self) -> None:
+        # key -> (count, window_end); every window is equally long, so insertion order is expiry order
+        self._counts: dict[tuple, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        # Callers hold self._lock
+        while self._counts:
+            key = next(iter(self._counts))
+            if self._counts[key][1] > now:
+                break
+            del self._counts[key]
+
+    def _count(self, key: tuple, now: float) -> tuple[int, float]:
+        entry = self._counts.get(key)
+        if entry is None or entry[1] <= now:
+            return (0, now + LOGIN_WINDOW_SECONDS)
+        return entry
+
+    def _increment(self, key: tuple, now: float) -> None:
+        # Callers hold self._lock
+        count, window_end = self._count(key, now)
+        if count == 0:
+            # A new window goes to the end of the expiry order
+            self._counts.pop(key, None)
+        self._counts[key] = (count + 1, window_end)
+
+    def check(self, client_ip: str | None, account: str | None = None) -> None:
+        """Count an attempt from client_ip, raising TooManyAttempts if it or the account is over its limit."""
+        checks = []
+        if account:
+            checks.append((("account", account, client_ip), LOGIN_MAX_FAILURES_PER_ACCOUNT))
+        if client_ip:
+            checks.append((("ip", client_ip), LOGIN_MAX_ATTEMPTS_PER_IP))
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            for key, limit in checks:
+                count, window_end = self._count(key, now)
+                if count >= limit:
+                    raise TooManyAttempts(max(int(window_end - now), 1))
+            if len(self._counts) >= LOGIN_THROTTLE_MAX_KEYS and any(key not in self._counts for key, _ in checks):
+                logging.warning("Login throttle table is full; refusing attempts from new clients")
+                oldest_end = next(iter(self._counts.values()))[1]
+                raise TooManyAttempts(max(int(oldest_end - now), 1))
+            if client_ip:
+                self._increment(("ip", client_ip), now)
+
+    def failed(self, account: str, client_ip: str | None = None) -> None:
+        with self._lock:
+            self._increment(("account", account, client_ip), time.time())
+
+    def succeeded(self, account: str, client_ip: str | None = None) -> None:
+        with self._lock:
+            self._counts.pop(("account", account, client_ip), None)
+
+
+login_throttle = LoginThrottle()
 
 
 class Authentication:
     def __init__(self) -> None:
-        pass
+        # Only the unique indexes keep usernames and emails unique; register() refuses until they exist
+        self.indexes_ready = False
+
+    async def ensure_indexes(self) -> None:
+        """Unique indexes that registration relies on, plus the username lookup used by every endpoint."""
+        users = _users()
+        await users.create_index("username_lower", unique=True)
+        await users.create_index("email", unique=True)
+        await users.create_index("username")
+        self.indexes_ready = True
 
     def create_token(self, username: str) -> str:
         """Create a JWT token for the user."""
@@ -28,36 +171,57 @@ class Authentication:
 
     def verify_token(self, token: str) -> tuple[bool, str | None]:
         """Verify a JWT token and return the username if valid."""
+        username = _verified_tokens.get(token)
+        if username is not None:
+            return (True, username)
         try:
             payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            return (True, payload.get("sub"))
+            username = payload.get("sub")
+            if username and payload.get("exp"):
+                # Never served from cache past the token's own expiry
+                _verified_tokens.set(token, username, expires_at=float(payload["exp"]))
+            return (True, username)
         except jwt.ExpiredSignatureError:
             return (False, None)
         except jwt.InvalidTokenError:
             return (False, None)
 
-    def login(self, username_or_email: str, password: str) -> tuple[bool, str]:
+    async def login(self, username_or_email: str, password: str, client_ip: str | None = None) -> tuple[bool, str]:
+        """
+        Check credentials and return (True, token) or (False, message).
+        Raises TooManyAttempts when throttled and AuthBusy when bcrypt is saturated.
+        """
         # Try to find user by username or email (case-insensitive)
         search_lower = username_or_email.lower()
-        user = db.find_one({"$or": [{"username_lower": search_lower}, {"email": search_lower}]})
-        dummy_hash = bcrypt.hashpw(b"dummy", bcrypt.gensalt())
+        login_throttle.check(client_ip, search_lower)
+        user = await _users().find_one(
+            {"$or": [{"username_lower": search_lower}, {"email": search_lower}]},
+            {"username": 1, "password": 1}
+        )
         stored_hash = user.get("password") if user else None
 
-        if stored_hash and bcrypt.checkpw(password.encode('utf-8'), stored_hash):
+        if stored_hash and await _run_bcrypt(bcrypt.checkpw, password.encode('utf-8'), stored_hash):
+            login_throttle.succeeded(search_lower, client_ip)
             token = self.create_token(user["username"])
             return (True, token)
         else:
-            bcrypt.checkpw(password.encode('utf-8'), dummy_hash)
+            if not stored_hash:
+                await _run_bcrypt(_check_dummy, password.encode('utf-8'))
+            login_throttle.failed(search_lower, client_ip)
             return (False, "Invalid username/email or password.")
 
-    def register(self, username: str, password: str, email: str) -> tuple[bool, str]:
+    async def register(self, username: str, password: str, email: str, client_ip: str | None = None) -> tuple[bool, str]:
         # Check format of email and password strength
         if "@" not in email or "." not in email:
             return (False, "Invalid email format.")
         if len(password) < 8:
             return (False, "Password too weak. It must be at least 8 characters long.")
+        if not self.indexes_ready:
+            return (False, "Registration is temporarily unavailable. Please try again in a minute.")
 
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Registrations count against the same per-IP budget as logins
+        login_throttle.check(client_ip)
+        password_hash = await _run_bcrypt(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(BCRYPT_ROUNDS))
 
         # Store original username but also store lowercase version for case-insensitive uniqueness
         user_data = {
@@ -66,15 +230,15 @@ class Authentication:
             "password": password_hash,
             "email": email.lower()
         }
-        # Check for existing username (case-insensitive)
-        if db.find_one({"username_lower": username.lower()}):
-            return (False, "Username already exists.")
-        # Check for existing email (case-insensitive)
-        if db.find_one({"email": email.lower()}):
-            return (False, "Email already exists.")
+        # One insert; the unique indexes on username_lower and email reject duplicates atomically
         try:
-            db.insert_one(user_data)
+            await _users().insert_one(user_data)
             return (True, "User registered successfully.")
+        except DuplicateKeyError as e:
+            key_pattern = (e.details or {}).get("keyPattern") or {}
+            if "email" in key_pattern or ("username_lower" not in key_pattern and "email" in str(e)):
+                return (False, "Email already exists.")
+            return (False, "Username already exists.")
         except Exception as e:
             logging.exception("Error registering user:")
             return (False, "Registration failed due to an internal error.")
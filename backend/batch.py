@@ -0,0 +1,186 @@
+"""
+Batch input handling for /process_batch.
+
+A batch is any number of uploaded transcripts and audio files, and/or zip
+archives of them. Uploads are spooled to disk once; zip members are extracted
+only when their turn comes, each to its own SpooledUpload, so a large archive
+never needs twice its size on disk. Items run through a fixed number of
+concurrent workers and their results are yielded as soon as each finishes.
+"""
+
+import asyncio
+import logging
+import os
+import zipfile
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from fastapi import UploadFile
+from ai import detect_input_kind
+from concurrency import run_blocking
+from uploads import (
+    SpooledUpload, UploadTooLarge, UPLOAD_MAX_BYTES, UPLOAD_CHUNK_BYTES,
+    spool_upload, upload_limit, too_large_message
+)
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+# Items processed at the same time within one batch request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+class InvalidBatch(ValueError):
+    """The batch can't be processed at all (bad archive, too many items, ...)."""
+
+
+@dataclass
+class BatchItem:
+    """One transcript or audio file of a batch; error is set if it can't be processed."""
+
+    index: int
+    name: str
+    kind: Optional[str]
+    spooled: Optional[SpooledUpload] = None
+    archive: Optional[SpooledUpload] = None
+    member: Optional[zipfile.ZipInfo] = None
+    error: Optional[str] = None
+
+    def response(self) -> dict:
+        """Start of the item's NDJSON line; the caller adds success and the outcome."""
+        return {"event": "item", "index": self.index, "name": self.name}
+
+    async def open(self) -> SpooledUpload:
+        """
+        The item's content on disk; the caller closes it. Zip members are extracted here.
+
+        Raises:
+            UploadTooLarge: the member's uncompressed size is over its kind's limit
+        """
+        if self.spooled is not None:
+            spooled, self.spooled = self.spooled, None
+            return spooled
+        return await run_blocking(_extract, self.archive.path, self.member, upload_limit(self.kind))
+
+
+def _extract(archive_path: str, member: zipfile.ZipInfo, max_bytes: int) -> SpooledUpload:
+    """Copy one zip member to disk, stopping at max_bytes whatever the archive claims its size is."""
+    spooled = SpooledUpload(os.path.basename(member.filename))
+    try:
+        with zipfile.ZipFile(archive_path) as archive, archive.open(member) as source, open(spooled.path, "wb") as out:
+            while chunk := source.read(UPLOAD_CHUNK_BYTES):
+                spooled.size += len(chunk)
+                if spooled.size > max_bytes:
+                    raise UploadTooLarge()
+                out.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
+
+
+def _archive_members(path: str) -> list[zipfile.ZipInfo]:
+    """Files in a zip archive, in archive order, without directories and macOS metadata."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = archive.infolist()
+    except zipfile.BadZipFile:
+        raise InvalidBatch("Invalid zip archive")
+    return [
+        member for member in members
+        if not member.is_dir()
+        and not member.filename.startswith("__MACOSX/")
+        and not os.path.basename(member.filename).startswith(".")
+    ]
+
+
+async def collect_items(files: list[UploadFile]) -> tuple[list[BatchItem], list[SpooledUpload]]:
+    """
+    Spool the uploads of a batch and list its items; zip archives contribute one item per member.
+    Unsupported or oversized items are kept with an error so they show up in the results.
+
+    Returns:
+        (items, archives); the caller closes the archives, and the items' spooled files
+        via close_items, once the batch is done
+
+    Raises:
+        InvalidBatch: an archive is unreadable, or there are more than BATCH_MAX_ITEMS items
+    """
+    items: list[BatchItem] = []
+    archives: list[SpooledUpload] = []
+    try:
+        for upload in files:
+            name = upload.filename or "upload"
+            if name.lower().endswith(".zip"):
+                try:
+                    archive = await spool_upload(upload, UPLOAD_MAX_BYTES)
+                except UploadTooLarge:
+                    raise InvalidBatch(f"{name}: {too_large_message(None)}")
+                archives.append(archive)
+                for member in await run_blocking(_archive_members, archive.path):
+                    kind = detect_input_kind(member.filename)
+                    item = BatchItem(len(items), member.filename, kind, archive=archive, member=member)
+                    if not kind:
+                        item.error = "Unsupported file type"
+                    elif member.flag_bits & 0x1:
+                        item.error = "Encrypted archive members are not supported"
+                    elif member.file_size > upload_limit(kind):
+                        item.error = too_large_message(kind)
+                    items.append(item)
+                    if len(items) > BATCH_MAX_ITEMS:
+                        raise InvalidBatch(f"A batch can contain at most {BATCH_MAX_ITEMS} items")
+            else:
+                kind = detect_input_kind(name)
+                item = BatchItem(len(items), name, kind)
+                if not kind:
+                    item.error = "Unsupported file type"
+                    await upload.close()
+                else:
+                    try:
+                        item.spooled = await spool_upload(upload, upload_limit(kind))
+                    except UploadTooLarge:
+                        item.error = too_large_message(kind)
+                items.append(item)
+
+            if len(items) > BATCH_MAX_ITEMS:
+                raise InvalidBatch(f"A batch can contain at most {BATCH_MAX_ITEMS} items")
+    except BaseException:
+        await close_items(items, archives)
+        raise
+    return items, archives
+
+
+async def close_items(items: list[BatchItem], archives: list[SpooledUpload]) -> None:
+    """Remove everything a batch spooled to disk."""
+    for spooled in [item.spooled for item in items if item.spooled is not None] + archives:
+        await run_blocking(spooled.close)
+
+
+async def run_items(
+    items: list[BatchItem],
+    process: Callable[[BatchItem], Awaitable[dict]],
+    concurrency: int = BATCH_CONCURRENCY
+) -> AsyncIterator[dict]:
+    """
+    Run process on every item with at most `concurrency` in flight, yielding
+    each result as soon as it is ready (so not in item order). Closing the
+    iterator early cancels the items still running.
+    """
+    pending = list(reversed(items))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        while pending:
+            item = pending.pop()
+            try:
+                result = await process(item)
+            except Exception:
+                logging.exception(f"Batch item {item.name} crashed:")
+                result = {**item.response(), "success": False, "message": "Processing failed"}
+            await results.put(result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(items))))]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,52 @@
+"""
+Micro-benchmark: per-PDF style setup cost before and after style caching.
+
+Run from the backend directory:
+
+    python benchmarks/pdf_styles.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pdf_generator import PDFGenerator
+
+MINUTES = {
+    "title": "Weekly sync",
+    "date": "2024-05-01",
+    "attendees": ["Ann", "Bob"],
+    "summary": "Status update.",
+    "discussion_points": [{"topic": "Release", "details": "On track."}],
+    "decisions": ["Ship Friday"],
+    "action_items": [{"task": "Write notes", "owner": "Ann", "due_date": None}],
+    "next_steps": ["Review"]
+}
+
+
+def uncached_setup():
+    """What every PDFGenerator() did before: a fresh stylesheet and table style."""
+    config = PDFGenerator.TEMPLATES["professional"]
+    PDFGenerator._build_styles(config)
+    PDFGenerator._build_table_style(config)
+
+
+def cached_setup():
+    PDFGenerator("professional")
+
+
+def full_render():
+    PDFGenerator("professional").generate_bytes(MINUTES)
+
+
+if __name__ == "__main__":
+    PDFGenerator.preload_styles()
+    runs = 2000
+    for name, func in [("setup, uncached", uncached_setup), ("setup, cached", cached_setup)]:
+        seconds = timeit.timeit(func, number=runs)
+        print(f"{name:>20}: {seconds / runs * 1e6:8.1f} us per PDF")
+    runs = 200
+    seconds = timeit.timeit(full_render, number=runs)
+    print(f"{'full render, cached':>20}: {seconds / runs * 1e6:8.1f} us per PDF")
@@ -0,0 +1,57 @@
+"""
+Offline pipeline benchmark using the Local provider.
+
+Run from the backend directory; no API key or network access is needed:
+
+    python benchmarks/pipeline.py [transcript.txt | audio.mp3 ...]
+
+Without arguments the sample transcripts in ../files are used. Each input goes
+through the same AI handler the API uses (audio is transcribed by local Whisper,
+which must be installed). Prints the time per input and the size of the minutes.
+The AI result cache is disabled so every run does the full work.
+"""
+
+import asyncio
+import glob
+import os
+import sys
+import time
+
+os.environ["AI_CACHE_ENABLED"] = "false"
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+from ai import AI, detect_input_kind  # noqa: E402
+
+
+async def run(path: str, ai: AI) -> None:
+    kind = detect_input_kind(path)
+    started = time.perf_counter()
+    if kind == "txt":
+        with open(path, "rb") as f:
+            result = await ai.ahandle_txt_file(f.read())
+    elif kind == "audio":
+        result = await ai.ahandle_audio_path(path, os.path.basename(path))
+    else:
+        print(f"{path}: unsupported file type")
+        return
+    elapsed = time.perf_counter() - started
+
+    if not result.get("success"):
+        print(f"{path}: failed after {elapsed:.2f} s: {result.get('error')}")
+        return
+    minutes = result["minutes"]
+    print(
+        f"{os.path.basename(path)}: {elapsed:.2f} s, {result['transcript_length']} characters, "
+        f"{len(minutes['discussion_points'])} topics, {len(minutes['action_items'])} action items"
+    )
+
+
+async def main(paths: list[str]) -> None:
+    local_ai = AI(api_key="", provider="Local")
+    for path in paths:
+        await run(path, local_ai)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:] or sorted(glob.glob(os.path.join(BACKEND_DIR, "..", "files", "*.txt")))))
@@ -0,0 +1,65 @@
+"""
+Load test: concurrent signups for the same username and email must create
+exactly one user.
+
+Needs a reachable MONGODB_CONNECTION / MONGODB_DATABASE. Run from the backend
+directory:
+
+    python benchmarks/register_load.py --concurrency 20 --rounds 5
+
+Each round registers one fresh username from many coroutines at once, through
+Authentication.register, then counts the documents created and deletes them.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from authentication import Authentication, AuthBusy
+from database import Database
+
+
+async def run_round(auth: Authentication, concurrency: int) -> tuple[int, Counter]:
+    name = f"loadtest-{uuid.uuid4().hex[:12]}"
+
+    async def attempt(index: int) -> str:
+        # Vary the case so the case-insensitive index is what catches duplicates
+        username = name.upper() if index % 2 else name
+        try:
+            return (await auth.register(username, "loadtest-password", f"{name}@example.com"))[1]
+        except AuthBusy:
+            return "busy"
+
+    outcomes = Counter(await asyncio.gather(*(attempt(i) for i in range(concurrency))))
+    users = Database("users").get_async_collection()
+    created = await users.count_documents({"username_lower": name})
+    await users.delete_many({"username_lower": name})
+    return created, outcomes
+
+
+async def main(concurrency: int, rounds: int) -> int:
+    auth = Authentication()
+    await auth.ensure_indexes()
+    failures = 0
+    for number in range(1, rounds + 1):
+        started = time.monotonic()
+        created, outcomes = await run_round(auth, concurrency)
+        elapsed = time.monotonic() - started
+        status = "ok" if created == 1 else "DUPLICATES"
+        failures += created != 1
+        print(f"round {number}: {created} user(s) created in {elapsed:.2f} s [{status}] {dict(outcomes)}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent registration load test.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous signups per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(main(args.concurrency, args.rounds)) else 0)
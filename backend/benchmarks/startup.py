@@ -0,0 +1,90 @@
+"""
+Startup profile: where import time goes, and how long until the API answers.
+
+Run from the backend directory (with the usual .env / environment set):
+
+    python benchmarks/startup.py
+
+Prints the slowest top-level imports of main.py (from python -X importtime),
+then starts uvicorn and measures the time until GET /api/ returns 200. Exits
+with status 1 if that exceeds STARTUP_TARGET_SECONDS.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+STARTUP_TARGET_SECONDS = float(os.getenv("STARTUP_TARGET_SECONDS", "1.5"))
+TOP_IMPORTS = 15
+
+
+def import_report() -> None:
+    """Cumulative import time of each module main.py imports directly."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(1)
+
+    timings = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  "):
+            # A top-level import; children are listed before their parent
+            if name.strip() == "main":
+                total = int(cumulative) / 1000
+                break
+            timings = []
+        elif not name.startswith("    "):
+            # Imported directly by main
+            timings.append((int(cumulative) / 1000, name.strip()))
+
+    print(f"import main: {total:.0f} ms")
+    for millis, name in sorted(timings, reverse=True)[:TOP_IMPORTS]:
+        print(f"  {millis:8.1f} ms  {name}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(timeout: float = 30.0) -> float:
+    """Seconds from launching uvicorn until GET /api/ succeeds."""
+    port = _free_port()
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    try:
+        while time.monotonic() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.monotonic() - started
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError("API did not answer")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    import_report()
+    elapsed = time_to_first_response()
+    print(f"time to first /api/ response: {elapsed:.2f} s (target {STARTUP_TARGET_SECONDS:.2f} s)")
+    sys.exit(0 if elapsed <= STARTUP_TARGET_SECONDS else 1)
@@ -0,0 +1,46 @@
+"""
+Bounded offloading of blocking work from async code.
+
+Anything that still blocks (bcrypt, Fernet, mutagen, sync SDK calls) is run in a
+dedicated thread pool so it doesn't stall the event loop. The number of calls
+waiting for a thread is capped too, so a burst can't queue unbounded work.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "16"))
+BLOCKING_MAX_PENDING = int(os.getenv("BLOCKING_MAX_PENDING", "256"))
+
+
+def _new_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+
+_executor = _new_executor()
+_pending = asyncio.Semaphore(BLOCKING_MAX_PENDING)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking callable in the shared thread pool and await its result.
+
+    Args:
+        func: The blocking function to call
+        *args, **kwargs: Arguments passed through to func
+
+    Returns:
+        Whatever func returns
+    """
+    async with _pending:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown() -> None:
+    """Wait for running calls and drop queued ones. Called at application shutdown."""
+    global _executor
+    executor, _executor = _executor, _new_executor()
+    executor.shutdown(wait=True, cancel_futures=True)
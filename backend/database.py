@@ -1,11 +1,181 @@
 import os
+import threading
 from os.path import dirname, join
 import pymongo
+from pymongo import monitoring
 from dotenv import load_dotenv
+from metrics import MONGODB_COMMAND_SECONDS
 
 dotenv_path = join(dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path)
 
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that keeps running counters for the shared clients.
+    Used to size MONGODB_MAX_POOL_SIZE: a high checked-out count or long waits
+    mean requests are queueing for a connection.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.open_connections = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        """Return a point-in-time copy of the counters."""
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+    def _record_wait(self, event) -> float:
+        # pymongo >= 4.7 reports the checkout duration on the event itself
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            return duration
+        return 0.0
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_check_out_failed(self, event):
+        wait = self._record_wait(event)
+        with self._lock:
+            self.checkout_failures += 1
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def connection_checked_out(self, event):
+        wait = self._record_wait(event)
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.total_wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+
+pool_metrics = PoolMetrics()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Command listener feeding the MongoDB latency histogram served by /metrics."""
+
+    def started(self, event): pass
+
+    def succeeded(self, event):
+        MONGODB_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="ok")
+
+    def failed(self, event):
+        MONGODB_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="error")
+
+
+command_metrics = CommandMetrics()
+
+# Process-wide MongoClient registry, keyed by connection string.
+# MongoClient is thread-safe and owns its own connection pool, so one
+# instance per cluster is shared by every Database() in the process.
+_clients: dict[str, pymongo.MongoClient] = {}
+_async_clients: dict[str, pymongo.AsyncMongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _pool_options() -> dict:
+    """Connection pool settings, configurable through the environment."""
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    }
+
+
+def _get_or_create(registry: dict, client_class, db_url: str):
+    client = registry.get(db_url)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = registry.get(db_url)
+        if client is None:
+            # MongoDB connection with TLS/SSL - using mongodb+srv:// automatically enables TLS
+            # Add connection parameters for better error handling
+            client = client_class(
+                db_url,
+                serverSelectionTimeoutMS=5000,
+                connectTimeoutMS=10000,
+                socketTimeoutMS=10000,
+                event_listeners=[pool_metrics, command_metrics],
+                **_pool_options()
+            )
+            registry[db_url] = client
+        return client
+
+
+def get_client(db_url: str) -> pymongo.MongoClient:
+    """Return the shared MongoClient for a connection string, creating it on first use."""
+    return _get_or_create(_clients, pymongo.MongoClient, db_url)
+
+
+def get_async_client(db_url: str) -> pymongo.AsyncMongoClient:
+    """Return the shared AsyncMongoClient for a connection string, for use from async endpoints."""
+    return _get_or_create(_async_clients, pymongo.AsyncMongoClient, db_url)
+
+
+def init_clients() -> None:
+    """Create the shared client at application startup so the first request doesn't pay for it."""
+    Database("users")
+
+
+def close_clients() -> None:
+    """Close every shared sync client. Called at application shutdown."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+async def aclose_clients() -> None:
+    """Close every shared async client. Called at application shutdown."""
+    with _clients_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.close()
+
+
 class Database:
     def __init__(self, db_collection: str) -> None:
         self.db_url = os.getenv("MONGODB_CONNECTION", "")
@@ -13,22 +183,20 @@ class Database:
         if not self.db_url or not self.mydb:
             raise ValueError("Database connection string is not set in environment variables.")
 
-        # MongoDB connection with TLS/SSL - using mongodb+srv:// automatically enables TLS
-        # Add connection parameters for better error handling
-        self.client = pymongo.MongoClient(
-            self.db_url,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=10000,
-            socketTimeoutMS=10000
-        )
+        self.db_collection = db_collection
+        self.client = get_client(self.db_url)
         self.database = self.client[self.mydb]
         self.collection = self.database[db_collection]
 
     def get_collection(self):
         return self.collection
+    def get_async_collection(self):
+        return get_async_client(self.db_url)[self.mydb][self.db_collection]
     def get_database(self):
         return self.database
     def get_client(self):
         return self.client
     def close_connection(self):
-        self.client.close()
+        # The client is shared by the whole process and closed once at shutdown
+        # (close_clients); closing it here would cut off every other user of it.
+        pass
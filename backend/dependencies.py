@@ -0,0 +1,97 @@
+"""
+FastAPI dependencies for authenticated endpoints.
+
+The token is verified through Authentication.verify_token's cache, and the
+user's record is loaded at most once per request with only the fields the
+endpoint asks for. Endpoints still return their own "Invalid or expired token"
+and "User not found" bodies, so responses are unchanged.
+"""
+
+import ipaddress
+import os
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Form, Query, Request
+from authentication import Authentication
+from database import Database
+from metrics import stage
+
+# Reverse proxies (comma-separated addresses or networks) whose X-Forwarded-For is believed
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(entry.strip(), strict=False)
+    for entry in os.getenv("TRUSTED_PROXIES", "").split(",") if entry.strip()
+]
+
+auth = Authentication()
+
+
+@dataclass
+class CurrentUser:
+    """Who made the request: username is None for a bad token, user is None if not found."""
+    username: Optional[str] = None
+    user: Optional[dict] = None
+
+
+async def _load_user(request: Request, username: str, fields: tuple[str, ...]) -> Optional[dict]:
+    """The user's document with the given fields, shared by every dependency in the request."""
+    if not hasattr(request.state, "users"):
+        request.state.users = {}
+    loaded = request.state.users
+    wanted = set(fields)
+    for projected, user in loaded.items():
+        if wanted <= projected:
+            return user
+
+    projection = {field: 1 for field in fields} if fields else {"_id": 1}
+    with stage("user_lookup"):
+        user = await Database("users").get_async_collection().find_one({"username": username}, projection)
+    loaded[frozenset(wanted)] = user
+    return user
+
+
+def authenticated(fields: Optional[tuple[str, ...]] = None, form: bool = False):
+    """
+    Dependency resolving the request's token (a query parameter, or a form field
+    when form=True) to a CurrentUser.
+
+    Args:
+        fields: User fields to load. None skips the lookup; () only checks the user exists.
+        form: Read the token from the form body instead of the query string.
+    """
+    token_param = Form(...) if form else Query(...)
+
+    async def dependency(request: Request, token: str = token_param) -> CurrentUser:
+        with stage("verify_token"):
+            verified = auth.verify_token(token)
+        if not verified[0] or not verified[1]:
+            return CurrentUser()
+        current = CurrentUser(username=verified[1])
+        if fields is not None:
+            current.user = await _load_user(request, current.username, fields)
+        return current
+
+    return dependency
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    The address the request came from. Behind TRUSTED_PROXIES this is the last
+    X-Forwarded-For hop not added by one of them; the header is ignored when the
+    peer isn't a trusted proxy, since clients can send anything in it.
+    """
+    peer = request.client.host if request.client else None
+    if peer is None or not _trusted(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+    return hops[0] if hops else peer
@@ -5,22 +5,44 @@ Uses Fernet symmetric encryption (AES 128 in CBC mode).
 
 import os
 import base64
+import threading
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from ttl_cache import TTLCache
+
+# Decrypted values are kept in memory only, for at most this many seconds
+DECRYPT_CACHE_TTL_SECONDS = int(os.getenv("DECRYPT_CACHE_TTL_SECONDS", "1800"))
 
 class Encryption:
     def __init__(self):
         """
         Initialize encryption with a key derived from environment variable.
         Falls back to JWT secret if ENCRYPTION_KEY is not set.
+
+        The key itself is derived on first use (PBKDF2 is deliberately slow),
+        so creating an Encryption at import time costs nothing.
         """
         # Get encryption key from environment or use JWT secret as fallback
-        secret = os.getenv("ENCRYPTION_KEY") or os.getenv("JWT_SECRET")
+        self._secret = os.getenv("ENCRYPTION_KEY") or os.getenv("JWT_SECRET")
 
-        if not secret:
+        if not self._secret:
             raise ValueError("No encryption key found. Set ENCRYPTION_KEY or JWT_SECRET in environment.")
 
+        self._fernet = None
+        self._fernet_lock = threading.Lock()
+        # Ciphertext -> plaintext; a Fernet token always decrypts to the same value
+        self._decrypted = TTLCache(1024, DECRYPT_CACHE_TTL_SECONDS)
+
+    @property
+    def fernet(self) -> Fernet:
+        if self._fernet is None:
+            with self._fernet_lock:
+                if self._fernet is None:
+                    self._fernet = self._derive_fernet()
+        return self._fernet
+
+    def _derive_fernet(self) -> Fernet:
         # Derive a proper Fernet key from the secret
         # Use a salt from environment for per-installation uniqueness
         salt = bytes(os.getenv("SALT", "minutes-generator-salt-v1"), "utf-8")
@@ -31,8 +53,8 @@ class Encryption:
             salt=salt,
             iterations=100000,
         )
-        key = base64.urlsafe_b64encode(kdf.derive(secret.encode()))
-        self.fernet = Fernet(key)
+        key = base64.urlsafe_b64encode(kdf.derive(self._secret.encode()))
+        return Fernet(key)
 
     def encrypt(self, plaintext: str) -> str:
         """
@@ -63,15 +85,25 @@ class Encryption:
         if not encrypted:
             return ""
 
+        cached = self._decrypted.get(encrypted)
+        if cached is not None:
+            return cached
+
         try:
             decrypted_bytes = self.fernet.decrypt(encrypted.encode())
-            return decrypted_bytes.decode()
+            plaintext = decrypted_bytes.decode()
+            self._decrypted.set(encrypted, plaintext)
+            return plaintext
         except Exception as e:
             # If decryption fails, it might be a legacy unencrypted key
             # Log the error and return empty string
             print(f"Decryption failed: {e}")
             return ""
 
+    def forget(self, encrypted: str) -> None:
+        """Drop a remembered plaintext, e.g. when the stored value is replaced."""
+        self._decrypted.pop(encrypted)
+
     def is_encrypted(self, value: str) -> bool:
         """
         Check if a string appears to be encrypted (basic heuristic).
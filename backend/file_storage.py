@@ -0,0 +1,292 @@
+"""
+Storage for generated PDFs.
+
+PDFs are kept as raw bytes in the "pdfs" GridFS bucket, one GridFS file per
+PDF with the owner and listing fields in its metadata. User documents no longer
+carry file bodies, so user lookups stay small.
+
+Listings are paged with an opaque cursor over (created_at, _id) and served
+from the (username, created_at, _id, title_lower) and (username, template,
+created_at, _id) indexes, so a page costs the same however many files a user
+has; only the projected listing fields are read. Title prefix filters run
+against the lowercased title_lower, an anchored case-sensitive match that the
+index can bound.
+
+Existing users with an embedded `files` array are moved over, and files saved
+before created_at and title_lower were always set are backfilled, with:
+
+    python file_storage.py migrate
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs import GridFSBucket
+from database import Database
+
+BUCKET_NAME = "pdfs"
+FILES_PAGE_SIZE = int(os.getenv("FILES_PAGE_SIZE", "50"))
+FILES_PAGE_MAX = int(os.getenv("FILES_PAGE_MAX", "200"))
+_LISTING_FIELDS = ("filename", "template", "created_at", "title")
+
+
+class InvalidCursor(ValueError):
+    """A listing cursor that wasn't produced by list_files_page."""
+
+
+def _encode_cursor(entry: dict) -> str:
+    position = [entry["metadata"].get("created_at"), str(entry["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[Optional[str], ObjectId]:
+    try:
+        created_at, file_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if created_at is not None and not isinstance(created_at, str):
+            # Would otherwise end up in the query as an operator document
+            raise InvalidCursor()
+        return created_at, ObjectId(file_id)
+    except (ValueError, TypeError, InvalidId):
+        raise InvalidCursor()
+
+
+def parse_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """Parse a single "bytes=start-end" range into an inclusive (start, end), None if unsatisfiable."""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+    if not match or (not match.group(1) and not match.group(2)) or size == 0:
+        return None
+    if not match.group(1):
+        # Suffix range: the last N bytes
+        length = int(match.group(2))
+        if length == 0:
+            return None
+        return (max(size - length, 0), size - 1)
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else size - 1
+    if start >= size or end < start:
+        return None
+    return (start, min(end, size - 1))
+
+
+class FileStorage:
+    """Stores and looks up users' PDFs in GridFS."""
+
+    def __init__(self) -> None:
+        self._bucket = None
+        self._files = None
+
+    def _connect(self) -> None:
+        # Deferred to first use so importing the API doesn't open a connection
+        database = Database("users").get_database()
+        self._files = database[f"{BUCKET_NAME}.files"]
+        self._bucket = GridFSBucket(database, bucket_name=BUCKET_NAME)
+
+    @property
+    def bucket(self) -> GridFSBucket:
+        if self._bucket is None:
+            self._connect()
+        return self._bucket
+
+    @property
+    def files(self):
+        if self._files is None:
+            self._connect()
+        return self._files
+
+    def ensure_indexes(self) -> None:
+        self.files.create_index([("metadata.username", 1), ("metadata.filename", 1)])
+        # Listing: page order, with the title alongside so prefix filters are checked on index keys
+        self.files.create_index([
+            ("metadata.username", 1), ("metadata.created_at", 1), ("_id", 1), ("metadata.title_lower", 1)
+        ])
+        self.files.create_index([
+            ("metadata.username", 1), ("metadata.template", 1), ("metadata.created_at", 1), ("_id", 1)
+        ])
+
+    def save(
+        self,
+        username: str,
+        filename: str,
+        template: str,
+        title: str,
+        pdf_bytes: bytes,
+        created_at: Optional[str] = None
+    ):
+        """Store a PDF and return its GridFS id."""
+        metadata = {
+            "username": username,
+            "filename": filename,
+            "template": template,
+            "title": title,
+            "title_lower": (title or "").lower(),
+            "created_at": created_at or datetime.utcnow().isoformat(),
+            "content_type": "application/pdf",
+            "sha256": hashlib.sha256(pdf_bytes).hexdigest()
+        }
+        return self.bucket.upload_from_stream(filename, pdf_bytes, metadata=metadata)
+
+    def list_files_page(
+        self,
+        username: str,
+        limit: int = FILES_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        newest_first: bool = True,
+        template: Optional[str] = None,
+        title_prefix: Optional[str] = None
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        One page of a user's PDFs, ordered by created_at. Never reads file bodies.
+
+        Args:
+            limit: Page size, capped at FILES_PAGE_MAX
+            cursor: next_cursor from the previous page, None for the first page
+            template: Only files rendered with this template
+            title_prefix: Only files whose title starts with this (case-insensitive)
+
+        Returns:
+            (listing entries, next_cursor); next_cursor is None on the last page
+
+        Raises:
+            InvalidCursor: the cursor is malformed
+        """
+        limit = max(1, min(limit, FILES_PAGE_MAX))
+        direction = -1 if newest_first else 1
+        query: dict = {"metadata.username": username}
+        if template:
+            query["metadata.template"] = template
+        if title_prefix:
+            query["metadata.title_lower"] = {"$regex": "^" + re.escape(title_prefix.lower())}
+        if cursor:
+            created_at, file_id = _decode_cursor(cursor)
+            beyond = "$lt" if newest_first else "$gt"
+            query["$or"] = [
+                {"metadata.created_at": {beyond: created_at}},
+                {"metadata.created_at": created_at, "_id": {beyond: file_id}}
+            ]
+
+        # One extra entry tells whether there is another page
+        entries = list(
+            self.files.find(query, {f"metadata.{field}": 1 for field in _LISTING_FIELDS})
+            .sort([("metadata.created_at", direction), ("_id", direction)])
+            .limit(limit + 1)
+        )
+        next_cursor = _encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+        return [
+            {field: entry["metadata"].get(field) for field in _LISTING_FIELDS}
+            for entry in entries[:limit]
+        ], next_cursor
+
+    def count_files(self, username: str) -> int:
+        return self.files.count_documents({"metadata.username": username})
+
+    def find(self, username: str, filename: str) -> Optional[dict]:
+        """The GridFS files document for a user's PDF (the first one saved under that name)."""
+        return self.files.find_one(
+            {"metadata.username": username, "metadata.filename": filename},
+            sort=[("uploadDate", 1)]
+        )
+
+    def open(self, username: str, filename: str):
+        """A readable, seekable GridOut for a user's PDF, or None if it doesn't exist."""
+        entry = self.find(username, filename)
+        if not entry:
+            return None
+        return self.bucket.open_download_stream(entry["_id"])
+
+    def read(self, username: str, filename: str) -> Optional[bytes]:
+        """Raw bytes of a user's PDF, or None if it doesn't exist."""
+        entry = self.find(username, filename)
+        if not entry:
+            return None
+        return self.bucket.open_download_stream(entry["_id"]).read()
+
+    @staticmethod
+    def iter_range(grid_out, start: int, length: int, chunk_size: int = 256 * 1024):
+        """Yield `length` bytes of a GridOut from `start`, one chunk at a time."""
+        try:
+            grid_out.seek(start)
+            remaining = length
+            while remaining > 0:
+                data = grid_out.read(min(chunk_size, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+        finally:
+            grid_out.close()
+
+    def migrate_embedded_files(self) -> int:
+        """
+        Move PDFs from users' embedded `files` arrays into GridFS.
+        Safe to re-run: files already copied are skipped, and the array is only
+        removed from a user once all of its files are stored.
+
+        Returns:
+            Number of files copied
+        """
+        users = Database("users").get_collection()
+        copied = 0
+        for user in users.find({"files.0": {"$exists": True}}, {"username": 1, "files": 1}):
+            username = user["username"]
+            for entry in user["files"]:
+                # Entries without a date get the user's creation time, the same on every run
+                created_at = entry.get("created_at") or user["_id"].generation_time.replace(tzinfo=None).isoformat()
+                already = self.files.find_one({
+                    "metadata.username": username,
+                    "metadata.filename": entry.get("filename"),
+                    "metadata.created_at": created_at
+                }, {"_id": 1})
+                if already:
+                    continue
+                self.save(
+                    username,
+                    entry.get("filename"),
+                    entry.get("template"),
+                    entry.get("title", "Meeting Minutes"),
+                    base64.b64decode(entry.get("data") or ""),
+                    created_at=created_at
+                )
+                copied += 1
+            users.update_one({"_id": user["_id"]}, {"$unset": {"files": ""}})
+            logging.info(f"Migrated {len(user['files'])} files for {username}")
+        return copied
+
+    def backfill_listing_fields(self) -> int:
+        """
+        Set created_at (from the upload date) and title_lower on stored PDFs
+        that lack them, so they page and filter like new ones. Safe to re-run.
+
+        Returns:
+            Number of files updated
+        """
+        updated = 0
+        for entry in self.files.find(
+            {"$or": [{"metadata.created_at": None}, {"metadata.title_lower": {"$exists": False}}]},
+            {"uploadDate": 1, "metadata.created_at": 1, "metadata.title": 1}
+        ):
+            metadata = entry.get("metadata") or {}
+            self.files.update_one({"_id": entry["_id"]}, {"$set": {
+                "metadata.created_at": metadata.get("created_at") or entry["uploadDate"].isoformat(),
+                "metadata.title_lower": (metadata.get("title") or "").lower()
+            }})
+            updated += 1
+        return updated
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        print("Usage: python file_storage.py migrate")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    storage = FileStorage()
+    storage.ensure_indexes()
+    print(f"Copied {storage.migrate_embedded_files()} files to GridFS.")
+    print(f"Backfilled listing fields of {storage.backfill_listing_fields()} files.")
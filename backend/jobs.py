@@ -0,0 +1,435 @@
+"""
+Background job queue for transcription and minutes generation.
+
+Jobs live in the "jobs" collection and uploaded files in the "job_inputs"
+GridFS bucket, so queued work survives API and worker restarts. Workers claim
+jobs with an atomic find_one_and_update and hold a lease that they renew while
+running; a job whose lease expires (worker crashed) is picked up again.
+At most MAX_RUNNING_JOBS_PER_USER jobs of one user run at a time across all
+workers, and at most MAX_QUEUED_JOBS_PER_USER can be waiting or running.
+Transient provider errors are retried with exponential backoff.
+
+Workers run inside the API process (JOB_WORKERS, default 2) and/or as
+separate processes: `python worker.py` from the backend directory.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs import AsyncGridFSBucket
+from database import Database
+from encryption import Encryption
+from concurrency import run_blocking
+from ai import AI, close_retired_providers, detect_input_kind, forget_provider
+from minutes_store import MinutesArchive
+from usage_stats import UsageAggregator
+from metrics import stage
+from uploads import SpooledUpload
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+MAX_RUNNING_JOBS_PER_USER = int(os.getenv("MAX_RUNNING_JOBS_PER_USER", "2"))
+MAX_QUEUED_JOBS_PER_USER = int(os.getenv("MAX_QUEUED_JOBS_PER_USER", "20"))
+
+ACTIVE_STATUSES = ["queued", "running"]
+FINAL_STATUSES = ["done", "failed"]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def build_user_ai(user: dict, encryption: Encryption) -> tuple[bool, AI | str]:
+    """
+    Build an AI handler from a user's stored ai_config.
+
+    Returns:
+        (True, AI) on success, (False, error message) if no key is configured
+    """
+    ai_config = user.get("ai_config", {})
+    encrypted_key = ai_config.get("api_key", "")
+    ai_provider = ai_config.get("ai_provider", "OpenAI")
+
+    provider_class = AI.PROVIDERS.get(ai_provider)
+    if not encrypted_key and (provider_class is None or provider_class.REQUIRES_API_KEY):
+        return (False, "No API key configured. Please set up your API key in Profile.")
+
+    # Decrypt API key before using
+    api_key = encrypted_key
+    if encryption.is_encrypted(encrypted_key):
+        with stage("decrypt_key"):
+            api_key = await run_blocking(encryption.decrypt, encrypted_key)
+
+    # Client construction loads TLS context, keep it off the loop
+    with stage("build_client"):
+        ai = await run_blocking(AI, api_key=api_key, provider=ai_provider)
+    # Clients of providers that left the cache are closed here, on the loop that used them
+    await close_retired_providers()
+    return (True, ai)
+
+
+def forget_user_ai(ai_config: Optional[dict], encryption: Encryption) -> None:
+    """Drop the decrypted key and cached provider built from a user's previous ai_config."""
+    encrypted_key = (ai_config or {}).get("api_key", "")
+    if not encrypted_key:
+        return
+    api_key = encrypted_key
+    if encryption.is_encrypted(encrypted_key):
+        api_key = encryption.decrypt(encrypted_key)
+        encryption.forget(encrypted_key)
+    if api_key:
+        forget_provider(ai_config.get("ai_provider", "OpenAI"), api_key)
+
+
+class JobQueue:
+    """Mongo-backed queue of transcript processing jobs."""
+
+    def __init__(self) -> None:
+        database = Database("jobs")
+        self.jobs = database.get_async_collection()
+        self.users = Database("users").get_async_collection()
+        self.inputs = AsyncGridFSBucket(self.jobs.database, bucket_name="job_inputs")
+
+    async def ensure_indexes(self) -> None:
+        await self.jobs.create_index([("status", 1), ("run_after", 1)])
+        await self.jobs.create_index([("username", 1), ("status", 1)])
+
+    async def submit(
+        self,
+        username: str,
+        transcript_text: Optional[str] = None,
+        file_content: Optional[bytes] = None,
+        filename: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> tuple[bool, str]:
+        """
+        Queue a transcript or uploaded file for processing.
+        An upload can be given as bytes (file_content) or as a file on disk
+        (file_path), which is streamed into storage without loading it whole.
+
+        Returns:
+            (True, job_id) if queued, (False, error message) otherwise
+        """
+        job = {
+            "username": username,
+            "status": "queued",
+            "stage": "queued",
+            "attempts": 0,
+            "max_attempts": JOB_MAX_ATTEMPTS,
+            "run_after": _now(),
+            "created_at": _now(),
+            "updated_at": _now()
+        }
+
+        if file_content is not None or file_path is not None:
+            kind = detect_input_kind(filename or "")
+            if not kind:
+                return (False, "Unsupported file type")
+            job["kind"] = kind
+            job["filename"] = filename.lower()
+            if file_path is not None:
+                with open(file_path, "rb") as source:
+                    job["input_id"] = await self.inputs.upload_from_stream(filename, source)
+            else:
+                job["input_id"] = await self.inputs.upload_from_stream(filename, file_content)
+        elif transcript_text:
+            job["kind"] = "text"
+            job["text"] = transcript_text
+        else:
+            return (False, "No transcript or file provided")
+
+        result = await self.jobs.insert_one(job)
+
+        # Insert first and count after, so parallel submits can't all pass the check;
+        # only jobs queued before this one count against it
+        ahead = await self.jobs.count_documents({
+            "username": username,
+            "status": {"$in": ACTIVE_STATUSES},
+            "_id": {"$lte": result.inserted_id}
+        })
+        if ahead > MAX_QUEUED_JOBS_PER_USER:
+            await self.jobs.delete_one({"_id": result.inserted_id})
+            await self._drop_input(job)
+            return (False, f"You already have {ahead - 1} jobs in progress. Please wait for them to finish.")
+        return (True, str(result.inserted_id))
+
+    async def get(self, job_id: str, username: str) -> Optional[dict]:
+        """Return a job's public status, or None if it doesn't exist or belongs to another user."""
+        try:
+            oid = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return None
+        job = await self.jobs.find_one(
+            {"_id": oid, "username": username},
+            {"text": 0, "input_id": 0, "worker": 0}
+        )
+        if not job:
+            return None
+        return self._public(job)
+
+    @staticmethod
+    def _public(job: dict) -> dict:
+        status = {
+            "job_id": str(job["_id"]),
+            "status": job["status"],
+            "stage": job.get("stage"),
+            "attempts": job.get("attempts", 0),
+            "created_at": job["created_at"].isoformat(),
+            "updated_at": job["updated_at"].isoformat()
+        }
+        if job["status"] == "done":
+            status["result"] = job.get("result")
+        if job["status"] == "failed":
+            status["message"] = job.get("error", "Processing failed")
+        return status
+
+    async def _busy_users(self, now: datetime) -> list:
+        """Users who already have MAX_RUNNING_JOBS_PER_USER jobs running under a live lease."""
+        cursor = await self.jobs.aggregate([
+            {"$match": {"status": "running", "lease_expires_at": {"$gte": now}}},
+            {"$group": {"_id": "$username", "running": {"$sum": 1}}},
+            {"$match": {"running": {"$gte": MAX_RUNNING_JOBS_PER_USER}}}
+        ])
+        return [entry["_id"] async for entry in cursor]
+
+    async def claim(self, worker_id: str) -> Optional[dict]:
+        """
+        Atomically take the next runnable job, including ones whose worker lease expired.
+        Jobs of users already at MAX_RUNNING_JOBS_PER_USER are left in the queue.
+        """
+        now = _now()
+        job = await self.jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued", "run_after": {"$lte": now}},
+                    {"status": "running", "lease_expires_at": {"$lt": now}}
+                ],
+                "username": {"$nin": await self._busy_users(now)}
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    "claimed_at": now,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_after", 1)],
+            return_document=True
+        )
+        if job is None:
+            return None
+
+        # Another worker may have claimed a job of the same user in the meantime;
+        # the later claims give theirs back
+        running = await self.jobs.count_documents({
+            "username": job["username"],
+            "status": "running",
+            "lease_expires_at": {"$gte": now},
+            "claimed_at": {"$lte": now}
+        })
+        if running > MAX_RUNNING_JOBS_PER_USER:
+            await self.jobs.update_one(
+                {"_id": job["_id"], "worker": worker_id},
+                {"$set": {"status": "queued", "updated_at": _now()},
+                 "$unset": {"worker": "", "lease_expires_at": "", "claimed_at": ""},
+                 "$inc": {"attempts": -1}}
+            )
+            return None
+        return job
+
+    async def set_stage(self, job: dict, stage: str) -> None:
+        """Record progress and renew the lease."""
+        await self.jobs.update_one(
+            {"_id": job["_id"], "worker": job["worker"]},
+            {"$set": {
+                "stage": stage,
+                "lease_expires_at": _now() + timedelta(seconds=JOB_LEASE_SECONDS),
+                "updated_at": _now()
+            }}
+        )
+
+    async def renew_lease(self, job: dict) -> bool:
+        """Extend the lease; False if the job is no longer this worker's (its lease ran out and it was reclaimed)."""
+        result = await self.jobs.update_one(
+            {"_id": job["_id"], "worker": job["worker"], "status": "running"},
+            {"$set": {"lease_expires_at": _now() + timedelta(seconds=JOB_LEASE_SECONDS)}}
+        )
+        return result.matched_count > 0
+
+    async def complete(self, job: dict, result: dict) -> bool:
+        """Store the result; False (and nothing changed) if another worker owns the job now."""
+        update = await self.jobs.update_one(
+            {"_id": job["_id"], "worker": job["worker"], "status": "running"},
+            {"$set": {"status": "done", "stage": "done", "result": result, "updated_at": _now()},
+             "$unset": {"text": "", "lease_expires_at": ""}}
+        )
+        if not update.modified_count:
+            return False
+        await self._drop_input(job)
+        return True
+
+    async def fail(self, job: dict, error: str, retryable: bool = False) -> bool:
+        """
+        Mark a job failed, or put it back in the queue with backoff if the error is transient.
+        False (and nothing changed) if another worker owns the job now.
+        """
+        if retryable and job["attempts"] < job.get("max_attempts", JOB_MAX_ATTEMPTS):
+            delay = JOB_RETRY_BASE_SECONDS * (2 ** (job["attempts"] - 1))
+            logging.info(f"Job {job['_id']} attempt {job['attempts']} failed, retrying in {delay}s: {error}")
+            update = await self.jobs.update_one(
+                {"_id": job["_id"], "worker": job["worker"], "status": "running"},
+                {"$set": {
+                    "status": "queued",
+                    "stage": "retrying",
+                    "error": error,
+                    "run_after": _now() + timedelta(seconds=delay),
+                    "updated_at": _now()
+                },
+                 "$unset": {"lease_expires_at": ""}}
+            )
+            return update.modified_count > 0
+
+        update = await self.jobs.update_one(
+            {"_id": job["_id"], "worker": job["worker"], "status": "running"},
+            {"$set": {"status": "failed", "stage": "failed", "error": error, "updated_at": _now()},
+             "$unset": {"text": "", "lease_expires_at": ""}}
+        )
+        if not update.modified_count:
+            return False
+        # Only the owner drops the input; a new owner may be reading it
+        await self._drop_input(job)
+        return True
+
+    async def load_input(self, job: dict) -> bytes:
+        stream = await self.inputs.open_download_stream(job["input_id"])
+        return await stream.read()
+
+    async def spool_input(self, job: dict) -> SpooledUpload:
+        """Copy a job's stored upload to a local file, chunk by chunk."""
+        spooled = SpooledUpload(job["filename"])
+        try:
+            with open(spooled.path, "wb") as destination:
+                await self.inputs.download_to_stream(job["input_id"], destination)
+        except BaseException:
+            spooled.close()
+            raise
+        return spooled
+
+    async def _drop_input(self, job: dict) -> None:
+        if job.get("input_id"):
+            try:
+                await self.inputs.delete(job["input_id"])
+            except Exception as e:
+                logging.warning(f"Could not delete input for job {job['_id']}: {e}")
+
+
+class JobWorker:
+    """Claims jobs from a JobQueue and runs them through AI.ahandle_*."""
+
+    def __init__(self, queue: JobQueue, encryption: Encryption, usage: UsageAggregator) -> None:
+        self.queue = queue
+        self.encryption = encryption
+        self.usage = usage
+        self.archive = MinutesArchive()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def run_forever(self) -> None:
+        logging.info(f"Job worker {self.worker_id} started")
+        while True:
+            try:
+                job = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logging.error(f"Job worker {self.worker_id} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(JOB_POLL_SECONDS)
+                continue
+
+            try:
+                await self.run_job(job)
+            except Exception:
+                logging.exception(f"Job {job['_id']} crashed:")
+                try:
+                    await self.queue.fail(job, "Processing failed", retryable=False)
+                except Exception as e:
+                    # Its lease runs out and the job is claimed again, up to max_attempts
+                    logging.error(f"Job worker {self.worker_id} could not mark job {job['_id']} failed: {e}")
+
+    async def _keep_lease(self, job: dict) -> None:
+        """
+        Renew the job's lease until cancelled or the job is taken over; a renewal
+        that raises is retried at the next interval.
+        """
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                if not await self.queue.renew_lease(job):
+                    logging.warning(f"Job {job['_id']} was taken over by another worker")
+                    return
+            except Exception as e:
+                logging.warning(f"Could not renew the lease of job {job['_id']}: {e}")
+
+    async def run_job(self, job: dict) -> None:
+        # A job that keeps taking its worker down is reclaimed with attempts++ each time
+        if job["attempts"] > job.get("max_attempts", JOB_MAX_ATTEMPTS):
+            await self.queue.fail(job, "Processing failed")
+            return
+
+        user = await self.queue.users.find_one({"username": job["username"]}, {"ai_config": 1})
+        if not user:
+            await self.queue.fail(job, "User not found")
+            return
+
+        built = await build_user_ai(user, self.encryption)
+        if not built[0]:
+            await self.queue.fail(job, built[1])
+            return
+        ai = built[1]
+
+        async def progress(stage: str) -> None:
+            await self.queue.set_stage(job, stage)
+
+        lease = asyncio.create_task(self._keep_lease(job))
+        try:
+            if job["kind"] == "text":
+                result = await ai.ahandle_text(job["text"], progress)
+            elif job["kind"] == "txt":
+                result = await ai.ahandle_txt_file(await self.queue.load_input(job), progress)
+            else:
+                with await self.queue.spool_input(job) as spooled:
+                    result = await ai.ahandle_audio_path(spooled.path, job["filename"], progress)
+        finally:
+            lease.cancel()
+            for outcome in await asyncio.gather(lease, return_exceptions=True):
+                if outcome is not None and not isinstance(outcome, asyncio.CancelledError):
+                    logging.error(f"Lease renewal for job {job['_id']} stopped: {outcome!r}")
+
+        if not result.get("success"):
+            await self.queue.fail(job, result.get("error", "Processing failed"), result.get("retryable", False))
+            return
+
+        # A worker whose lease ran out must not record a result its job's new owner will record too
+        if not await self.queue.renew_lease(job):
+            logging.warning(f"Job {job['_id']} was taken over by another worker; dropping this result")
+            return
+        self.usage.record(job["username"], ai.provider_name, result)
+        minutes_id = await self.archive.save(job["username"], result, source="job")
+        await self.queue.complete(job, {
+            "minutes": result["minutes"],
+            "transcript": result.get("transcript", ""),
+            "transcript_length": result.get("transcript_length", 0),
+            "minutes_id": minutes_id
+        })
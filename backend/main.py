@@ -1,18 +1,122 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator, Awaitable, Callable
+import asyncio
+import base64
+import hmac
+import json
 import logging
 import os
-from datetime import datetime
-from database import Database
-from authentication import Authentication
-from ai import AI
-from pdf_generator import PDFGenerator
+from contextlib import asynccontextmanager
+from pymongo.errors import ServerSelectionTimeoutError
+from database import Database, init_clients, close_clients, aclose_clients, pool_metrics
+import concurrency
+import metrics
+from authentication import Authentication, AuthBusy, TooManyAttempts
+from dependencies import CurrentUser, authenticated, client_ip
+from ai import close_providers, detect_input_kind
+from ai_providers import cache as ai_cache
+from ai_providers.resilience import resilience_stats
+from jobs import JobQueue, JobWorker, build_user_ai, forget_user_ai, JOB_WORKERS, FINAL_STATUSES
+import pdf_templates
+from file_storage import FileStorage, InvalidCursor, FILES_PAGE_SIZE, parse_range
+from minutes_store import MinutesArchive, SEARCH_PAGE_SIZE
+from usage_stats import UsageAggregator
+from pdf_renderer import PDFRenderService, RendererBusy, RenderTimeout, PDF_BATCH_MAX_ITEMS
 from encryption import Encryption
-from fastapi import FastAPI, Body, File, UploadFile, Form, APIRouter
+from uploads import RequestTooLarge, UploadLimitMiddleware, UploadTooLarge, spool_upload, upload_limit, too_large_message
+from batch import BatchItem, InvalidBatch, collect_items, close_items, run_items
+from fastapi import FastAPI, Body, File, UploadFile, Form, APIRouter, Header, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response, JSONResponse, PlainTextResponse
+from urllib.parse import quote
 
 auth = Authentication()
 encryption = Encryption()
-app = FastAPI()
+file_storage = FileStorage()
+minutes_archive = MinutesArchive()
+usage = UsageAggregator()
+pdf_renderer = PDFRenderService()
+job_queue = None
+# The template catalog is static, so its response body is serialized once
+pdf_templates_body = json.dumps({"success": True, "templates": pdf_templates.get_templates()}).encode()
+
+
+INDEX_RETRY_MAX_SECONDS = 60
+# Bearer token the Prometheus scraper sends to /metrics; the endpoint is off when unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+async def ensure_indexes() -> None:
+    """
+    Create every index the app relies on, retrying the ones that fail until all exist.
+    Idempotent; each one is attempted even if another fails. Registration is refused
+    until the users indexes are in place (see Authentication.indexes_ready).
+    """
+    pending = [
+        ("users", auth.ensure_indexes),
+        ("jobs", job_queue.ensure_indexes),
+        ("minutes", minutes_archive.ensure_indexes),
+        ("usage", usage.ensure_indexes),
+        ("ai_cache", lambda: concurrency.run_blocking(ai_cache.ensure_indexes)),
+        ("pdfs", lambda: concurrency.run_blocking(file_storage.ensure_indexes)),
+        ("pdf_render_cache", lambda: concurrency.run_blocking(pdf_renderer.cache.ensure_indexes)),
+    ]
+    delay = 1
+    while True:
+        failed = []
+        for name, create in pending:
+            try:
+                await create()
+            except ServerSelectionTimeoutError as e:
+                logging.warning(f"Could not create indexes, database unreachable, retrying in {delay}s: {e}")
+                failed = pending
+                break
+            except Exception as e:
+                # E.g. existing duplicate users; these need fixing by hand before registration works again
+                logging.error(f"Could not create {name} indexes, retrying in {delay}s: {e}")
+                failed.append((name, create))
+        if not failed:
+            return
+        pending = failed
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, INDEX_RETRY_MAX_SECONDS)
+
+
+async def warm_up() -> None:
+    """Startup work that requests don't have to wait for: render styles and indexes."""
+    await concurrency.run_blocking(pdf_renderer.warm_up)
+    await ensure_indexes()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_queue
+    init_clients()
+    pdf_renderer.start()
+    job_queue = JobQueue()
+    # Serve requests right away; registration is refused until the unique users indexes exist
+    warm_up_task = asyncio.create_task(warm_up())
+    usage_flusher = asyncio.create_task(usage.run_forever())
+    workers = [
+        asyncio.create_task(JobWorker(job_queue, encryption, usage).run_forever())
+        for _ in range(JOB_WORKERS)
+    ]
+    yield
+    # Running jobs are picked up again by another worker once their lease expires
+    warm_up_task.cancel()
+    for worker in workers:
+        worker.cancel()
+    usage_flusher.cancel()
+    await asyncio.gather(warm_up_task, usage_flusher, *workers, return_exceptions=True)
+    # Write the usage counted since the last flush
+    await usage.flush()
+    await close_providers()
+    pdf_renderer.shutdown()
+    await aclose_clients()
+    close_clients()
+    concurrency.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 router = APIRouter()
 # CORS configuration
 # Allow local network IPs (192.168.x.x, 10.x.x.x, 172.16-31.x.x) for development
@@ -32,15 +136,59 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestMetricsMiddleware)
+app.add_middleware(UploadLimitMiddleware)
+
+@app.exception_handler(RequestTooLarge)
+async def request_too_large(request: Request, e: RequestTooLarge) -> JSONResponse:
+    return JSONResponse({"success": False, "message": e.detail}, status_code=413)
 
 @router.get("/")
 def read_root():
     return {"status": "ok"}
 
+@router.get("/metrics")
+def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Latency histograms and counters for this process, in the Prometheus text format:
+    MongoDB pool, AI and PDF caches, usage aggregation and provider circuit breakers.
+    Requires `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    if not METRICS_TOKEN:
+        return JSONResponse({"success": False, "message": "Not found"}, status_code=404)
+    if not hmac.compare_digest((authorization or "").encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return JSONResponse({"success": False, "message": "Invalid metrics token"}, status_code=401)
+    snapshots = [
+        ("minutes_mongodb_pool", pool_metrics.snapshot(), {}),
+        ("minutes_ai_cache", ai_cache.cache_stats(), {}),
+        ("minutes_pdf_render_cache", pdf_renderer.cache.stats(), {}),
+        ("minutes_usage", usage.stats(), {}),
+        *(("minutes_provider_breaker", stats, {"provider": name}) for name, stats in resilience_stats().items())
+    ]
+    return PlainTextResponse(metrics.render(snapshots), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # User authentication endpoints
+def _auth_limited_response(e: Exception) -> JSONResponse:
+    """429 for a throttled client or account, 503 when password hashing is saturated."""
+    if isinstance(e, TooManyAttempts):
+        return JSONResponse(
+            {"message": "Too many attempts. Please try again later."},
+            status_code=429,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return JSONResponse(
+        {"message": "Server is busy. Please try again in a moment."},
+        status_code=503,
+        headers={"Retry-After": "2"}
+    )
+
 @router.post("/login")
-def login_user(username: str = Form(...), password: str = Form(...)):
-    success = auth.login(username, password)
+async def login_user(request: Request, username: str = Form(...), password: str = Form(...)):
+    try:
+        success = await auth.login(username, password, client_ip=client_ip(request))
+    except (TooManyAttempts, AuthBusy) as e:
+        logging.info(f"User login attempt for {username}: rejected ({type(e).__name__})")
+        return _auth_limited_response(e)
     logging.info(f"User login attempt for {username}: {'successful' if success[0] else 'failed'}")
     if success[0]:
         return {"message": success[1]}
@@ -67,8 +215,11 @@ def verify_token(token: str):
 
 # User management endpoints
 @router.post("/create_user")
-def register_user(username: str = Form(...), password: str = Form(...), email: str = Form(...)):
-    success = auth.register(username, password, email)
+async def register_user(request: Request, username: str = Form(...), password: str = Form(...), email: str = Form(...)):
+    try:
+        success = await auth.register(username, password, email, client_ip=client_ip(request))
+    except (TooManyAttempts, AuthBusy) as e:
+        return _auth_limited_response(e)
     logging.info(f"User registration attempt for {username}: {'successful' if success[0] else 'failed'}")
     if success[0]:
         return {"message": f"User {username} registered successfully."}
@@ -76,27 +227,28 @@ def register_user(username: str = Form(...), password: str = Form(...), email: s
         return {"message": success[1]}
 
 @router.post("/get_user")
-def get_user(token: str):
-    verified = auth.verify_token(token)
-    if not verified[0]:
+async def get_user(current: CurrentUser = Depends(authenticated(("username", "email", "ai_config", "stats")))):
+    if not current.username:
         return {"message": "Invalid or expired token"}
 
-    username = verified[1]
-    db = Database("users").get_collection()
-    user = db.find_one({"username": username})
+    user = current.user
     if user:
         ai_config = user.get("ai_config", {"ai_provider": "OpenAI", "api_key": ""})
 
         # Decrypt API key before sending to client
         encrypted_key = ai_config.get("api_key", "")
         if encrypted_key and encryption.is_encrypted(encrypted_key):
-            ai_config["api_key"] = encryption.decrypt(encrypted_key)
+            ai_config["api_key"] = await concurrency.run_blocking(encryption.decrypt, encrypted_key)
 
         stats = user.get("stats", {
             "characters_processed": 0,
             "audio_seconds_processed": 0,
             "transcripts_generated": 0
         })
+        # Counted by this process but not flushed to the user document yet; read on the
+        # event loop, the only place the pending counters are changed
+        for field, value in usage.pending(current.username).items():
+            stats[field] = stats.get(field, 0) + value
         return {
             "username": user["username"],
             "email": user["email"],
@@ -107,20 +259,17 @@ def get_user(token: str):
         return {"message": "User not found"}
 
 @router.post("/update_user")
-def update_user(token: str, data: Dict[str, Any] = Body(...)):
-    verified = auth.verify_token(token)
-    if not verified[0]:
+def update_user(data: Dict[str, Any] = Body(...), current: CurrentUser = Depends(authenticated(()))):
+    if not current.username:
         return {"message": "Invalid or expired token"}
 
-    username = verified[1]
-    db = Database("users").get_collection()
-
-    user = db.find_one({"username": username})
-    if not user:
+    username = current.username
+    if not current.user:
         return {"message": "User not found"}
+    db = Database("users").get_collection()
 
     # Don't allow updating sensitive fields
-    protected_fields = ["username", "username_lower", "password", "_id"]
+    protected_fields = ["username", "username_lower", "password", "_id", "files"]
     update_data = {k: v for k, v in data.items() if k not in protected_fields}
 
     if not update_data:
@@ -132,117 +281,410 @@ def update_user(token: str, data: Dict[str, Any] = Body(...)):
         if api_key:  # Only encrypt non-empty keys
             update_data["ai_config"]["api_key"] = encryption.encrypt(api_key)
 
+    if "ai_config" in update_data:
+        # Fetch the old config in the same round trip so its cached key and client can be dropped
+        previous = db.find_one_and_update({"username": username}, {"$set": update_data}, projection={"ai_config": 1})
+        if previous is None:
+            return {"message": "Failed to update user"}
+        forget_user_ai(previous.get("ai_config"), encryption)
+        return {"message": "User updated successfully"}
+
     result = db.update_one({"username": username}, {"$set": update_data})
     if result.modified_count > 0 or result.matched_count > 0:
         return {"message": "User updated successfully"}
     else:
         return {"message": "Failed to update user"}
 
+@router.get("/usage")
+async def get_usage(days: int = 30, current: CurrentUser = Depends(authenticated())):
+    """The user's usage per UTC day and AI provider over the last `days` days."""
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    return {"success": True, "usage": await usage.report(current.username, days)}
+
 @router.post("/process_transcript")
 async def process_transcript(
-    token: str = Form(...),
     transcript_text: Optional[str] = Form(None),
-    file: Optional[UploadFile] = File(None)
+    file: Optional[UploadFile] = File(None),
+    current: CurrentUser = Depends(authenticated(("ai_config",), form=True))
 ):
-    # Verify token
-    verified = auth.verify_token(token)
-    if not verified[0]:
+    if not current.username:
         return {"success": False, "message": "Invalid or expired token"}
 
-    username = verified[1]
-
-    # Get user's API config
-    db = Database("users").get_collection()
-    user = db.find_one({"username": username})
+    username = current.username
+    user = current.user
     if not user:
         return {"success": False, "message": "User not found"}
 
-    ai_config = user.get("ai_config", {})
-    encrypted_key = ai_config.get("api_key", "")
-    ai_provider = ai_config.get("ai_provider", "OpenAI")
-
-    if not encrypted_key:
-        return {"success": False, "message": "No API key configured. Please set up your API key in Profile."}
-
-    # Decrypt API key before using
-    api_key = encrypted_key
-    if encryption.is_encrypted(encrypted_key):
-        api_key = encryption.decrypt(encrypted_key)
-
     # Initialize AI handler
-    ai = AI(api_key=api_key, provider=ai_provider)
+    built = await build_user_ai(user, encryption)
+    if not built[0]:
+        return {"success": False, "message": built[1]}
+    ai = built[1]
 
     # Handle file upload
     if file:
-        file_content = await file.read()
         filename = file.filename.lower()
+        kind = detect_input_kind(filename)
+        if not kind:
+            return {"success": False, "message": "Unsupported file type"}
 
-        # Handle text files
-        if filename.endswith('.txt'):
-            result = ai.handle_txt_file(file_content)
+        # Stream the upload to disk once; everything below reads that file
+        try:
+            spooled = await spool_upload(file, upload_limit(kind))
+        except UploadTooLarge:
+            return {"success": False, "message": too_large_message(kind)}
 
-        # Handle audio files
-        elif filename.endswith(('.mp3', '.wav', '.m4a', '.ogg', '.webm')):
-            result = ai.handle_audio_file(file_content, filename)
-        else:
-            return {"success": False, "message": "Unsupported file type"}
+        with spooled:
+            # Handle text files
+            if kind == "txt":
+                result = await ai.ahandle_txt_file(await concurrency.run_blocking(spooled.read_bytes))
+
+            # Handle audio files
+            else:
+                result = await ai.ahandle_audio_path(spooled.path, filename)
 
     # Handle text input
     elif transcript_text:
-        result = ai.handle_text(transcript_text)
+        result = await ai.ahandle_text(transcript_text)
     else:
         return {"success": False, "message": "No transcript or file provided"}
 
     # Return result
     if result.get("success"):
         # Update user statistics
-        transcript_length = result.get("transcript_length", 0)
-        audio_duration = result.get("audio_duration", 0)  # in seconds
-        
-        db.update_one(
-            {"username": username},
-            {
-                "$inc": {
-                    "stats.characters_processed": transcript_length,
-                    "stats.audio_seconds_processed": audio_duration,
-                    "stats.transcripts_generated": 1
-                }
-            }
-        )
-        
+        usage.record(username, ai.provider_name, result)
+        minutes_id = await minutes_archive.save(username, result, source="upload" if file else "text")
+
         return {
             "success": True,
             "minutes": result["minutes"],
             "transcript": result.get("transcript", ""),
-            "transcript_length": transcript_length
+            "transcript_length": result.get("transcript_length", 0),
+            "minutes_id": minutes_id
         }
     else:
         return {"success": False, "message": result.get("error", "Processing failed")}
 
 
+def _sse(event: dict) -> str:
+    """Format a pipeline event from AI.astream_* as a server-sent event."""
+    data = dict(event)
+    name = data.pop("event")
+    if name == "minutes":
+        data = {
+            "success": True,
+            "minutes": data["minutes"],
+            "transcript": data.get("transcript", ""),
+            "transcript_length": data.get("transcript_length", 0),
+            "minutes_id": data.get("minutes_id")
+        }
+    elif name == "error":
+        data = {"success": False, "message": data.get("error", "Processing failed"), "retryable": data.get("retryable", False)}
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its body and then awaits `cleanup` however the
+    response ends: streamed to the end, client gone, or never iterated at all.
+    (A BackgroundTask would be skipped when the client disconnects.)
+    """
+
+    def __init__(self, content: AsyncIterator, cleanup: Callable[[], Awaitable[None]], **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()
+            finally:
+                await self.cleanup()
+
+
+@router.post("/process_transcript/stream")
+async def process_transcript_stream(
+    transcript_text: Optional[str] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    current: CurrentUser = Depends(authenticated(("ai_config",), form=True))
+):
+    """
+    Same input as process_transcript, answered as server-sent events: "stage" as
+    the pipeline advances, "field" and "item" as parts of the minutes are written
+    by the model, then "minutes" (the process_transcript response) or "error".
+    Problems found before processing starts are returned as plain JSON.
+    """
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    username = current.username
+    user = current.user
+    if not user:
+        return {"success": False, "message": "User not found"}
+
+    built = await build_user_ai(user, encryption)
+    if not built[0]:
+        return {"success": False, "message": built[1]}
+    ai = built[1]
+
+    spooled = None
+    if file:
+        filename = file.filename.lower()
+        kind = detect_input_kind(filename)
+        if not kind:
+            return {"success": False, "message": "Unsupported file type"}
+
+        try:
+            spooled = await spool_upload(file, upload_limit(kind))
+        except UploadTooLarge:
+            return {"success": False, "message": too_large_message(kind)}
+
+        if kind == "txt":
+            with spooled:
+                events = ai.astream_txt_file(await concurrency.run_blocking(spooled.read_bytes))
+            spooled = None
+        else:
+            # The spooled file must outlive this handler; the response removes it when it ends
+            events = ai.astream_audio_path(spooled.path, filename)
+    elif transcript_text:
+        events = ai.astream_text(transcript_text)
+    else:
+        return {"success": False, "message": "No transcript or file provided"}
+
+    async def stream():
+        async for event in events:
+            if event["event"] == "minutes":
+                usage.record(username, ai.provider_name, event)
+                event["minutes_id"] = await minutes_archive.save(username, event, source="upload" if file else "text")
+            yield _sse(event)
+
+    async def cleanup():
+        try:
+            await events.aclose()
+        finally:
+            if spooled is not None:
+                await concurrency.run_blocking(spooled.close)
+
+    return ClosingStreamingResponse(stream(), cleanup, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/process_batch")
+async def process_batch(
+    files: list[UploadFile] = File(...),
+    pdf_template: Optional[str] = Form(None),
+    current: CurrentUser = Depends(authenticated(("ai_config",), form=True))
+):
+    """
+    Process many transcripts and audio files in one request: any number of
+    files and/or zip archives of them. The user is authenticated and the AI
+    client built once, then the items are processed BATCH_CONCURRENCY at a time.
+
+    The response is newline-delimited JSON: one {"event": "item"} line per item
+    as it finishes (in completion order; "index" gives its place in the batch),
+    then {"event": "done"} with the counts. With pdf_template set, each item's
+    minutes are also rendered and saved to the user's files as "<name>.pdf".
+    Problems with the batch as a whole are returned as plain JSON.
+    """
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    username = current.username
+    user = current.user
+    if not user:
+        return {"success": False, "message": "User not found"}
+
+    if pdf_template and pdf_template not in pdf_templates.TEMPLATES:
+        return {"success": False, "message": "Unknown PDF template"}
+
+    built = await build_user_ai(user, encryption)
+    if not built[0]:
+        return {"success": False, "message": built[1]}
+    ai = built[1]
+
+    try:
+        items, archives = await collect_items(files)
+    except InvalidBatch as e:
+        return {"success": False, "message": str(e)}
+    if not items:
+        return {"success": False, "message": "No transcripts or audio files in the batch"}
+
+    async def process(item: BatchItem) -> dict:
+        response = item.response()
+        if item.error:
+            return {**response, "success": False, "message": item.error}
+        try:
+            spooled = await item.open()
+        except UploadTooLarge:
+            return {**response, "success": False, "message": too_large_message(item.kind)}
+
+        try:
+            if item.kind == "txt":
+                result = await ai.ahandle_txt_file(await concurrency.run_blocking(spooled.read_bytes))
+            else:
+                result = await ai.ahandle_audio_path(spooled.path, os.path.basename(item.name).lower())
+        finally:
+            await concurrency.run_blocking(spooled.close)
+
+        if not result.get("success"):
+            return {
+                **response,
+                "success": False,
+                "message": result.get("error", "Processing failed"),
+                "retryable": result.get("retryable", False)
+            }
+
+        usage.record(username, ai.provider_name, result)
+        response.update({
+            "success": True,
+            "minutes": result["minutes"],
+            "transcript_length": result.get("transcript_length", 0),
+            "minutes_id": await minutes_archive.save(username, result, source="batch")
+        })
+
+        if pdf_template:
+            filename = os.path.splitext(os.path.basename(item.name))[0] + ".pdf"
+            try:
+                pdf_bytes = await pdf_renderer.arender(pdf_template, result["minutes"])
+                await concurrency.run_blocking(
+                    file_storage.save, username, filename, pdf_template,
+                    result["minutes"].get("title", "Meeting Minutes"), pdf_bytes
+                )
+                response["pdf_filename"] = filename
+            except RendererBusy:
+                response["pdf_error"] = "PDF generation is busy. Please create this PDF again later."
+            except RenderTimeout:
+                response["pdf_error"] = "PDF generation timed out"
+            except Exception as e:
+                logging.error(f"Batch PDF error for {filename}: {e!r}")
+                response["pdf_error"] = "Failed to generate PDF"
+        return response
+
+    results = run_items(items, process)
+
+    async def stream():
+        succeeded = 0
+        async for result in results:
+            succeeded += result["success"]
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"event": "done", "total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}) + "\n"
+
+    async def cleanup():
+        # Stop the items still running before their files are closed
+        try:
+            await results.aclose()
+        finally:
+            await close_items(items, archives)
+
+    return ClosingStreamingResponse(stream(), cleanup, media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/jobs")
+async def submit_job(
+    transcript_text: Optional[str] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    current: CurrentUser = Depends(authenticated(form=True))
+):
+    """Queue a transcript or file for background processing and return its job id."""
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    username = current.username
+    if file:
+        kind = detect_input_kind(file.filename or "")
+        if not kind:
+            return {"success": False, "message": "Unsupported file type"}
+        try:
+            spooled = await spool_upload(file, upload_limit(kind))
+        except UploadTooLarge:
+            return {"success": False, "message": too_large_message(kind)}
+        with spooled:
+            submitted = await job_queue.submit(username, filename=file.filename, file_path=spooled.path)
+    else:
+        submitted = await job_queue.submit(username, transcript_text=transcript_text)
+
+    if submitted[0]:
+        return {"success": True, "job_id": submitted[1]}
+    else:
+        return {"success": False, "message": submitted[1]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current: CurrentUser = Depends(authenticated())):
+    """Get a job's status, and its minutes once it is done."""
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    job = await job_queue.get(job_id, current.username)
+    if not job:
+        return {"success": False, "message": "Job not found"}
+    return {"success": True, **job}
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, current: CurrentUser = Depends(authenticated())):
+    """Server-sent events stream of a job's status until it finishes."""
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    username = current.username
+
+    async def events():
+        last = None
+        while True:
+            job = await job_queue.get(job_id, username)
+            if not job:
+                yield f"event: error\ndata: {json.dumps({'message': 'Job not found'})}\n\n"
+                return
+            state = (job["status"], job["stage"], job["attempts"])
+            if state != last:
+                last = state
+                yield f"event: status\ndata: {json.dumps(job)}\n\n"
+            if job["status"] in FINAL_STATUSES:
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @router.get("/pdf_templates")
 def get_pdf_templates():
     """Get available PDF templates."""
-    templates = PDFGenerator.get_templates()
-    return {"success": True, "templates": templates}
+    return Response(
+        content=pdf_templates_body,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
+
+
+def _b64(pdf_bytes: bytes) -> str:
+    with metrics.stage("base64_encode"):
+        return base64.b64encode(pdf_bytes).decode('utf-8')
+
+
+def _renderer_busy_response() -> JSONResponse:
+    return JSONResponse(
+        {"success": False, "message": "PDF generation is busy. Please try again in a moment."},
+        status_code=503,
+        headers={"Retry-After": "5"}
+    )
 
 
 @router.post("/create_pdf")
 def create_pdf(
-    token: str = Form(...),
     template: str = Form(...),
     minutes: str = Form(...),
-    filename: str = Form(...)
+    filename: str = Form(...),
+    current: CurrentUser = Depends(authenticated((), form=True))
 ):
     """Create PDF from minutes and store in user's files."""
-    import json
-    
-    # Verify token
-    verified = auth.verify_token(token)
-    if not verified[0]:
+    if not current.username:
         return {"success": False, "message": "Invalid or expired token"}
 
-    username = verified[1]
+    username = current.username
 
     # Parse minutes JSON
     try:
@@ -252,93 +694,226 @@ def create_pdf(
 
     # Generate PDF
     try:
-        generator = PDFGenerator(template=template)
-        pdf_base64 = generator.generate(minutes_data)
+        pdf_bytes = pdf_renderer.render(template, minutes_data)
+    except RendererBusy:
+        return _renderer_busy_response()
+    except RenderTimeout:
+        logging.error("PDF generation timed out")
+        return {"success": False, "message": "PDF generation timed out. Please try again."}
     except Exception as e:
         logging.error(f"PDF generation error: {e}")
         return {"success": False, "message": "Failed to generate PDF"}
 
-    # Store in user's files
-    db = Database("users").get_collection()
-    user = db.find_one({"username": username})
-    if not user:
+    if not current.user:
         return {"success": False, "message": "User not found"}
 
-    # Create file entry
-    file_entry = {
-        "filename": filename,
-        "template": template,
-        "created_at": datetime.utcnow().isoformat(),
-        "data": pdf_base64,
-        "title": minutes_data.get("title", "Meeting Minutes")
+    # Store in user's files
+    try:
+        file_storage.save(
+            username,
+            filename,
+            template,
+            minutes_data.get("title", "Meeting Minutes"),
+            pdf_bytes
+        )
+    except Exception as e:
+        logging.error(f"PDF storage error: {e}")
+        return {"success": False, "message": "Failed to save PDF"}
+
+    return {
+        "success": True, 
+        "message": "PDF created and saved successfully",
+        "pdf_data": _b64(pdf_bytes),
+        "filename": filename
     }
 
-    # Add to user's files array
-    result = db.update_one(
-        {"username": username},
-        {"$push": {"files": file_entry}}
-    )
 
-    if result.modified_count > 0 or result.matched_count > 0:
-        return {
-            "success": True, 
-            "message": "PDF created and saved successfully",
-            "pdf_data": pdf_base64,
-            "filename": filename
-        }
-    else:
-        return {"success": False, "message": "Failed to save PDF"}
+@router.post("/create_pdf_batch")
+def create_pdf_batch(
+    items: str = Form(...),
+    save: bool = Form(True),
+    current: CurrentUser = Depends(authenticated(form=True))
+):
+    """
+    Render several PDFs in one call, e.g. one minutes document in every template.
+    `items` is a JSON list of {"template", "minutes", "filename"} objects.
+    """
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    username = current.username
+
+    try:
+        batch = json.loads(items)
+        requests = [(item["template"], item["minutes"], item["filename"]) for item in batch]
+    except (json.JSONDecodeError, TypeError, KeyError):
+        return {"success": False, "message": "Invalid batch data"}
+    if not requests:
+        return {"success": False, "message": "No items to render"}
+    if len(requests) > PDF_BATCH_MAX_ITEMS:
+        return {"success": False, "message": f"A batch can contain at most {PDF_BATCH_MAX_ITEMS} items"}
+
+    try:
+        rendered = pdf_renderer.render_batch([(template, minutes) for template, minutes, _ in requests])
+    except RendererBusy:
+        return _renderer_busy_response()
+
+    results = []
+    for (template, minutes_data, filename), pdf_bytes in zip(requests, rendered):
+        if isinstance(pdf_bytes, Exception):
+            logging.error(f"PDF generation error for {filename}: {pdf_bytes!r}")
+            results.append({"success": False, "filename": filename, "message": "Failed to generate PDF"})
+            continue
+        if save:
+            try:
+                file_storage.save(username, filename, template, minutes_data.get("title", "Meeting Minutes"), pdf_bytes)
+            except Exception as e:
+                logging.error(f"PDF storage error for {filename}: {e}")
+                results.append({"success": False, "filename": filename, "message": "Failed to save PDF"})
+                continue
+        results.append({
+            "success": True,
+            "filename": filename,
+            "pdf_data": _b64(pdf_bytes)
+        })
+
+    return {"success": True, "results": results}
 
 
 @router.post("/get_user_files")
-def get_user_files(token: str):
-    """Get list of user's saved files (without the base64 data)."""
-    verified = auth.verify_token(token)
-    if not verified[0]:
+def get_user_files(
+    limit: int = FILES_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    order: str = "newest",
+    template: Optional[str] = None,
+    title_prefix: Optional[str] = None,
+    include_total: bool = False,
+    current: CurrentUser = Depends(authenticated(()))
+):
+    """
+    One page of the user's saved files (without the file data), newest first
+    unless order=oldest. Pass the returned next_cursor to get the next page.
+    """
+    if not current.username:
         return {"success": False, "message": "Invalid or expired token"}
 
-    username = verified[1]
-    db = Database("users").get_collection()
-    user = db.find_one({"username": username})
-
-    if not user:
+    if not current.user:
         return {"success": False, "message": "User not found"}
 
-    files = user.get("files", [])
-    # Return file info without the base64 data
-    file_list = [
-        {
-            "filename": f.get("filename"),
-            "template": f.get("template"),
-            "created_at": f.get("created_at"),
-            "title": f.get("title")
-        }
-        for f in files
-    ]
+    if order not in ("newest", "oldest"):
+        return {"success": False, "message": "Invalid order"}
+
+    try:
+        files, next_cursor = file_storage.list_files_page(
+            current.username, limit, cursor,
+            newest_first=order == "newest", template=template, title_prefix=title_prefix
+        )
+    except InvalidCursor:
+        return {"success": False, "message": "Invalid cursor"}
+
+    response = {"success": True, "files": files, "next_cursor": next_cursor}
+    if include_total:
+        response["total"] = file_storage.count_files(current.username)
+    return response
 
-    return {"success": True, "files": file_list}
+
+@router.post("/search_minutes")
+async def search_minutes(
+    q: str,
+    limit: int = SEARCH_PAGE_SIZE,
+    offset: int = 0,
+    current: CurrentUser = Depends(authenticated())
+):
+    """
+    Ranked full-text search over the user's generated minutes and transcripts.
+    Supports "quoted phrases" and -excluded words. Pass the returned next_offset
+    to get the next page.
+    """
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    if not q.strip():
+        return {"success": False, "message": "Search query is empty"}
+
+    results, next_offset = await minutes_archive.search(current.username, q, limit, offset)
+    return {"success": True, "results": results, "next_offset": next_offset}
+
+
+@router.post("/get_minutes")
+async def get_minutes(minutes_id: str, current: CurrentUser = Depends(authenticated())):
+    """Get archived minutes, with their transcript, by the id from search_minutes."""
+    if not current.username:
+        return {"success": False, "message": "Invalid or expired token"}
+
+    entry = await minutes_archive.get(current.username, minutes_id)
+    if not entry:
+        return {"success": False, "message": "Minutes not found"}
+    return {"success": True, **entry}
 
 
 @router.post("/get_file")
-def get_file(token: str, filename: str):
+def get_file(filename: str, current: CurrentUser = Depends(authenticated(()))):
     """Get a specific file's base64 data."""
-    verified = auth.verify_token(token)
-    if not verified[0]:
+    if not current.username:
         return {"success": False, "message": "Invalid or expired token"}
 
-    username = verified[1]
-    db = Database("users").get_collection()
-    user = db.find_one({"username": username})
-
-    if not user:
+    if not current.user:
         return {"success": False, "message": "User not found"}
 
-    files = user.get("files", [])
-    for f in files:
-        if f.get("filename") == filename:
-            return {"success": True, "data": f.get("data"), "filename": filename}
+    pdf_bytes = file_storage.read(current.username, filename)
+    if pdf_bytes is None:
+        return {"success": False, "message": "File not found"}
+
+    return {"success": True, "data": _b64(pdf_bytes), "filename": filename}
+
+
+@router.get("/files/{filename:path}/download")
+def download_file(
+    filename: str,
+    inline: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    current: CurrentUser = Depends(authenticated())
+):
+    """Stream a saved PDF as application/pdf, with ETag revalidation and Range support."""
+    if not current.username:
+        return JSONResponse({"success": False, "message": "Invalid or expired token"}, status_code=401)
+
+    grid_out = file_storage.open(current.username, filename)
+    if grid_out is None:
+        return JSONResponse({"success": False, "message": "File not found"}, status_code=404)
+
+    size = grid_out.length
+    etag = f'"{grid_out.metadata.get("sha256") or grid_out._id}"'
+    disposition = "inline" if inline else "attachment"
+    headers = {
+        "ETag": etag,
+        # Filenames aren't unique and nothing makes a stored PDF immutable, so clients
+        # revalidate with the ETag every time; the token in the URL keeps this out of shared caches
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"{disposition}; filename*=UTF-8''{quote(filename)}"
+    }
+
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        grid_out.close()
+        return Response(status_code=304, headers=headers)
+
+    if range_header:
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            grid_out.close()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            FileStorage.iter_range(grid_out, start, end - start + 1),
+            status_code=206, media_type="application/pdf", headers=headers
+        )
 
-    return {"success": False, "message": "File not found"}
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(FileStorage.iter_range(grid_out, 0, size), media_type="application/pdf", headers=headers)
 
 
 app.include_router(router, prefix="/api")
\ No newline at end of file
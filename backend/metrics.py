@@ -0,0 +1,269 @@
+"""
+In-process metrics in the Prometheus text format, served by GET /metrics.
+
+Counters, gauges and histograms are plain dicts behind a lock, updated in
+place: an observation is a bisect and two additions, cheap enough to leave on
+for every request. Histograms cover each pipeline stage (token check, user
+lookup, key decrypt, duration probe, transcription, minutes, JSON parse, PDF
+build, base64), every provider and MongoDB call, and HTTP requests by route.
+Counters kept elsewhere (pool, caches, breakers, usage) are added as gauges
+when the endpoint renders.
+
+Each process has its own registry; worker.py processes aren't scraped.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0
+)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[tuple[str, dict, float]]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A running total."""
+
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. requests in flight."""
+
+    TYPE = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels) -> Iterator[None]:
+        """Count the block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets, with their sum and count."""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # One count per bucket, plus +Inf; then the sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _samples(self) -> Iterator[tuple[str, dict, float]]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+STAGE_SECONDS = Histogram(
+    "minutes_stage_duration_seconds", "Time spent in each stage of request processing.", ("stage",)
+)
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "minutes_provider_request_duration_seconds", "AI provider call latency.", ("provider", "operation", "outcome")
+)
+PROVIDER_IN_FLIGHT = Gauge(
+    "minutes_provider_requests_in_flight", "AI provider calls currently running.", ("provider", "operation")
+)
+PROVIDER_TOKENS = Counter(
+    "minutes_provider_tokens_total", "Tokens reported by AI providers.", ("provider", "model", "kind")
+)
+MONGODB_COMMAND_SECONDS = Histogram(
+    "minutes_mongodb_command_duration_seconds", "MongoDB command latency.", ("command", "outcome")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "minutes_http_request_duration_seconds",
+    "Time until the response headers were sent, by route.",
+    ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = Gauge("minutes_http_requests_in_flight", "HTTP requests currently being handled.")
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as one pipeline stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+@contextmanager
+def provider_call(provider: str, operation: str) -> Iterator[None]:
+    """Time an AI provider call, counting it in flight while it runs and labelling it ok or error."""
+    labels = {"provider": provider, "operation": operation}
+    PROVIDER_IN_FLIGHT.inc(**labels)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        PROVIDER_IN_FLIGHT.dec(**labels)
+        PROVIDER_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome=outcome, **labels)
+
+
+def count_tokens(provider: str, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    PROVIDER_TOKENS.inc(prompt_tokens or 0, provider=provider, model=model, kind="prompt")
+    PROVIDER_TOKENS.inc(completion_tokens or 0, provider=provider, model=model, kind="completion")
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request until its response headers are
+    sent, labelled with the route template (not the raw path, which would give
+    a label per file name or job id).
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        def observe(status: int) -> None:
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=getattr(route, "path", "unmatched"), status=status
+            )
+
+        async def send_observed(message) -> None:
+            if message["type"] == "http.response.start" and not observed:
+                observe(message["status"])
+            await send(message)
+
+        with HTTP_IN_FLIGHT.track():
+            try:
+                await self.app(scope, receive, send_observed)
+            finally:
+                if not observed:
+                    observe(500)
+
+
+def _snapshot_lines(snapshots: Iterable[tuple[str, dict, dict]]) -> list[str]:
+    """
+    Gauges for counters kept as dicts elsewhere (e.g. cache_stats()). Numbers
+    become <prefix>_<key>; a string value becomes <prefix>_<key>{<key>="value"} 1.
+    """
+    samples: dict[str, list[tuple[dict, float]]] = {}
+    for prefix, stats, labels in snapshots:
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                continue
+            if isinstance(value, str):
+                samples.setdefault(f"{prefix}_{key}", []).append(({**labels, key: value}, 1))
+            else:
+                samples.setdefault(f"{prefix}_{key}", []).append((labels, value))
+
+    lines = []
+    for name, values in samples.items():
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in values:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+def render(snapshots: Iterable[tuple[str, dict, dict]] = ()) -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+
+    Args:
+        snapshots: (metric name prefix, stats dict, labels) for counters kept outside this module
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_snapshot_lines(snapshots))
+    return "\n".join(lines) + "\n"
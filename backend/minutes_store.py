@@ -0,0 +1,143 @@
+"""
+Searchable archive of generated minutes.
+
+Every successful run (process_transcript, its streaming variant and queued
+jobs) stores the structured minutes and the transcript in the "minutes"
+collection. A compound text index with the username as its prefix answers
+searches from the inverted index alone: only the caller's entries for the
+query terms are read, ranked by MongoDB's textScore, with titles and summaries
+weighted above discussion details and the raw transcript.
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from database import Database
+
+MINUTES_ARCHIVE_ENABLED = os.getenv("MINUTES_ARCHIVE_ENABLED", "true").lower() == "true"
+# Transcripts longer than this are stored (and searchable) up to this many characters
+MINUTES_TRANSCRIPT_MAX_CHARS = int(os.getenv("MINUTES_TRANSCRIPT_MAX_CHARS", "1000000"))
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 50
+# Deep offsets cost a scan of every better-ranked match; past this, refine the query instead
+SEARCH_MAX_OFFSET = 1000
+
+TEXT_WEIGHTS = {
+    "minutes.title": 10,
+    "minutes.summary": 5,
+    "minutes.discussion_points.topic": 4,
+    "minutes.decisions": 3,
+    "minutes.action_items.task": 3,
+    "minutes.discussion_points.details": 2,
+    "minutes.next_steps": 2,
+    "transcript": 1
+}
+
+
+class MinutesArchive:
+    """Stores minutes with their transcripts and runs ranked text searches over a user's archive."""
+
+    def __init__(self) -> None:
+        self._collection = None
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = Database("minutes").get_async_collection()
+        return self._collection
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index(
+            [("username", 1)] + [(field, "text") for field in TEXT_WEIGHTS],
+            weights=TEXT_WEIGHTS,
+            name="minutes_text"
+        )
+        await self.collection.create_index([("username", 1), ("created_at", -1)])
+
+    async def save(self, username: str, result: dict, source: str) -> Optional[str]:
+        """
+        Archive a successful AI result (the dict returned by AI.ahandle_*).
+        Failures are logged, not raised: the caller already has its minutes.
+
+        Returns:
+            The archive id, or None if archiving is disabled or failed
+        """
+        if not MINUTES_ARCHIVE_ENABLED:
+            return None
+        transcript = result.get("transcript", "")
+        try:
+            inserted = await self.collection.insert_one({
+                "username": username,
+                "created_at": datetime.now(timezone.utc),
+                "source": source,
+                "minutes": result["minutes"],
+                "transcript": transcript[:MINUTES_TRANSCRIPT_MAX_CHARS],
+                "transcript_length": result.get("transcript_length", len(transcript)),
+                "audio_duration": result.get("audio_duration", 0)
+            })
+        except Exception as e:
+            logging.warning(f"Could not archive minutes for {username}: {e}")
+            return None
+        return str(inserted.inserted_id)
+
+    async def search(
+        self,
+        username: str,
+        query: str,
+        limit: int = SEARCH_PAGE_SIZE,
+        offset: int = 0
+    ) -> tuple[list[dict], Optional[int]]:
+        """
+        A page of the user's archived minutes matching query, best match first.
+
+        Returns:
+            (results, next_offset); next_offset is None on the last page
+        """
+        limit = max(1, min(limit, SEARCH_PAGE_MAX))
+        offset = max(0, min(offset, SEARCH_MAX_OFFSET))
+        score = {"$meta": "textScore"}
+        cursor = self.collection.find(
+            {"username": username, "$text": {"$search": query}},
+            {
+                "score": score, "created_at": 1, "source": 1,
+                "minutes.title": 1, "minutes.summary": 1, "minutes.date": 1
+            }
+        ).sort([("score", score), ("created_at", -1)]).skip(offset).limit(limit + 1)
+        entries = await cursor.to_list(limit + 1)
+
+        results = [
+            {
+                "id": str(entry["_id"]),
+                "title": entry.get("minutes", {}).get("title"),
+                "summary": entry.get("minutes", {}).get("summary"),
+                "date": entry.get("minutes", {}).get("date"),
+                "created_at": entry["created_at"].isoformat(),
+                "source": entry.get("source"),
+                "score": round(entry["score"], 3)
+            }
+            for entry in entries[:limit]
+        ]
+        next_offset = offset + limit if len(entries) > limit and offset + limit <= SEARCH_MAX_OFFSET else None
+        return results, next_offset
+
+    async def get(self, username: str, minutes_id: str) -> Optional[dict]:
+        """One archived entry of the user's, or None if it doesn't exist."""
+        try:
+            object_id = ObjectId(minutes_id)
+        except (InvalidId, TypeError):
+            return None
+        entry = await self.collection.find_one({"_id": object_id, "username": username})
+        if not entry:
+            return None
+        return {
+            "id": str(entry["_id"]),
+            "minutes": entry["minutes"],
+            "transcript": entry.get("transcript", ""),
+            "transcript_length": entry.get("transcript_length", 0),
+            "created_at": entry["created_at"].isoformat(),
+            "source": entry.get("source")
+        }
+
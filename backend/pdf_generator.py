@@ -6,39 +6,51 @@ from reportlab.lib.colors import HexColor
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, KeepTogether
 from reportlab.lib.units import inch
 from reportlab.lib import colors
-from datetime import datetime
 import html
+from typing import Optional
+import threading
+from pdf_templates import GENERATOR_VERSION, TEMPLATES, resolve_template, get_templates, generation_date
 
 
 class PDFGenerator:
     """Generate PDF documents from meeting minutes data."""
     
-    TEMPLATES = {
-        "professional": {
-            "name": "Professional",
-            "description": "Clean, corporate-style layout",
-            "primary_color": "#1a1a2e",
-            "accent_color": "#0acaff"
-        },
-        "minimal": {
-            "name": "Minimal",
-            "description": "Simple, distraction-free design",
-            "primary_color": "#333333",
-            "accent_color": "#666666"
-        },
-        "modern": {
-            "name": "Modern",
-            "description": "Bold headers with vibrant accents",
-            "primary_color": "#2d3748",
-            "accent_color": "#48bb78"
-        }
-    }
+    VERSION = GENERATOR_VERSION
+    TEMPLATES = TEMPLATES
+
+    # Compiled (stylesheet, action item table style) per template, built once and
+    # shared read-only by every generator and thread
+    _compiled_styles: dict = {}
+    _compiled_styles_lock = threading.Lock()
 
     def __init__(self, template: str = "professional"):
         self.template = template
-        self.template_config = self.TEMPLATES.get(template, self.TEMPLATES["professional"])
-        self.styles = getSampleStyleSheet()
-        self._setup_styles()
+        template_id = self.resolve_template(template)
+        self.template_config = self.TEMPLATES[template_id]
+        self.styles, self.table_style = self._get_compiled_styles(template_id)
+
+    @staticmethod
+    def resolve_template(template: str) -> str:
+        """Template id actually used for a requested template (unknown ids fall back to professional)."""
+        return resolve_template(template)
+
+    @classmethod
+    def _get_compiled_styles(cls, template_id: str) -> tuple:
+        compiled = cls._compiled_styles.get(template_id)
+        if compiled is None:
+            with cls._compiled_styles_lock:
+                compiled = cls._compiled_styles.get(template_id)
+                if compiled is None:
+                    config = cls.TEMPLATES[template_id]
+                    compiled = (cls._build_styles(config), cls._build_table_style(config))
+                    cls._compiled_styles[template_id] = compiled
+        return compiled
+
+    @classmethod
+    def preload_styles(cls) -> None:
+        """Compile every template's styles up front, e.g. at application startup."""
+        for template_id in cls.TEMPLATES:
+            cls._get_compiled_styles(template_id)
 
     def _escape_html(self, text: str) -> str:
         """Escape HTML special characters to prevent formatting issues."""
@@ -46,14 +58,16 @@ class PDFGenerator:
             return ""
         return html.escape(str(text))
 
-    def _setup_styles(self):
-        """Setup custom styles based on template."""
-        primary = HexColor(self.template_config["primary_color"])
-        accent = HexColor(self.template_config["accent_color"])
+    @staticmethod
+    def _build_styles(template_config: dict):
+        """Build the stylesheet with custom styles for a template."""
+        styles = getSampleStyleSheet()
+        primary = HexColor(template_config["primary_color"])
+        accent = HexColor(template_config["accent_color"])
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomTitle',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=22,
             textColor=primary,
             spaceAfter=16,
@@ -63,9 +77,9 @@ class PDFGenerator:
             wordWrap='CJK'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomHeading',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=13,
             textColor=accent,
             spaceBefore=14,
@@ -75,9 +89,9 @@ class PDFGenerator:
             wordWrap='CJK'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='CustomBody',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=10,
             textColor=primary,
             spaceAfter=6,
@@ -86,9 +100,9 @@ class PDFGenerator:
             wordWrap='CJK'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='BulletItem',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=10,
             textColor=primary,
             spaceAfter=4,
@@ -98,9 +112,9 @@ class PDFGenerator:
             wordWrap='CJK'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='TopicTitle',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=10,
             textColor=primary,
             spaceAfter=2,
@@ -110,9 +124,9 @@ class PDFGenerator:
             wordWrap='CJK'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='TopicDetails',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=10,
             textColor=HexColor("#555555"),
             spaceAfter=8,
@@ -122,9 +136,9 @@ class PDFGenerator:
             wordWrap='CJK'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='MetaInfo',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=9,
             textColor=HexColor("#666666"),
             spaceAfter=3,
@@ -132,14 +146,33 @@ class PDFGenerator:
             wordWrap='CJK'
         ))
         
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='TableCell',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=9,
             textColor=HexColor("#1a1a2e"),
             leading=12,
             wordWrap='CJK'
         ))
+        return styles
+
+    @staticmethod
+    def _build_table_style(template_config: dict) -> TableStyle:
+        """Table style for the action items table."""
+        accent = HexColor(template_config["accent_color"])
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), accent),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 8),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), HexColor("#f8f9fc")),
+            ('GRID', (0, 0), (-1, -1), 0.5, HexColor("#e0e3eb")),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [HexColor("#ffffff"), HexColor("#f8f9fc")]),
+        ])
 
     def generate(self, minutes: dict) -> str:
         """
@@ -151,6 +184,19 @@ class PDFGenerator:
         Returns:
             Base64 encoded PDF string
         """
+        return base64.b64encode(self.generate_bytes(minutes)).decode('utf-8')
+
+    def generate_bytes(self, minutes: dict, generated_on: Optional[str] = None) -> bytes:
+        """
+        Generate PDF from minutes data.
+        
+        Args:
+            minutes: Dictionary containing meeting minutes data
+            generated_on: Date printed in the footer, today if not given
+            
+        Returns:
+            Raw PDF bytes
+        """
         buffer = BytesIO()
         doc = SimpleDocTemplate(
             buffer,
@@ -226,20 +272,7 @@ class PDFGenerator:
             
             # Adjust column widths for better text wrapping
             table = Table(table_data, colWidths=[3.8*inch, 1.3*inch, 1.0*inch])
-            accent = HexColor(self.template_config["accent_color"])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), accent),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('TOPPADDING', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('LEFTPADDING', (0, 0), (-1, -1), 8),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-                ('BACKGROUND', (0, 1), (-1, -1), HexColor("#f8f9fc")),
-                ('GRID', (0, 0), (-1, -1), 0.5, HexColor("#e0e3eb")),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [HexColor("#ffffff"), HexColor("#f8f9fc")]),
-            ]))
+            table.setStyle(self.table_style)
             story.append(table)
         
         # Next Steps
@@ -253,23 +286,19 @@ class PDFGenerator:
         # Footer with generation info
         story.append(Spacer(1, 24))
         story.append(Paragraph(
-            f"<i>Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</i>",
+            f"<i>Generated on {self._escape_html(generated_on or generation_date())}</i>",
             self.styles['MetaInfo']
         ))
         
         # Build PDF
         doc.build(story)
         
-        # Get PDF bytes and convert to base64
         pdf_bytes = buffer.getvalue()
         buffer.close()
         
-        return base64.b64encode(pdf_bytes).decode('utf-8')
+        return pdf_bytes
 
     @classmethod
     def get_templates(cls) -> list:
         """Return list of available templates."""
-        return [
-            {"id": key, **value}
-            for key, value in cls.TEMPLATES.items()
-        ]
+        return get_templates()
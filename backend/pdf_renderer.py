@@ -0,0 +1,345 @@
+"""
+PDF rendering off the request path.
+
+ReportLab layout is CPU-bound and holds the GIL, so PDFs are rendered in a
+pool of worker processes. At most PDF_RENDER_MAX_PENDING renders may be queued
+or running; beyond that callers get RendererBusy (mapped to HTTP 503) instead
+of piling up work. Each render is waited on for at most
+PDF_RENDER_TIMEOUT_SECONDS; a render still running after that holds its worker
+until the worker is killed, so the pool is then replaced (renders running in
+the old pool at that moment fail with BrokenProcessPool).
+
+Finished PDFs are cached by a canonical hash of the minutes, the template,
+pdf_templates.GENERATOR_VERSION and the date printed in the footer, in memory and
+in the "pdf_render_cache" collection, so an identical request on the same day is
+answered without laying the document out again.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from bson import Binary
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pdf_templates import GENERATOR_VERSION, generation_date, resolve_template
+from database import Database
+from concurrency import run_blocking
+from ttl_cache import TTLCache
+from metrics import STAGE_SECONDS
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(os.cpu_count() or 2, 4))))
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", "32"))
+PDF_RENDER_TIMEOUT_SECONDS = float(os.getenv("PDF_RENDER_TIMEOUT_SECONDS", "30"))
+PDF_BATCH_MAX_ITEMS = int(os.getenv("PDF_BATCH_MAX_ITEMS", "20"))
+PDF_RENDER_CACHE_ENTRIES = int(os.getenv("PDF_RENDER_CACHE_ENTRIES", "64"))
+PDF_RENDER_CACHE_TTL_SECONDS = int(os.getenv("PDF_RENDER_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# Leave headroom under the 16 MB document limit
+_MAX_CACHED_PDF_BYTES = 15 * 1024 * 1024
+
+
+class RendererBusy(Exception):
+    """The render queue is full; the caller should retry later."""
+
+
+class RenderTimeout(Exception):
+    """A render did not finish within the timeout."""
+
+
+def _init_worker() -> None:
+    from pdf_generator import PDFGenerator
+    PDFGenerator.preload_styles()
+
+
+def _render(template: str, minutes: dict, generated_on: str) -> tuple[bytes, float]:
+    """
+    Runs in a worker process (or inline when there are none). Returns the PDF and
+    the seconds ReportLab took, since the worker's own metrics aren't scraped.
+    """
+    # ReportLab is only loaded where PDFs are actually rendered
+    from pdf_generator import PDFGenerator
+    started = time.perf_counter()
+    pdf_bytes = PDFGenerator(template=template).generate_bytes(minutes, generated_on)
+    return pdf_bytes, time.perf_counter() - started
+
+
+def _observe_render(future: Future, submitted: float) -> None:
+    """Record a finished render: the ReportLab build, and the total including time queued for a worker."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    STAGE_SECONDS.observe(future.result()[1], stage="pdf_build")
+    STAGE_SECONDS.observe(time.perf_counter() - submitted, stage="pdf_render")
+
+
+def render_key(template: str, minutes: dict, generated_on: str) -> str:
+    """Canonical hash of everything that determines a rendered PDF, including its footer date."""
+    canonical = json.dumps(minutes, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    parts = [GENERATOR_VERSION, resolve_template(template), generated_on, canonical]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """Rendered PDFs by render_key: an in-memory LRU in front of a Mongo collection with a TTL index."""
+
+    def __init__(self) -> None:
+        self.memory = TTLCache(PDF_RENDER_CACHE_ENTRIES, PDF_RENDER_CACHE_TTL_SECONDS)
+        self.counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "errors": 0}
+        self._collection = None
+        self._collection_checked = False
+
+    def _get_collection(self):
+        if not self._collection_checked:
+            try:
+                self._collection = Database("pdf_render_cache").get_collection()
+            except ValueError:
+                self._collection = None
+            self._collection_checked = True
+        return self._collection
+
+    def ensure_indexes(self) -> None:
+        collection = self._get_collection()
+        if collection is not None:
+            collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def get(self, key: str) -> Optional[bytes]:
+        pdf_bytes = self.memory.get(key)
+        if pdf_bytes is not None:
+            self.counters["memory_hits"] += 1
+            return pdf_bytes
+
+        collection = self._get_collection()
+        if collection is not None:
+            try:
+                entry = collection.find_one({"_id": key}, {"data": 1})
+            except Exception as e:
+                self.counters["errors"] += 1
+                logging.warning(f"PDF render cache read failed: {e}")
+                entry = None
+            if entry:
+                self.counters["persistent_hits"] += 1
+                pdf_bytes = bytes(entry["data"])
+                self.memory.set(key, pdf_bytes)
+                return pdf_bytes
+
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, pdf_bytes: bytes) -> None:
+        self.memory.set(key, pdf_bytes)
+        collection = self._get_collection()
+        if collection is None or len(pdf_bytes) > _MAX_CACHED_PDF_BYTES:
+            return
+        try:
+            collection.replace_one({"_id": key}, {
+                "data": Binary(pdf_bytes),
+                "created_at": datetime.now(timezone.utc),
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=PDF_RENDER_CACHE_TTL_SECONDS)
+            }, upsert=True)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logging.warning(f"PDF render cache write failed: {e}")
+
+    def stats(self) -> dict:
+        return {**self.counters, "memory_entries": len(self.memory)}
+
+
+class PDFRenderService:
+    """Bounded process pool for PDFGenerator.generate_bytes."""
+
+    def __init__(
+        self,
+        workers: int = PDF_RENDER_WORKERS,
+        max_pending: int = PDF_RENDER_MAX_PENDING,
+        timeout: float = PDF_RENDER_TIMEOUT_SECONDS
+    ) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.cache = RenderCache()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # spawn rather than fork: the API process has Mongo client threads running
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker
+                    )
+        return self._pool
+
+    def start(self) -> None:
+        """Start the worker processes ahead of the first render."""
+        if self.workers > 0:
+            self._get_pool()
+
+    def warm_up(self) -> None:
+        """Load ReportLab and compile styles in this process, if renders run inline here."""
+        if self.workers == 0:
+            _init_worker()
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def _recycle_pool(self) -> None:
+        """
+        Replace the pool after a render timed out while running: a process pool
+        can't cancel a running call, so its worker is killed to free it and its slot.
+        """
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        logging.warning("PDF render timed out; restarting the render workers")
+        processes = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def _submit_to_pool(self, template: str, minutes: dict, generated_on: str) -> Future:
+        pool = self._get_pool()
+        try:
+            return pool.submit(_render, template, minutes, generated_on)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool once
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            return self._get_pool().submit(_render, template, minutes, generated_on)
+
+    def _submit(self, templates_and_minutes: list[tuple[str, dict]], generated_on: str) -> list:
+        """Reserve a slot per render, all or nothing, and submit them."""
+        acquired = 0
+        for _ in templates_and_minutes:
+            if not self._slots.acquire(blocking=False):
+                for _ in range(acquired):
+                    self._slots.release()
+                raise RendererBusy()
+            acquired += 1
+
+        futures = []
+        try:
+            for template, minutes in templates_and_minutes:
+                submitted = time.perf_counter()
+                if self.workers > 0:
+                    future = self._submit_to_pool(template, minutes, generated_on)
+                else:
+                    # No worker processes configured: render in the calling thread
+                    future = Future()
+                    try:
+                        future.set_result(_render(template, minutes, generated_on))
+                    except Exception as e:
+                        future.set_exception(e)
+                # The slot is held until the render really finishes, even if the caller gave up waiting
+                future.add_done_callback(lambda _: self._slots.release())
+                futures.append(future)
+                future.add_done_callback(lambda done, submitted=submitted: _observe_render(done, submitted))
+        except BaseException:
+            # The pool refused a render: drop the ones already queued, the caller never sees them
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            # Slots of the renders that were never submitted
+            for _ in range(len(templates_and_minutes) - len(futures)):
+                self._slots.release()
+        return futures
+
+    def _collect(self, futures: list, finished: set) -> list:
+        results = []
+        stuck = False
+        for future in futures:
+            if future not in finished:
+                # Queued renders are dropped; one that already started can only be stopped with its worker
+                if not future.cancel() and not future.done():
+                    stuck = True
+                results.append(RenderTimeout())
+            elif future.cancelled():
+                results.append(RenderTimeout())
+            elif future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result()[0])
+        if stuck:
+            self._recycle_pool()
+        return results
+
+    @staticmethod
+    def _missing(keys: list[str], found: dict) -> dict:
+        """Index of the first item for each key not in the cache; identical items are rendered once."""
+        missing = {}
+        for index, key in enumerate(keys):
+            if found[key] is None and key not in missing:
+                missing[key] = index
+        return missing
+
+    def render_batch(self, items: list[tuple[str, dict]]) -> list:
+        """
+        Render several (template, minutes) pairs concurrently, blocking the calling thread.
+        Items already in the render cache, and repeats within the batch, are not rendered again.
+
+        Returns:
+            One entry per item: the PDF bytes, or the exception that item raised
+            (RenderTimeout if it didn't finish in time). RendererBusy is raised up
+            front if the uncached items don't fit in the queue.
+        """
+        # One date for the whole batch, so its key and footer always agree
+        generated_on = generation_date()
+        keys = [render_key(template, minutes, generated_on) for template, minutes in items]
+        found = {key: self.cache.get(key) for key in set(keys)}
+        missing = self._missing(keys, found)
+        if missing:
+            futures = self._submit([items[index] for index in missing.values()], generated_on)
+            finished, _ = wait(futures, timeout=self.timeout)
+            for key, result in zip(missing, self._collect(futures, finished)):
+                if isinstance(result, bytes):
+                    self.cache.put(key, result)
+                found[key] = result
+        return [found[key] for key in keys]
+
+    async def arender_batch(self, items: list[tuple[str, dict]]) -> list:
+        """Async variant of render_batch."""
+        # One date for the whole batch, so its key and footer always agree
+        generated_on = generation_date()
+        keys = [render_key(template, minutes, generated_on) for template, minutes in items]
+        found = await run_blocking(lambda: {key: self.cache.get(key) for key in set(keys)})
+        missing = self._missing(keys, found)
+        if missing:
+            # Off the loop: inline renders (PDF_RENDER_WORKERS=0) run right here, and
+            # submitting may have to start the worker processes
+            futures = await run_blocking(self._submit, [items[index] for index in missing.values()], generated_on)
+            await asyncio.wait([asyncio.wrap_future(future) for future in futures], timeout=self.timeout)
+            rendered = self._collect(futures, {future for future in futures if future.done()})
+            for key, result in zip(missing, rendered):
+                if isinstance(result, bytes):
+                    await run_blocking(self.cache.put, key, result)
+                found[key] = result
+        return [found[key] for key in keys]
+
+    def render(self, template: str, minutes: dict) -> bytes:
+        """Render one PDF. Raises RendererBusy, RenderTimeout or the render's own error."""
+        result = self.render_batch([(template, minutes)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def arender(self, template: str, minutes: dict) -> bytes:
+        """Async variant of render."""
+        result = (await self.arender_batch([(template, minutes)]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
@@ -0,0 +1,51 @@
+"""
+PDF template catalog.
+
+Kept apart from pdf_generator so the API process can list templates and key the
+render cache without importing ReportLab; only processes that actually render
+load it.
+"""
+
+from datetime import datetime
+
+# Bump whenever the layout or styles change, so cached renders are not reused
+GENERATOR_VERSION = "2"
+
+TEMPLATES = {
+    "professional": {
+        "name": "Professional",
+        "description": "Clean, corporate-style layout",
+        "primary_color": "#1a1a2e",
+        "accent_color": "#0acaff"
+    },
+    "minimal": {
+        "name": "Minimal",
+        "description": "Simple, distraction-free design",
+        "primary_color": "#333333",
+        "accent_color": "#666666"
+    },
+    "modern": {
+        "name": "Modern",
+        "description": "Bold headers with vibrant accents",
+        "primary_color": "#2d3748",
+        "accent_color": "#48bb78"
+    }
+}
+
+
+def resolve_template(template: str) -> str:
+    """Template id actually used for a requested template (unknown ids fall back to professional)."""
+    return template if template in TEMPLATES else "professional"
+
+
+def get_templates() -> list:
+    """Return list of available templates."""
+    return [
+        {"id": key, **value}
+        for key, value in TEMPLATES.items()
+    ]
+
+
+def generation_date() -> str:
+    """Today's date as printed in the "Generated on" footer."""
+    return datetime.now().strftime("%B %d, %Y")
@@ -0,0 +1,11 @@
+"""
+The backend is a flat set of modules run from its own directory; make them
+importable the same way when pytest is started from anywhere.
+
+    python -m pytest backend/tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,234 @@
+"""
+In-memory stand-in for the few pymongo collection methods the backend uses,
+enough to test query and update logic without a MongoDB server. Supports
+equality, dotted paths (with array indexes), $or, $in, $nin, $exists,
+$lt/$lte/$gt/$gte and $regex in filters, and $set, $unset and $inc in
+updates (with upsert).
+"""
+
+import copy
+import re
+from types import SimpleNamespace
+from bson import ObjectId
+
+_MISSING = object()
+
+
+def _get(document: dict, path: str):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list) and part.isdigit():
+            if int(part) >= len(value):
+                return _MISSING
+            value = value[int(part)]
+        elif isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set(document: dict, path: str, value) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[last] = value
+
+
+def _unset(document: dict, path: str) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.get(part, {})
+    document.pop(last, None)
+
+
+def _compare(value, condition) -> bool:
+    if not isinstance(condition, dict) or not any(key.startswith("$") for key in condition):
+        if value is _MISSING:
+            return condition is None
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$in":
+            matched = value is not _MISSING and value in operand
+        elif operator == "$nin":
+            matched = value is _MISSING or value not in operand
+        elif operator == "$exists":
+            matched = (value is not _MISSING) == bool(operand)
+        elif operator == "$regex":
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            matched = isinstance(value, str) and re.search(operand, value, flags) is not None
+        elif operator == "$options":
+            matched = True
+        elif value is _MISSING or value is None:
+            matched = False
+        elif operator == "$lt":
+            matched = value < operand
+        elif operator == "$lte":
+            matched = value <= operand
+        elif operator == "$gt":
+            matched = value > operand
+        elif operator == "$gte":
+            matched = value >= operand
+        else:
+            raise NotImplementedError(operator)
+        if not matched:
+            return False
+    return True
+
+
+def matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+        elif not _compare(_get(document, key), condition):
+            return False
+    return True
+
+
+def _apply(document: dict, update: dict) -> None:
+    for path, value in update.get("$set", {}).items():
+        _set(document, path, copy.deepcopy(value))
+    for path in update.get("$unset", {}):
+        _unset(document, path)
+    for path, amount in update.get("$inc", {}).items():
+        current = _get(document, path)
+        _set(document, path, (0 if current is _MISSING else current) + amount)
+
+
+class FakeCursor:
+    def __init__(self, documents: list) -> None:
+        self.documents = documents
+
+    def sort(self, keys) -> "FakeCursor":
+        for path, direction in reversed(keys):
+            self.documents.sort(key=lambda document: _get(document, path), reverse=direction < 0)
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None) -> list:
+        return self.documents[:length]
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+
+class FakeCollection:
+    """Synchronous collection over a list of documents."""
+
+    def __init__(self, documents: list = ()) -> None:
+        self.documents = [copy.deepcopy(document) for document in documents]
+
+    def _find(self, query: dict) -> list:
+        return [document for document in self.documents if matches(document, query)]
+
+    def _insert(self, document: dict):
+        document.setdefault("_id", ObjectId())
+        self.documents.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    def insert_one(self, document: dict):
+        return self._insert(document)
+
+    def find(self, query: dict = None, projection: dict = None) -> FakeCursor:
+        return FakeCursor([copy.deepcopy(document) for document in self._find(query or {})])
+
+    def find_one(self, query: dict = None, projection: dict = None, sort=None):
+        cursor = self.find(query, projection)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor), None)
+
+    def count_documents(self, query: dict) -> int:
+        return len(self._find(query))
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False):
+        found = self._find(query)
+        if not found:
+            if upsert:
+                document = {key: value for key, value in query.items() if not key.startswith("$")}
+                _apply(document, update)
+                self._insert(document)
+            return SimpleNamespace(matched_count=0, modified_count=0)
+        before = copy.deepcopy(found[0])
+        _apply(found[0], update)
+        return SimpleNamespace(matched_count=1, modified_count=int(found[0] != before))
+
+    def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        found = self._find(query)
+        if found:
+            replacement = {"_id": found[0]["_id"], **replacement}
+            self.documents[self.documents.index(found[0])] = copy.deepcopy(replacement)
+        elif upsert:
+            self._insert({**{key: value for key, value in query.items() if not key.startswith("$")}, **replacement})
+        return SimpleNamespace(matched_count=len(found[:1]))
+
+    def find_one_and_update(self, query: dict, update: dict, sort=None, return_document=False):
+        found = FakeCursor(self._find(query)).sort(sort or []).documents
+        if not found:
+            return None
+        before = copy.deepcopy(found[0])
+        _apply(found[0], update)
+        return copy.deepcopy(found[0] if return_document else before)
+
+    def delete_one(self, query: dict):
+        found = self._find(query)
+        if found:
+            self.documents.remove(found[0])
+        return SimpleNamespace(deleted_count=len(found[:1]))
+
+    def aggregate(self, pipeline: list) -> FakeCursor:
+        documents = [copy.deepcopy(document) for document in self.documents]
+        for step in pipeline:
+            (operator, spec), = step.items()
+            if operator == "$match":
+                documents = [document for document in documents if matches(document, spec)]
+            elif operator == "$group":
+                groups = {}
+                for document in documents:
+                    key = _get(document, spec["_id"].lstrip("$"))
+                    group = groups.setdefault(key, {"_id": key})
+                    for field, accumulator in spec.items():
+                        if field != "_id":
+                            group[field] = group.get(field, 0) + accumulator["$sum"]
+                documents = list(groups.values())
+            else:
+                raise NotImplementedError(operator)
+        return FakeCursor(documents)
+
+
+class AsyncFakeCollection(FakeCollection):
+    """The same collection with the awaitable methods of pymongo's AsyncCollection."""
+
+    async def insert_one(self, document: dict):
+        return super().insert_one(document)
+
+    async def find_one(self, query: dict = None, projection: dict = None, sort=None):
+        return super().find_one(query, projection, sort)
+
+    async def count_documents(self, query: dict) -> int:
+        return super().count_documents(query)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        return super().update_one(query, update, upsert)
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        return super().replace_one(query, replacement, upsert)
+
+    async def find_one_and_update(self, query: dict, update: dict, sort=None, return_document=False):
+        return super().find_one_and_update(query, update, sort, return_document)
+
+    async def delete_one(self, query: dict):
+        return super().delete_one(query)
+
+    async def aggregate(self, pipeline: list) -> FakeCursor:
+        return super().aggregate(pipeline)
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from ai_providers import cache
+from ai_providers.base import BaseProvider
+from ai_providers.cache import CachedProvider
+from fake_mongo import AsyncFakeCollection
+from ttl_cache import TTLCache
+
+MINUTES = {"title": "Sync", "summary": "Short"}
+
+
+class CountingProvider(BaseProvider):
+    CHAT_MODEL = "chat-1"
+    TRANSCRIPTION_MODEL = "whisper-1"
+
+    def __init__(self, api_key):
+        super().__init__(api_key)
+        self.calls = []
+
+    async def atranscribe_audio(self, file_content, filename):
+        self.calls.append("transcribe")
+        return f"text of {len(file_content)} bytes"
+
+    async def acomplete_json(self, system_prompt, user_prompt, max_tokens):
+        self.calls.append("minutes")
+        return dict(MINUTES)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = AsyncFakeCollection()
+    monkeypatch.setattr(cache, "_collections", {"async": collection})
+    monkeypatch.setattr(cache, "_memory", TTLCache(16, 60))
+    monkeypatch.setattr(cache, "_counters", {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "errors": 0})
+    return collection
+
+
+def test_repeated_minutes_are_computed_once(collection):
+    inner = CountingProvider("key")
+    provider = CachedProvider(inner)
+    first = asyncio.run(provider.agenerate_minutes("same transcript"))
+    first["title"] = "Changed by the caller"
+    second = asyncio.run(provider.agenerate_minutes("same transcript"))
+    assert second["title"] == "Sync"
+    assert inner.calls == ["minutes"]
+    assert cache.cache_stats()["memory_hits"] == 1
+
+
+def test_results_are_not_shared_across_api_keys(collection):
+    ana, bo = CountingProvider("ana-key"), CountingProvider("bo-key")
+    asyncio.run(CachedProvider(ana).agenerate_minutes("same transcript"))
+    asyncio.run(CachedProvider(bo).agenerate_minutes("same transcript"))
+    assert ana.calls == ["minutes"] and bo.calls == ["minutes"]
+
+
+def test_file_and_bytes_share_a_transcript(collection, tmp_path):
+    inner = CountingProvider("key")
+    provider = CachedProvider(inner)
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"\0" * 32)
+    assert asyncio.run(provider.atranscribe_audio(b"\0" * 32, "a.wav")) == "text of 32 bytes"
+    assert asyncio.run(provider.atranscribe_audio_file(str(path), "a.wav")) == "text of 32 bytes"
+    assert inner.calls == ["transcribe"]
+
+
+def test_persistent_tier_answers_after_a_restart(collection, monkeypatch):
+    asyncio.run(CachedProvider(CountingProvider("key")).agenerate_minutes("same transcript"))
+    assert len(collection.documents) == 1
+
+    monkeypatch.setattr(cache, "_memory", TTLCache(16, 60))
+    inner = CountingProvider("key")
+    assert asyncio.run(CachedProvider(inner).agenerate_minutes("same transcript")) == MINUTES
+    assert inner.calls == []
+    assert cache.cache_stats()["persistent_hits"] == 1
+
+
+def test_expired_entries_are_recomputed(collection, monkeypatch):
+    asyncio.run(CachedProvider(CountingProvider("key")).agenerate_minutes("same transcript"))
+    collection.documents[0]["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    monkeypatch.setattr(cache, "_memory", TTLCache(16, 60))
+    inner = CountingProvider("key")
+    asyncio.run(CachedProvider(inner).agenerate_minutes("same transcript"))
+    assert inner.calls == ["minutes"]
@@ -0,0 +1,32 @@
+import asyncio
+
+from batch import BatchItem, run_items
+
+
+def _run(items, process, concurrency=2):
+    async def collect():
+        return [result async for result in run_items(items, process, concurrency)]
+    return asyncio.run(collect())
+
+
+def test_every_item_yields_one_result():
+    items = [BatchItem(index, f"item{index}.txt", "txt") for index in range(5)]
+
+    async def process(item):
+        await asyncio.sleep(0.001 * (5 - item.index))
+        return {**item.response(), "success": True}
+
+    results = _run(items, process)
+    assert sorted(result["index"] for result in results) == list(range(5))
+
+
+def test_crashed_item_keeps_the_item_shape():
+    items = [BatchItem(0, "ok.txt", "txt"), BatchItem(1, "bad.txt", "txt")]
+
+    async def process(item):
+        if item.index == 1:
+            raise RuntimeError("boom")
+        return {**item.response(), "success": True}
+
+    crashed = next(result for result in _run(items, process) if result["index"] == 1)
+    assert crashed == {"event": "item", "index": 1, "name": "bad.txt", "success": False, "message": "Processing failed"}
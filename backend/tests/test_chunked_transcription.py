@@ -0,0 +1,64 @@
+import asyncio
+import os
+
+import pytest
+
+import ai
+from ai import AI
+from ai_providers.base import BaseProvider
+from ttl_cache import TTLCache
+
+events = []
+
+
+class ChunkProvider(BaseProvider):
+    REMOTE = True
+
+    async def atranscribe_audio_file(self, path, filename):
+        if filename == "chunk_0.wav":
+            await asyncio.sleep(0)
+            raise TimeoutError("chunk 0 timed out")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append(("cancelled", filename, os.path.exists(path)))
+            raise
+        return filename
+
+    async def atranscribe_audio(self, file_content, filename):
+        return ""
+
+    async def acomplete_json(self, system_prompt, user_prompt, max_tokens):
+        return {}
+
+
+def fake_chunks(source_path, filename, duration, work_dir):
+    paths = []
+    for index in range(3):
+        path = os.path.join(work_dir, f"chunk_{index}.wav")
+        with open(path, "wb") as chunk:
+            chunk.write(b"\0")
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture(autouse=True)
+def chunked(monkeypatch):
+    events.clear()
+    monkeypatch.setitem(AI.PROVIDERS, "Chunks", ChunkProvider)
+    monkeypatch.setattr(ai, "AI_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai, "_providers", TTLCache(4, 60, on_evict=ai._retire))
+    monkeypatch.setattr(ai, "TRANSCRIBE_CONCURRENCY", 3)
+    monkeypatch.setattr(ai, "needs_segmentation", lambda size, duration: True)
+    monkeypatch.setattr(ai, "_prepare_chunks", fake_chunks)
+
+
+def test_failed_chunk_cancels_the_others_before_cleanup(tmp_path):
+    path = tmp_path / "long.wav"
+    path.write_bytes(b"\0" * 16)
+    handler = AI("key", provider="Chunks")
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(handler._atranscribe(str(path), "long.wav", 7200.0))
+    # Both pending chunks were stopped while their files still existed
+    assert sorted(events) == [("cancelled", "chunk_1.wav", True), ("cancelled", "chunk_2.wav", True)]
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import ai
+import concurrency
+from ai import AI
+from ai_providers.base import BaseProvider
+from concurrency import run_blocking
+from ttl_cache import TTLCache
+
+threads = []
+
+
+class SlowSyncProvider(BaseProvider):
+    """A provider whose SDK blocks, offloaded the way BaseProvider asks."""
+
+    REMOTE = False
+
+    async def atranscribe_audio(self, file_content, filename):
+        return await run_blocking(self._transcribe, file_content)
+
+    def _transcribe(self, file_content):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return "we agreed to ship on friday"
+
+    async def acomplete_json(self, system_prompt, user_prompt, max_tokens):
+        return {"title": "Ship date"}
+
+
+@pytest.fixture(autouse=True)
+def provider(monkeypatch):
+    threads.clear()
+    monkeypatch.setitem(AI.PROVIDERS, "SlowSync", SlowSyncProvider)
+    monkeypatch.setattr(ai, "AI_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai, "_providers", TTLCache(4, 60, on_evict=ai._retire))
+
+    def duration(path):
+        threads.append(threading.current_thread().name)
+        return 42.0
+
+    monkeypatch.setattr(ai, "get_file_duration", duration)
+
+
+async def _with_heartbeat(work):
+    """Run work while counting how often the loop gets to run another task."""
+    ticks = 0
+    done = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal ticks
+        while not done.is_set():
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    beating = asyncio.create_task(heartbeat())
+    try:
+        return await work, ticks
+    finally:
+        done.set()
+        await beating
+
+
+def test_run_blocking_passes_arguments_and_uses_the_pool():
+    def call(a, b=0):
+        return a + b, threading.current_thread().name
+
+    total, name = asyncio.run(run_blocking(call, 1, b=2))
+    assert total == 3
+    assert name.startswith("blocking")
+
+
+def test_pending_calls_are_capped(monkeypatch):
+    running = []
+    peak = []
+
+    def work():
+        running.append(1)
+        peak.append(len(running))
+        time.sleep(0.05)
+        running.pop()
+
+    async def main():
+        monkeypatch.setattr(concurrency, "_pending", asyncio.Semaphore(2))
+        await asyncio.gather(*(run_blocking(work) for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) == 2
+
+
+def test_audio_pipeline_keeps_the_loop_responsive():
+    handler = AI("key", provider="SlowSync")
+    result, ticks = asyncio.run(_with_heartbeat(handler.ahandle_audio_file(b"\0" * 16, "call.wav")))
+
+    assert result["success"]
+    assert result["minutes"] == {"title": "Ship date"}
+    assert result["audio_duration"] == 42.0
+    # The 0.2 s transcription ran on a pool thread while other tasks kept running
+    assert all(name.startswith("blocking") for name in threads) and len(threads) == 2
+    assert ticks >= 10
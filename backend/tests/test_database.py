@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+import database
+from database import Database, close_clients
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    # Clients connect lazily, so nothing is contacted at this address
+    monkeypatch.setenv("MONGODB_CONNECTION", "mongodb://127.0.0.1:1")
+    monkeypatch.setenv("MONGODB_DATABASE", "test")
+    monkeypatch.setattr(database, "_clients", {})
+    yield
+    close_clients()
+
+
+def test_every_database_shares_one_client():
+    users, jobs = Database("users"), Database("jobs")
+    assert users.get_client() is jobs.get_client()
+    assert users.get_collection().name == "users"
+    assert jobs.get_collection().name == "jobs"
+    assert len(database._clients) == 1
+
+
+def test_client_is_created_once_under_concurrency():
+    barrier = threading.Barrier(8)
+    clients = []
+
+    def create():
+        barrier.wait()
+        clients.append(Database("users").get_client())
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(client) for client in clients}) == 1
+
+
+def test_close_connection_leaves_the_shared_client_open():
+    first = Database("users")
+    first.close_connection()
+    assert Database("jobs").get_client() is first.get_client()
+
+    close_clients()
+    assert database._clients == {}
+    assert Database("users").get_client() is not first.get_client()
+
+
+def test_missing_configuration_is_an_error(monkeypatch):
+    monkeypatch.setenv("MONGODB_CONNECTION", "")
+    with pytest.raises(ValueError):
+        Database("users")
@@ -0,0 +1,84 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import dependencies
+from dependencies import CurrentUser, authenticated
+from fake_mongo import AsyncFakeCollection
+
+
+class CountingUsers(AsyncFakeCollection):
+    def __init__(self, documents):
+        super().__init__(documents)
+        self.lookups = []
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        self.lookups.append(projection)
+        return await super().find_one(query, projection, sort)
+
+
+class FakeDatabase:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_async_collection(self):
+        return self.collection
+
+
+@pytest.fixture
+def users(monkeypatch):
+    users = CountingUsers([{"username": "ana", "email": "ana@example.com", "ai_config": {}}])
+    monkeypatch.setattr(dependencies, "Database", lambda name: FakeDatabase(users))
+    monkeypatch.setattr(dependencies.auth, "verify_token", lambda token: (True, token) if token != "bad" else (False, None))
+    return users
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/one")
+    async def one(current: CurrentUser = Depends(authenticated(("email",)))):
+        return {"username": current.username, "user": current.user and current.user["username"]}
+
+    @app.get("/two")
+    async def two(
+        wide: CurrentUser = Depends(authenticated(("email", "ai_config"))),
+        narrow: CurrentUser = Depends(authenticated(("email",))),
+        exists: CurrentUser = Depends(authenticated(()))
+    ):
+        return {"same": wide.user is narrow.user is exists.user}
+
+    @app.get("/token_only")
+    async def token_only(current: CurrentUser = Depends(authenticated())):
+        return {"username": current.username, "user": current.user}
+
+    return TestClient(app)
+
+
+def test_bad_token_has_no_username(users):
+    assert _client().get("/one", params={"token": "bad"}).json() == {"username": None, "user": None}
+    assert users.lookups == []
+
+
+def test_unknown_user_is_none(users):
+    assert _client().get("/one", params={"token": "bo"}).json() == {"username": "bo", "user": None}
+
+
+def test_user_is_loaded_once_per_request(users):
+    assert _client().get("/two", params={"token": "ana"}).json() == {"same": True}
+    assert users.lookups == [{"email": 1, "ai_config": 1}]
+
+
+def test_each_request_loads_the_user_again(users):
+    client = _client()
+    for _ in range(2):
+        assert client.get("/one", params={"token": "ana"}).json() == {"username": "ana", "user": "ana"}
+    assert users.lookups == [{"email": 1}, {"email": 1}]
+    # A user removed since is seen as removed on the next request
+    users.documents.clear()
+    assert client.get("/one", params={"token": "ana"}).json() == {"username": "ana", "user": None}
+
+
+def test_no_fields_skips_the_lookup(users):
+    assert _client().get("/token_only", params={"token": "ana"}).json() == {"username": "ana", "user": None}
+    assert users.lookups == []
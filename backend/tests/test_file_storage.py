@@ -0,0 +1,144 @@
+import base64
+import copy
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+import file_storage
+from fake_mongo import FakeCollection
+from file_storage import FileStorage, InvalidCursor, _decode_cursor, _encode_cursor, parse_range
+
+
+def test_cursor_round_trip():
+    file_id = ObjectId()
+    cursor = _encode_cursor({"_id": file_id, "metadata": {"created_at": "2024-05-01T10:00:00"}})
+    assert "=" not in cursor
+    assert _decode_cursor(cursor) == ("2024-05-01T10:00:00", file_id)
+
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor!",
+    _raw_cursor("just a string"),
+    _raw_cursor(["2024-05-01", "not-an-object-id"]),
+    _raw_cursor(["2024-05-01", str(ObjectId()), "extra"]),
+    _raw_cursor([{"$gt": ""}, str(ObjectId())]),
+    _raw_cursor(["2024-05-01", 12])
+])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        _decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    ("bytes=0-99", 1000, (0, 99)),
+    ("bytes=100-", 1000, (100, 999)),
+    ("bytes=900-5000", 1000, (900, 999)),
+    ("bytes=-100", 1000, (900, 999)),
+    ("bytes=-5000", 1000, (0, 999)),
+    (" bytes=0-0 ", 1000, (0, 0)),
+    ("bytes=1000-", 1000, None),
+    ("bytes=50-10", 1000, None),
+    ("bytes=-0", 1000, None),
+    ("bytes=-", 1000, None),
+    ("bytes=0-1,5-9", 1000, None),
+    ("items=0-1", 1000, None),
+    ("bytes=-10", 0, None)
+])
+def test_parse_range(header, size, expected):
+    assert parse_range(header, size) == expected
+
+
+class FakeBucket:
+    """GridFS bucket writing files documents to a fake pdfs.files collection."""
+
+    def __init__(self, files, fail_on=None):
+        self.files = files
+        self.fail_on = fail_on
+        self.data = {}
+
+    def upload_from_stream(self, filename, data, metadata=None):
+        if filename == self.fail_on:
+            raise ConnectionError("lost the connection")
+        file_id = self.files.insert_one({"filename": filename, "metadata": metadata, "uploadDate": datetime.utcnow()}).inserted_id
+        self.data[file_id] = data
+        return file_id
+
+
+class FakeDatabase:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_collection(self):
+        return self.collection
+
+
+def _users_with_embedded_files():
+    return FakeCollection([
+        {"_id": ObjectId(), "username": "ana", "files": [
+            {"filename": "a.pdf", "template": "minimal", "title": "A", "data": base64.b64encode(b"%PDF-a").decode(),
+             "created_at": "2024-05-01T10:00:00"},
+            {"filename": "b.pdf", "template": "minimal", "title": "B", "data": base64.b64encode(b"%PDF-b").decode()}
+        ]},
+        {"_id": ObjectId(), "username": "bo", "files": [
+            {"filename": "a.pdf", "template": "professional", "title": "Bo", "data": base64.b64encode(b"%PDF-c").decode()}
+        ]},
+        {"_id": ObjectId(), "username": "cy"}
+    ])
+
+
+def _storage(monkeypatch, users, fail_on=None) -> FileStorage:
+    monkeypatch.setattr(file_storage, "Database", lambda name: FakeDatabase(users))
+    storage = FileStorage()
+    storage._files = FakeCollection()
+    storage._bucket = FakeBucket(storage._files, fail_on)
+    return storage
+
+
+def test_migrate_moves_embedded_files_once(monkeypatch):
+    users = _users_with_embedded_files()
+    storage = _storage(monkeypatch, users)
+
+    assert storage.migrate_embedded_files() == 3
+    assert all("files" not in user for user in users.documents)
+    stored = sorted((f["metadata"]["username"], f["filename"]) for f in storage.files.documents)
+    assert stored == [("ana", "a.pdf"), ("ana", "b.pdf"), ("bo", "a.pdf")]
+    assert sorted(storage.bucket.data.values()) == [b"%PDF-a", b"%PDF-b", b"%PDF-c"]
+
+    assert storage.migrate_embedded_files() == 0
+    assert len(storage.files.documents) == 3
+
+
+def test_interrupted_migration_resumes_without_duplicates(monkeypatch):
+    users = _users_with_embedded_files()
+    storage = _storage(monkeypatch, users, fail_on="b.pdf")
+    with pytest.raises(ConnectionError):
+        storage.migrate_embedded_files()
+    # ana's array stays until all of her files are stored
+    assert "files" in users.find_one({"username": "ana"})
+
+    storage._bucket.fail_on = None
+    assert storage.migrate_embedded_files() == 2
+    stored = sorted((f["metadata"]["username"], f["filename"]) for f in storage.files.documents)
+    assert stored == [("ana", "a.pdf"), ("ana", "b.pdf"), ("bo", "a.pdf")]
+
+
+def _dates(storage: FileStorage) -> list:
+    return sorted(f["metadata"]["created_at"] for f in storage.files.documents)
+
+
+def test_undated_files_get_the_same_date_on_every_run(monkeypatch):
+    users = _users_with_embedded_files()
+    before = copy.deepcopy(users.documents)
+    first = _storage(monkeypatch, users)
+    first.migrate_embedded_files()
+
+    second = _storage(monkeypatch, FakeCollection(before))
+    second.migrate_embedded_files()
+    assert _dates(first) == _dates(second)
@@ -0,0 +1,214 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+import jobs
+from jobs import JobQueue, JobWorker
+from fake_mongo import AsyncFakeCollection
+
+
+class FakeBucket:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete(self, file_id):
+        self.deleted.append(file_id)
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue.__new__(JobQueue)
+    queue.jobs = AsyncFakeCollection()
+    queue.users = AsyncFakeCollection([{"username": "alice", "ai_config": {}}])
+    queue.inputs = FakeBucket()
+    return queue
+
+
+def stored(queue, job_id):
+    return next(job for job in queue.jobs.documents if str(job["_id"]) == str(job_id))
+
+
+def expire_lease(queue, job_id):
+    job = stored(queue, job_id)
+    job["lease_expires_at"] = jobs._now() - timedelta(seconds=1)
+
+
+def submit(queue, username="alice", text="transcript"):
+    ok, job_id = asyncio.run(queue.submit(username, transcript_text=text))
+    assert ok, job_id
+    return job_id
+
+
+def test_claim_takes_the_oldest_runnable_job(queue):
+    first = submit(queue)
+    second = submit(queue)
+    stored(queue, first)["run_after"] = jobs._now() + timedelta(minutes=5)
+
+    job = asyncio.run(queue.claim("w1"))
+    assert str(job["_id"]) == second
+    assert job["status"] == "running"
+    assert job["worker"] == "w1"
+    assert job["attempts"] == 1
+    # The other job isn't due yet
+    assert asyncio.run(queue.claim("w2")) is None
+
+
+def test_expired_lease_is_reclaimed_and_the_old_owner_is_shut_out(queue):
+    job_id = submit(queue)
+    stale = asyncio.run(queue.claim("w1"))
+    stale["input_id"] = "input"
+    assert asyncio.run(queue.claim("w2")) is None
+
+    expire_lease(queue, job_id)
+    current = asyncio.run(queue.claim("w2"))
+    assert current["worker"] == "w2"
+    assert current["attempts"] == 2
+
+    assert asyncio.run(queue.renew_lease(stale)) is False
+    assert asyncio.run(queue.complete(stale, {"minutes": "stale"})) is False
+    assert asyncio.run(queue.fail(stale, "stale")) is False
+    assert stored(queue, job_id)["status"] == "running"
+    assert queue.inputs.deleted == []
+
+    assert asyncio.run(queue.complete(current, {"minutes": "fresh"})) is True
+    assert stored(queue, job_id)["result"] == {"minutes": "fresh"}
+    assert queue.inputs.deleted == []  # text jobs have no stored input
+
+
+def test_retry_backs_off_exponentially_then_fails(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_BASE_SECONDS", 10)
+    job_id = submit(queue)
+
+    for attempt, delay in [(1, 10), (2, 20)]:
+        stored(queue, job_id)["run_after"] = jobs._now()
+        job = asyncio.run(queue.claim("w1"))
+        assert job["attempts"] == attempt
+        before = jobs._now()
+        assert asyncio.run(queue.fail(job, "timeout", retryable=True)) is True
+        retry = stored(queue, job_id)
+        assert retry["status"] == "queued"
+        assert retry["stage"] == "retrying"
+        assert timedelta(seconds=delay) <= retry["run_after"] - before < timedelta(seconds=delay + 1)
+
+    stored(queue, job_id)["run_after"] = jobs._now()
+    job = asyncio.run(queue.claim("w1"))
+    assert job["attempts"] == jobs.JOB_MAX_ATTEMPTS
+    assert asyncio.run(queue.fail(job, "timeout", retryable=True)) is True
+    assert stored(queue, job_id)["status"] == "failed"
+
+
+def test_claim_skips_users_at_the_running_cap(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_RUNNING_JOBS_PER_USER", 1)
+    submit(queue, "alice")
+    submit(queue, "alice")
+    bob = submit(queue, "bob")
+
+    assert asyncio.run(queue.claim("w1"))["username"] == "alice"
+    job = asyncio.run(queue.claim("w2"))
+    assert str(job["_id"]) == bob
+    assert asyncio.run(queue.claim("w3")) is None
+
+
+def test_racing_claim_over_the_running_cap_is_given_back(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_RUNNING_JOBS_PER_USER", 1)
+    first = submit(queue)
+    second = submit(queue)
+    asyncio.run(queue.claim("w1"))
+
+    # Another worker checked the busy users before the first claim landed
+    async def no_busy_users(now):
+        return []
+    monkeypatch.setattr(queue, "_busy_users", no_busy_users)
+
+    assert asyncio.run(queue.claim("w2")) is None
+    given_back = stored(queue, second)
+    assert given_back["status"] == "queued"
+    assert given_back["attempts"] == 0
+    assert "worker" not in given_back
+    assert stored(queue, first)["worker"] == "w1"
+
+
+def test_submit_over_the_queued_cap_is_rejected(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_QUEUED_JOBS_PER_USER", 2)
+    submit(queue)
+    submit(queue)
+
+    ok, message = asyncio.run(queue.submit("alice", transcript_text="third"))
+    assert not ok
+    assert "2 jobs in progress" in message
+    assert len(queue.jobs.documents) == 2
+    # Other users aren't affected
+    submit(queue, "bob")
+
+
+class FakeAI:
+    provider_name = "Fake"
+
+    def __init__(self, during=None):
+        self.during = during
+
+    async def ahandle_text(self, text, progress):
+        if self.during:
+            await self.during()
+        return {"success": True, "minutes": {"title": "Minutes"}, "transcript": text}
+
+
+class FakeUsage:
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, username, provider, result):
+        self.recorded.append(username)
+
+
+class FakeArchive:
+    def __init__(self):
+        self.saved = []
+
+    async def save(self, username, result, source):
+        self.saved.append(username)
+        return "minutes-id"
+
+
+def make_worker(queue, ai, monkeypatch):
+    async def build_user_ai(user, encryption):
+        return (True, ai)
+    monkeypatch.setattr(jobs, "build_user_ai", build_user_ai)
+
+    worker = JobWorker.__new__(JobWorker)
+    worker.queue = queue
+    worker.encryption = None
+    worker.usage = FakeUsage()
+    worker.archive = FakeArchive()
+    worker.worker_id = "w1"
+    return worker
+
+
+def test_worker_records_and_completes_its_job(queue, monkeypatch):
+    job_id = submit(queue)
+    worker = make_worker(queue, FakeAI(), monkeypatch)
+
+    asyncio.run(worker.run_job(asyncio.run(queue.claim("w1"))))
+    assert worker.usage.recorded == ["alice"]
+    assert worker.archive.saved == ["alice"]
+    job = stored(queue, job_id)
+    assert job["status"] == "done"
+    assert job["result"]["minutes_id"] == "minutes-id"
+
+
+def test_worker_that_lost_its_job_drops_the_result(queue, monkeypatch):
+    job_id = submit(queue)
+
+    async def taken_over():
+        expire_lease(queue, job_id)
+        assert (await queue.claim("w2"))["worker"] == "w2"
+
+    worker = make_worker(queue, FakeAI(during=taken_over), monkeypatch)
+    asyncio.run(worker.run_job(asyncio.run(queue.claim("w1"))))
+
+    assert worker.usage.recorded == []
+    assert worker.archive.saved == []
+    job = stored(queue, job_id)
+    assert job["status"] == "running"
+    assert job["worker"] == "w2"
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import ai
+from ai import AI
+from ai_providers.local import LocalProvider
+
+
+class FakeWhisper:
+    def __init__(self):
+        self.threads = []
+
+    def transcribe(self, path, fp16=False):
+        self.threads.append(threading.current_thread().name)
+        return {"text": f" text of {path} "}
+
+
+def test_whisper_runs_on_its_own_thread(monkeypatch):
+    model = FakeWhisper()
+    monkeypatch.setattr(LocalProvider, "_model", classmethod(lambda cls: (model, threading.Lock())))
+    text = asyncio.run(LocalProvider("").atranscribe_audio_file("a.wav", "a.wav"))
+    assert text == "text of a.wav"
+    assert model.threads[0].startswith("whisper")
+
+
+def test_local_audio_is_not_split(monkeypatch, tmp_path):
+    model = FakeWhisper()
+    monkeypatch.setattr(LocalProvider, "_model", classmethod(lambda cls: (model, threading.Lock())))
+    monkeypatch.setattr(ai, "needs_segmentation", lambda size, duration: True)
+    monkeypatch.setattr(ai, "AI_CACHE_ENABLED", False)
+    path = tmp_path / "long.wav"
+    path.write_bytes(b"\0" * 16)
+    handler = AI("", provider="Local")
+    assert asyncio.run(handler._atranscribe(str(path), "long.wav", 7200.0)) == f"text of {path}"
+    assert len(model.threads) == 1
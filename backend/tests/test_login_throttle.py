@@ -0,0 +1,90 @@
+import ipaddress
+
+import pytest
+from starlette.requests import Request
+
+import authentication
+import dependencies
+from authentication import LoginThrottle, TooManyAttempts
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(authentication, "LOGIN_MAX_FAILURES_PER_ACCOUNT", 3)
+    monkeypatch.setattr(authentication, "LOGIN_MAX_ATTEMPTS_PER_IP", 5)
+
+
+def _fail(throttle: LoginThrottle, account: str, client_ip: str, times: int) -> None:
+    for _ in range(times):
+        throttle.check(client_ip, account)
+        throttle.failed(account, client_ip)
+
+
+def test_failures_lock_the_account_for_that_client_only():
+    throttle = LoginThrottle()
+    _fail(throttle, "ana", "10.0.0.1", 3)
+    with pytest.raises(TooManyAttempts):
+        throttle.check("10.0.0.1", "ana")
+    # The owner, from another address, can still log in
+    throttle.check("10.0.0.2", "ana")
+
+
+def test_success_clears_the_failures():
+    throttle = LoginThrottle()
+    _fail(throttle, "ana", "10.0.0.1", 2)
+    throttle.succeeded("ana", "10.0.0.1")
+    _fail(throttle, "ana", "10.0.0.1", 2)
+    throttle.check("10.0.0.1", "ana")
+
+
+def test_attempts_per_ip_are_capped_across_accounts():
+    throttle = LoginThrottle()
+    for account in ("a", "b", "c", "d", "e"):
+        throttle.check("10.0.0.1", account)
+    with pytest.raises(TooManyAttempts) as raised:
+        throttle.check("10.0.0.1", "f")
+    assert raised.value.retry_after >= 1
+    throttle.check("10.0.0.2", "f")
+
+
+def test_flooding_other_keys_does_not_reset_a_counter(monkeypatch):
+    monkeypatch.setattr(authentication, "LOGIN_THROTTLE_MAX_KEYS", 10)
+    throttle = LoginThrottle()
+    _fail(throttle, "ana", "10.0.0.1", 3)
+    for host in range(2, 20):
+        try:
+            throttle.check(f"10.0.1.{host}", "someone")
+        except TooManyAttempts:
+            pass
+    # New clients are refused while the table is full, and ana's failures are still counted
+    with pytest.raises(TooManyAttempts):
+        throttle.check("10.0.2.1")
+    with pytest.raises(TooManyAttempts):
+        throttle.check("10.0.0.1", "ana")
+
+
+def test_windows_are_forgotten_when_they_end(monkeypatch):
+    monkeypatch.setattr(authentication, "LOGIN_THROTTLE_MAX_KEYS", 2)
+    now = [1000.0]
+    monkeypatch.setattr(authentication.time, "time", lambda: now[0])
+    throttle = LoginThrottle()
+    throttle.check("10.0.0.1")
+    throttle.check("10.0.0.2")
+    with pytest.raises(TooManyAttempts):
+        throttle.check("10.0.0.3")
+    now[0] += authentication.LOGIN_WINDOW_SECONDS
+    throttle.check("10.0.0.3")
+    assert list(throttle._counts) == [("ip", "10.0.0.3")]
+
+
+@pytest.mark.parametrize("peer, forwarded, expected", [
+    ("203.0.113.9", "1.2.3.4", "203.0.113.9"),
+    ("10.0.0.5", "1.2.3.4", "1.2.3.4"),
+    ("10.0.0.5", "6.6.6.6, 1.2.3.4, 10.0.0.7", "1.2.3.4"),
+    ("10.0.0.5", "", "10.0.0.5"),
+])
+def test_client_ip_trusts_only_configured_proxies(monkeypatch, peer, forwarded, expected):
+    monkeypatch.setattr(dependencies, "TRUSTED_PROXIES", [ipaddress.ip_network("10.0.0.0/24")])
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    request = Request({"type": "http", "client": (peer, 1234), "headers": headers})
+    assert dependencies.client_ip(request) == expected
@@ -0,0 +1,152 @@
+import asyncio
+
+from ai_providers.base import BaseProvider
+from ai_providers.mapreduce import CHUNK_PROMPT, REDUCE_PROMPT, chunk_transcript, count_tokens, merge_partial_minutes
+
+
+def _paragraphs(count: int, words: int = 40) -> str:
+    return "\n\n".join(" ".join(f"p{index}w{word}" for word in range(words)) for index in range(count))
+
+
+def test_short_transcript_is_one_chunk():
+    assert chunk_transcript("A short meeting.", 100) == ["A short meeting."]
+
+
+def test_chunks_respect_the_limit_and_keep_every_word():
+    transcript = _paragraphs(30)
+    chunks = chunk_transcript(transcript, 200)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 200 for chunk in chunks)
+    assert " ".join(chunks).split() == transcript.split()
+
+
+def test_chunks_break_at_paragraphs():
+    transcript = _paragraphs(10)
+    paragraphs = transcript.split("\n\n")
+    for chunk in chunk_transcript(transcript, count_tokens(paragraphs[0]) * 3):
+        # Each chunk is made of whole paragraphs
+        assert all(line in paragraphs for line in chunk.split("\n"))
+
+
+def test_oversized_unit_is_split_at_words():
+    transcript = " ".join(f"word{index}" for index in range(2000))
+    chunks = chunk_transcript(transcript, 100)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == transcript.split()
+
+
+def test_merge_partial_minutes():
+    partials = [
+        {
+            "title": "Part one", "date": "Not specified", "attendees": ["Ana", "Ben"], "summary": "First.",
+            "discussion_points": [{"topic": "Budget", "details": "Q3 is tight."}],
+            "decisions": ["Hire one engineer"],
+            "action_items": [{"task": "Draft the job post", "owner": "Ana", "due_date": None}],
+            "next_steps": ["Review candidates"]
+        },
+        {
+            "title": "Part two", "date": "March 3", "attendees": ["ben", "Cleo"], "summary": "Second.",
+            "discussion_points": [{"topic": "budget", "details": "Marketing gets less."}, {"topic": "Launch", "details": "Moved."}],
+            "decisions": ["Hire one engineer."],
+            "action_items": [{"task": "Draft the job post!", "owner": "Ben", "due_date": "Friday"}],
+            "next_steps": ["Review candidates", "Book venue"]
+        }
+    ]
+    merged = merge_partial_minutes(partials)
+    assert merged["title"] == "Part one"
+    assert merged["date"] == "March 3"
+    assert merged["attendees"] == ["Ana", "Ben", "Cleo"]
+    assert merged["summary"] == "First. Second."
+    assert merged["discussion_points"] == [
+        {"topic": "Budget", "details": "Q3 is tight. Marketing gets less."},
+        {"topic": "Launch", "details": "Moved."}
+    ]
+    assert merged["decisions"] == ["Hire one engineer"]
+    assert merged["action_items"] == [{"task": "Draft the job post", "owner": "Ana", "due_date": None}]
+    assert merged["next_steps"] == ["Review candidates", "Book venue"]
+
+
+def test_merge_tolerates_malformed_entries():
+    partials = [
+        {"discussion_points": ["Budget", None, 3, {"topic": "Launch", "details": "Moved."}],
+         "action_items": ["Send notes", "", ["nested"], {"task": "Book venue", "owner": "Ana"}]},
+        {"discussion_points": [{"topic": "budget", "details": "Tight."}], "action_items": ["send notes"]}
+    ]
+    merged = merge_partial_minutes(partials)
+    assert merged["discussion_points"] == [
+        {"topic": "Budget", "details": "Tight."},
+        {"topic": "Launch", "details": "Moved."}
+    ]
+    assert merged["action_items"] == [{"task": "Send notes"}, {"task": "Book venue", "owner": "Ana"}]
+
+
+def test_merge_without_partials_is_empty_minutes():
+    merged = merge_partial_minutes([])
+    assert merged["title"] == "Meeting Minutes"
+    assert merged["discussion_points"] == [] and merged["action_items"] == []
+
+
+class StubProvider(BaseProvider):
+    """Answers completions from the prompt it gets and records how many run at once."""
+
+    CHUNK_TOKENS = 200
+    MAP_CONCURRENCY = 2
+
+    def __init__(self):
+        super().__init__("")
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def atranscribe_audio(self, file_content, filename):
+        raise NotImplementedError
+
+    async def acomplete_json(self, system_prompt, user_prompt, max_tokens):
+        self.calls.append((system_prompt, user_prompt))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        if system_prompt == REDUCE_PROMPT:
+            return {"title": "Whole meeting", "summary": "Overall summary."}
+        part = user_prompt.split(" of ")[0].removeprefix("Part ")
+        return {
+            "title": f"Part {part}", "summary": f"Summary {part}.", "attendees": [f"Speaker {part}", "Host"],
+            "discussion_points": [{"topic": "Shared topic", "details": f"Point {part}."}],
+            "decisions": [], "action_items": [], "next_steps": []
+        }
+
+
+def test_short_transcript_uses_one_completion():
+    provider = StubProvider()
+
+    async def single(system_prompt, user_prompt, max_tokens):
+        assert system_prompt == BaseProvider.SYSTEM_PROMPT
+        return {"title": "Short"}
+
+    provider.acomplete_json = single
+    assert asyncio.run(provider.agenerate_minutes("A short meeting.")) == {"title": "Short"}
+
+
+def test_long_transcript_is_mapped_then_reduced():
+    provider = StubProvider()
+    transcript = _paragraphs(30)
+    chunks = chunk_transcript(transcript, provider.CHUNK_TOKENS)
+
+    minutes = asyncio.run(provider.agenerate_minutes(transcript))
+
+    map_calls = [user for system, user in provider.calls if system == CHUNK_PROMPT]
+    assert len(map_calls) == len(chunks)
+    assert [system for system, _ in provider.calls].count(REDUCE_PROMPT) == 1
+    assert provider.calls[-1][0] == REDUCE_PROMPT
+    assert provider.max_running == provider.MAP_CONCURRENCY
+
+    assert minutes["title"] == "Whole meeting"
+    assert minutes["summary"] == "Overall summary."
+    assert minutes["attendees"] == ["Speaker 1", "Host"] + [f"Speaker {index}" for index in range(2, len(chunks) + 1)]
+    # Partials are merged in transcript order whatever order they finished in
+    assert minutes["discussion_points"] == [{
+        "topic": "Shared topic",
+        "details": " ".join(f"Point {index}." for index in range(1, len(chunks) + 1))
+    }]
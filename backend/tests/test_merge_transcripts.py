@@ -0,0 +1,62 @@
+from ai import OVERLAP_MAX_WORDS, merge_transcripts
+
+
+def test_single_chunk_is_unchanged():
+    assert merge_transcripts(["Hello there, everyone."]) == "Hello there, everyone."
+
+
+def test_exact_overlap_is_dropped_once():
+    first = "we should ship the release on Friday after the final review"
+    second = "after the final review we can announce it to customers"
+    assert merge_transcripts([first, second]) == (
+        "we should ship the release on Friday after the final review we can announce it to customers"
+    )
+
+
+def test_overlap_ignores_case_and_punctuation():
+    first = "Budget is approved. Next, the hiring plan."
+    second = "next the Hiring plan: two engineers in Q3."
+    assert merge_transcripts([first, second]) == "Budget is approved. Next, the hiring plan. two engineers in Q3."
+
+
+def test_noisy_overlap_drops_garbled_lead_in():
+    # The next chunk starts mid-word, so its first words don't match exactly
+    first = "so the vendor contract renews in March and legal wants changes"
+    second = "uh-huh nd legal wants changes to the liability clause"
+    assert merge_transcripts([first, second]) == (
+        "so the vendor contract renews in March and legal wants changes to the liability clause"
+    )
+
+
+def test_no_overlap_keeps_both_chunks_whole():
+    first = "the first part ends here"
+    second = "completely different words follow now"
+    assert merge_transcripts([first, second]) == "the first part ends here completely different words follow now"
+
+
+def test_repeated_phrase_far_from_the_boundary_is_not_an_overlap():
+    first = "I think that we are done with the agenda"
+    second = "let us move to questions from the floor I think that"
+    assert merge_transcripts([first, second]) == f"{first} {second}"
+
+
+def test_repeated_phrase_inside_the_overlap_keeps_the_rest():
+    first = "we said the numbers look good and the numbers look good again"
+    second = "the numbers look good again so we close the quarter"
+    assert merge_transcripts([first, second]) == (
+        "we said the numbers look good and the numbers look good again so we close the quarter"
+    )
+
+
+def test_never_drops_more_than_the_overlap():
+    words = [f"w{index}" for index in range(100)]
+    first = " ".join(words[:60])
+    # Shares far more than OVERLAP_MAX_WORDS with the first chunk
+    second = " ".join(words[10:100])
+    merged = merge_transcripts([first, second]).split()
+    assert len(merged) >= 60 + 90 - OVERLAP_MAX_WORDS
+
+
+def test_three_chunks():
+    chunks = ["one two three four five", "three four five six seven eight", "six seven eight nine ten"]
+    assert merge_transcripts(chunks) == "one two three four five six seven eight nine ten"
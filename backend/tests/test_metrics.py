@@ -0,0 +1,78 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+from metrics import Counter, Gauge, Histogram, RequestMetricsMiddleware, render
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", [])
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("t_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="parse")
+    assert render().splitlines() == [
+        "# HELP t_seconds Test.",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{stage="parse",le="0.1"} 2',
+        't_seconds_bucket{stage="parse",le="1"} 3',
+        't_seconds_bucket{stage="parse",le="+Inf"} 4',
+        't_seconds_sum{stage="parse"} 3.65',
+        't_seconds_count{stage="parse"} 4'
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("t_total", "Test.", ("name",))
+    counter.inc(name='a "quoted"\\path\n')
+    counter.inc(2, name='a "quoted"\\path\n')
+    assert render().splitlines()[-1] == 't_total{name="a \\"quoted\\"\\\\path\\n"} 3'
+
+
+def test_gauge_tracks_blocks_in_flight():
+    gauge = Gauge("t_in_flight", "Test.")
+    with gauge.track():
+        assert render().splitlines()[-1] == "t_in_flight 1"
+    assert render().splitlines()[-1] == "t_in_flight 0"
+
+
+def test_snapshots_become_gauges():
+    lines = render([("t_cache", {"hits": 3, "state": "open", "enabled": True, "nested": {}}, {"tier": "memory"})]).splitlines()
+    assert lines == [
+        "# TYPE t_cache_hits gauge",
+        't_cache_hits{tier="memory"} 3',
+        "# TYPE t_cache_state gauge",
+        't_cache_state{tier="memory",state="open"} 1'
+    ]
+
+
+def test_requests_are_labelled_with_the_route_template(monkeypatch):
+    histogram = Histogram("t_http_seconds", "Test.", ("method", "route", "status"))
+    monkeypatch.setattr(metrics, "HTTP_REQUEST_SECONDS", histogram)
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/files/{name}")
+    async def download(name: str):
+        return {"name": name}
+
+    @app.get("/crash")
+    async def crash():
+        raise RuntimeError("boom")
+
+    client = TestClient(app, raise_server_exceptions=False)
+    client.get("/files/a.pdf")
+    client.get("/files/b.pdf")
+    client.get("/crash")
+    client.get("/missing")
+
+    counts = [line for line in render().splitlines() if line.startswith("t_http_seconds_count")]
+    assert counts == [
+        't_http_seconds_count{method="GET",route="/files/{name}",status="200"} 2',
+        't_http_seconds_count{method="GET",route="/crash",status="500"} 1',
+        't_http_seconds_count{method="GET",route="unmatched",status="404"} 1'
+    ]
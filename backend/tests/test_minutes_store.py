@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+import minutes_store
+from fake_mongo import AsyncFakeCollection
+from minutes_store import SEARCH_MAX_OFFSET, SEARCH_PAGE_MAX, MinutesArchive
+
+
+class RankedCursor:
+    """Cursor over pre-ranked matches that records how the page was requested."""
+
+    def __init__(self, collection, entries: list) -> None:
+        self.collection = collection
+        self.entries = entries
+
+    def sort(self, keys) -> "RankedCursor":
+        self.collection.calls["sort"] = keys
+        return self
+
+    def skip(self, count: int) -> "RankedCursor":
+        self.collection.calls["skip"] = count
+        self.entries = self.entries[count:]
+        return self
+
+    def limit(self, count: int) -> "RankedCursor":
+        self.collection.calls["limit"] = count
+        self.entries = self.entries[:count]
+        return self
+
+    async def to_list(self, length=None) -> list:
+        return self.entries
+
+
+class RankedCollection:
+    """Stands in for $text search, which the fake can't evaluate: every entry matches, in list order."""
+
+    def __init__(self, count: int) -> None:
+        created_at = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        self.entries = [
+            {"_id": ObjectId(), "score": 1 / (i + 1), "created_at": created_at, "source": "text", "minutes": {"title": f"Meeting {i}"}}
+            for i in range(count)
+        ]
+        self.calls = {}
+
+    def find(self, query: dict, projection: dict) -> RankedCursor:
+        self.calls.update(query=query, projection=projection)
+        return RankedCursor(self, self.entries)
+
+
+def _archive(collection) -> MinutesArchive:
+    archive = MinutesArchive()
+    archive._collection = collection
+    return archive
+
+
+RESULT = {"minutes": {"title": "Budget"}, "transcript": "abcdefghij", "audio_duration": 12}
+
+
+def test_saved_entry_is_returned_only_to_its_owner(monkeypatch):
+    monkeypatch.setattr(minutes_store, "MINUTES_TRANSCRIPT_MAX_CHARS", 4)
+    archive = _archive(AsyncFakeCollection())
+    minutes_id = asyncio.run(archive.save("ana", RESULT, "audio"))
+
+    entry = asyncio.run(archive.get("ana", minutes_id))
+    assert entry["id"] == minutes_id
+    assert entry["minutes"] == {"title": "Budget"}
+    assert (entry["transcript"], entry["transcript_length"], entry["source"]) == ("abcd", 10, "audio")
+    assert asyncio.run(archive.get("bo", minutes_id)) is None
+
+
+@pytest.mark.parametrize("minutes_id", ["not-an-id", None, str(ObjectId())])
+def test_unknown_ids_are_none(minutes_id):
+    assert asyncio.run(_archive(AsyncFakeCollection()).get("ana", minutes_id)) is None
+
+
+def test_save_failures_are_not_raised():
+    class FailingCollection(AsyncFakeCollection):
+        async def insert_one(self, document):
+            raise RuntimeError("down")
+
+    assert asyncio.run(_archive(FailingCollection()).save("ana", RESULT, "text")) is None
+
+
+def test_disabled_archive_stores_nothing(monkeypatch):
+    monkeypatch.setattr(minutes_store, "MINUTES_ARCHIVE_ENABLED", False)
+    collection = AsyncFakeCollection()
+    assert asyncio.run(_archive(collection).save("ana", RESULT, "text")) is None
+    assert collection.documents == []
+
+
+def test_search_is_scoped_to_the_user_and_ranked():
+    collection = RankedCollection(3)
+    results, next_offset = asyncio.run(_archive(collection).search("ana", "budget", limit=2))
+
+    assert collection.calls["query"] == {"username": "ana", "$text": {"$search": "budget"}}
+    assert "transcript" not in collection.calls["projection"]
+    assert collection.calls["sort"] == [("score", {"$meta": "textScore"}), ("created_at", -1)]
+    assert [result["title"] for result in results] == ["Meeting 0", "Meeting 1"]
+    assert results[1]["score"] == 0.5
+    assert next_offset == 2
+
+    results, next_offset = asyncio.run(_archive(collection).search("ana", "budget", limit=2, offset=2))
+    assert [result["title"] for result in results] == ["Meeting 2"]
+    assert next_offset is None
+
+
+@pytest.mark.parametrize("limit, offset, expected", [
+    (0, -5, (0, 2)),
+    (500, 0, (0, SEARCH_PAGE_MAX + 1)),
+    (10, 10 ** 6, (SEARCH_MAX_OFFSET, 11))
+])
+def test_page_bounds_are_clamped(limit, offset, expected):
+    collection = RankedCollection(0)
+    asyncio.run(_archive(collection).search("ana", "budget", limit=limit, offset=offset))
+    assert (collection.calls["skip"], collection.calls["limit"]) == expected
+
+
+def test_no_next_page_past_the_maximum_offset():
+    collection = RankedCollection(SEARCH_MAX_OFFSET + 10)
+    _, next_offset = asyncio.run(_archive(collection).search("ana", "budget", limit=10, offset=SEARCH_MAX_OFFSET - 5))
+    assert next_offset is None
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from pdf_generator import PDFGenerator
+
+MINUTES = {
+    "title": "Sync",
+    "summary": "Short",
+    "action_items": [{"task": "Ship", "assignee": "Ana", "due_date": "Friday"}]
+}
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    monkeypatch.setattr(PDFGenerator, "_compiled_styles", {})
+    builds = []
+    build_styles = PDFGenerator._build_styles
+
+    def counting(config):
+        builds.append(config["name"])
+        return build_styles(config)
+
+    monkeypatch.setattr(PDFGenerator, "_build_styles", staticmethod(counting))
+    return builds
+
+
+def test_styles_are_compiled_once_per_template(builds):
+    first, second = PDFGenerator("minimal"), PDFGenerator("minimal")
+    assert first.styles is second.styles
+    assert first.table_style is second.table_style
+    assert PDFGenerator("professional").styles is not first.styles
+    assert len(builds) == 2
+
+
+def test_unknown_templates_share_the_fallback_styles(builds):
+    assert PDFGenerator("no-such-template").styles is PDFGenerator("professional").styles
+    assert len(builds) == 1
+
+
+def test_concurrent_generators_compile_once(builds):
+    barrier = threading.Barrier(8)
+    styles = []
+
+    def create():
+        barrier.wait()
+        styles.append(PDFGenerator("modern").styles)
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(sheet) for sheet in styles}) == 1
+    assert len(builds) == 1
+
+
+def test_preload_compiles_every_template(builds):
+    PDFGenerator.preload_styles()
+    assert set(PDFGenerator._compiled_styles) == set(PDFGenerator.TEMPLATES)
+    PDFGenerator("minimal")
+    assert len(builds) == len(PDFGenerator.TEMPLATES)
+
+
+def test_shared_styles_render_the_same_document(builds):
+    first = PDFGenerator("professional").generate_bytes(MINUTES, generated_on="May 01, 2024")
+    second = PDFGenerator("professional").generate_bytes(MINUTES, generated_on="May 01, 2024")
+    assert first.startswith(b"%PDF")
+    assert len(first) == len(second)
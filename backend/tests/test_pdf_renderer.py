@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import pdf_renderer
+from pdf_renderer import PDFRenderService, RendererBusy, RenderCache, RenderTimeout, render_key
+
+MINUTES = {"title": "Sync", "summary": "Short"}
+
+
+def _service(workers: int, max_pending: int = 2) -> PDFRenderService:
+    service = PDFRenderService(workers=workers, max_pending=max_pending, timeout=5)
+    # Memory only, no Mongo
+    service.cache = RenderCache()
+    service.cache._collection_checked = True
+    return service
+
+
+@pytest.fixture
+def render_threads(monkeypatch):
+    threads = []
+
+    def fake_render(template, minutes, generated_on):
+        threads.append(threading.current_thread())
+        return f"{template}:{minutes['title']}".encode(), 0.0
+
+    monkeypatch.setattr(pdf_renderer, "_render", fake_render)
+    return threads
+
+
+def test_inline_renders_run_off_the_event_loop(render_threads):
+    service = _service(workers=0)
+
+    async def render():
+        return await service.arender("minimal", MINUTES), threading.current_thread()
+
+    pdf_bytes, loop_thread = asyncio.run(render())
+    assert pdf_bytes == b"minimal:Sync"
+    assert render_threads and render_threads[0] is not loop_thread
+
+
+def test_slots_are_released_when_the_pool_refuses_a_render(monkeypatch):
+    service = _service(workers=1, max_pending=2)
+
+    def refuse(*args):
+        raise RuntimeError("cannot start worker")
+
+    monkeypatch.setattr(service, "_submit_to_pool", refuse)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            service.render_batch([("minimal", {"title": "A"}), ("minimal", {"title": "B"})])
+    # Both slots are free again
+    assert service._slots.acquire(blocking=False) and service._slots.acquire(blocking=False)
+
+
+def test_busy_when_the_batch_does_not_fit(render_threads):
+    service = _service(workers=0, max_pending=1)
+    with pytest.raises(RendererBusy):
+        service.render_batch([("minimal", {"title": "A"}), ("minimal", {"title": "B"})])
+    assert service.render("minimal", {"title": "A"}) == b"minimal:A"
+
+
+def test_timed_out_render_frees_its_worker_and_slot(monkeypatch):
+    service = _service(workers=1, max_pending=1)
+    service.timeout = 0.5
+    workers = []
+
+    def submit_stuck(*args):
+        # A render that never finishes in time; time.sleep pickles by reference into the spawned worker
+        future = service._get_pool().submit(time.sleep, 60)
+        workers.extend(service._pool._processes.values())
+        return future
+
+    monkeypatch.setattr(service, "_submit_to_pool", submit_stuck)
+    try:
+        result = service.render_batch([("minimal", MINUTES)])
+        assert isinstance(result[0], RenderTimeout)
+        assert service._pool is None
+        # The stuck worker is killed, which fails its render and gives the slot back
+        assert service._slots.acquire(timeout=10)
+        assert workers
+        for process in workers:
+            process.join(10)
+            assert process.exitcode is not None
+    finally:
+        service.shutdown()
+
+
+def test_render_key_covers_everything_that_changes_the_pdf(monkeypatch):
+    key = render_key("minimal", MINUTES, "May 01, 2024")
+    assert render_key("minimal", {"summary": "Short", "title": "Sync"}, "May 01, 2024") == key
+    assert render_key("professional", MINUTES, "May 01, 2024") != key
+    assert render_key("minimal", MINUTES, "May 02, 2024") != key
+    assert render_key("minimal", {**MINUTES, "title": "Sync 2"}, "May 01, 2024") != key
+    # Unknown templates render as professional, so they share its key
+    assert render_key("no-such-template", MINUTES, "May 01, 2024") == render_key("professional", MINUTES, "May 01, 2024")
+    monkeypatch.setattr(pdf_renderer, "GENERATOR_VERSION", "next")
+    assert render_key("minimal", MINUTES, "May 01, 2024") != key
+
+
+def test_cached_and_repeated_items_are_rendered_once(render_threads):
+    service = _service(workers=0, max_pending=2)
+    first = service.render_batch([("minimal", {"title": "A"}), ("minimal", {"title": "A"}), ("minimal", {"title": "B"})])
+    assert first == [b"minimal:A", b"minimal:A", b"minimal:B"]
+    assert len(render_threads) == 2
+    assert service.render("minimal", {"title": "B"}) == b"minimal:B"
+    assert len(render_threads) == 2
+    assert service.cache.stats()["memory_hits"] == 1
@@ -0,0 +1,97 @@
+import asyncio
+import gc
+
+import pytest
+
+import ai
+import ttl_cache
+from ai import AI, close_providers, close_retired_providers, forget_provider
+from ai_providers.base import BaseProvider
+from encryption import Encryption
+from ttl_cache import TTLCache
+
+closed = []
+
+
+class ClosingProvider(BaseProvider):
+    REMOTE = False
+
+    async def atranscribe_audio(self, file_content, filename):
+        return ""
+
+    async def acomplete_json(self, system_prompt, user_prompt, max_tokens):
+        return {}
+
+    async def aclose(self):
+        closed.append(self.api_key)
+
+
+@pytest.fixture(autouse=True)
+def provider_cache(monkeypatch):
+    closed.clear()
+    monkeypatch.setitem(AI.PROVIDERS, "Closing", ClosingProvider)
+    monkeypatch.setattr(ai, "AI_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai, "_providers", TTLCache(1, 60, on_evict=ai._retire))
+    monkeypatch.setattr(ai, "_retired", [])
+
+
+def test_provider_is_reused_for_the_same_key():
+    assert AI("k1", "Closing").provider is AI("k1", "Closing").provider
+
+
+def test_evicted_client_is_closed_once_unused():
+    first = AI("k1", "Closing")
+    # Capacity 1: building a second key evicts the first
+    AI("k2", "Closing")
+    asyncio.run(close_retired_providers())
+    assert closed == []
+
+    del first
+    gc.collect()
+    asyncio.run(close_retired_providers())
+    assert closed == ["k1"]
+    asyncio.run(close_retired_providers())
+    assert closed == ["k1"]
+
+
+def test_forgotten_and_cached_clients_are_closed():
+    AI("k1", "Closing")
+    forget_provider("Closing", "k1")
+    gc.collect()
+    asyncio.run(close_retired_providers())
+    assert closed == ["k1"]
+
+    AI("k2", "Closing")
+    asyncio.run(close_providers())
+    assert closed == ["k1", "k2"]
+
+
+def test_expired_client_is_replaced_and_closed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "time", lambda: now[0])
+    monkeypatch.setattr(ai, "_providers", TTLCache(4, 60, on_evict=ai._retire))
+    first = AI("k1", "Closing").provider
+    now[0] += 61
+    second = AI("k1", "Closing").provider
+    assert second is not first
+
+    del first
+    gc.collect()
+    asyncio.run(close_retired_providers())
+    assert closed == ["k1"]
+
+
+def test_decrypted_keys_are_memoized_until_forgotten(monkeypatch):
+    monkeypatch.setenv("ENCRYPTION_KEY", "test-secret")
+    encryption = Encryption()
+    token = encryption.encrypt("sk-test")
+    calls = []
+    real_decrypt = encryption.fernet.decrypt
+    monkeypatch.setattr(encryption.fernet, "decrypt", lambda data: calls.append(data) or real_decrypt(data))
+
+    assert encryption.decrypt(token) == "sk-test"
+    assert encryption.decrypt(token) == "sk-test"
+    assert len(calls) == 1
+    encryption.forget(token)
+    assert encryption.decrypt(token) == "sk-test"
+    assert len(calls) == 2
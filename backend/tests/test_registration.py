@@ -0,0 +1,65 @@
+import asyncio
+
+import bcrypt
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import authentication
+from authentication import Authentication
+from fake_mongo import AsyncFakeCollection
+
+
+class RejectingUsers(AsyncFakeCollection):
+    """Users collection whose insert fails the way a unique index would."""
+
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+    async def insert_one(self, document):
+        raise self.error
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    monkeypatch.setattr(authentication, "BCRYPT_ROUNDS", 4)
+    auth = Authentication()
+    auth.indexes_ready = True
+    return auth
+
+
+def _register(auth, monkeypatch, users, username="Ana", email="Ana@Example.com"):
+    monkeypatch.setattr(authentication, "_users", lambda: users)
+    return asyncio.run(auth.register(username, "long enough", email))
+
+
+def test_new_user_is_stored_with_lowercased_keys(auth, monkeypatch):
+    users = AsyncFakeCollection()
+    assert _register(auth, monkeypatch, users) == (True, "User registered successfully.")
+    user, = users.documents
+    assert (user["username"], user["username_lower"], user["email"]) == ("Ana", "ana", "ana@example.com")
+    assert bcrypt.checkpw(b"long enough", user["password"])
+
+
+@pytest.mark.parametrize("error, message", [
+    (DuplicateKeyError("E11000", 11000, {"keyPattern": {"email": 1}}), "Email already exists."),
+    (DuplicateKeyError("E11000", 11000, {"keyPattern": {"username_lower": 1}}), "Username already exists."),
+    # Older servers only name the index in the message
+    (DuplicateKeyError("E11000 duplicate key error index: email_1", 11000), "Email already exists."),
+    (DuplicateKeyError("E11000 duplicate key error index: username_lower_1", 11000), "Username already exists.")
+])
+def test_duplicate_key_names_the_field(auth, monkeypatch, error, message):
+    assert _register(auth, monkeypatch, RejectingUsers(error)) == (False, message)
+
+
+def test_other_insert_errors_are_internal(auth, monkeypatch):
+    result = _register(auth, monkeypatch, RejectingUsers(RuntimeError("boom")))
+    assert result == (False, "Registration failed due to an internal error.")
+
+
+def test_refused_until_the_unique_indexes_exist(auth, monkeypatch):
+    auth.indexes_ready = False
+    users = AsyncFakeCollection()
+    ok, message = _register(auth, monkeypatch, users)
+    assert not ok and "temporarily unavailable" in message
+    assert users.documents == []
@@ -0,0 +1,92 @@
+import pytest
+
+from ai_providers import resilience
+from ai_providers.resilience import CircuitBreaker, ProviderTimeout, ProviderUnavailable
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _fail(breaker: CircuitBreaker, error: Exception, times: int = 1) -> None:
+    for _ in range(times):
+        breaker.before_call()
+        breaker.failed(error)
+
+
+def test_opens_after_threshold_outages(clock):
+    breaker = CircuitBreaker("test", threshold=3, reset_seconds=30)
+    _fail(breaker, ProviderTimeout(), 2)
+    assert breaker.state == "closed"
+    _fail(breaker, StatusError(503))
+    assert breaker.state == "open"
+    with pytest.raises(ProviderUnavailable) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 30
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["opened"] == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test", threshold=3, reset_seconds=30)
+    _fail(breaker, ProviderTimeout(), 2)
+    breaker.before_call()
+    breaker.succeeded()
+    _fail(breaker, ProviderTimeout(), 2)
+    assert breaker.state == "closed"
+
+
+def test_caller_errors_do_not_count_as_outages(clock):
+    breaker = CircuitBreaker("test", threshold=2, reset_seconds=30)
+    _fail(breaker, StatusError(429), 5)
+    _fail(breaker, StatusError(400), 5)
+    assert breaker.state == "closed"
+    assert breaker.stats()["failures"] == 10
+
+
+def test_half_open_admits_one_trial_call(clock):
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=30)
+    _fail(breaker, ProviderTimeout())
+    clock[0] += 30
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    # Others are refused while the trial call is out
+    with pytest.raises(ProviderUnavailable):
+        breaker.before_call()
+
+
+@pytest.mark.parametrize("outcome, state", [
+    (None, "closed"),
+    (StatusError(400), "closed"),
+    (StatusError(500), "open")
+])
+def test_trial_call_outcome_decides_the_state(clock, outcome, state):
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=30)
+    _fail(breaker, ProviderTimeout())
+    clock[0] += 30
+    breaker.before_call()
+    if outcome is None:
+        breaker.succeeded()
+    else:
+        breaker.failed(outcome)
+    assert breaker.state == state
+
+
+def test_lost_trial_call_lets_another_through(clock):
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=30)
+    _fail(breaker, ProviderTimeout())
+    clock[0] += 30
+    breaker.before_call()
+    # The trial never reports back; after another reset period a new one is admitted
+    clock[0] += 30
+    breaker.before_call()
+    assert breaker.state == "half_open"
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import file_storage
+from encryption import Encryption
+from file_storage import FileStorage
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+@pytest.fixture
+def derivations(monkeypatch):
+    monkeypatch.setenv("ENCRYPTION_KEY", "test secret")
+    derivations = []
+    derive = Encryption._derive_fernet
+
+    def counting(self):
+        derivations.append(self)
+        return derive(self)
+
+    monkeypatch.setattr(Encryption, "_derive_fernet", counting)
+    return derivations
+
+
+def test_key_is_derived_on_first_use_only(derivations):
+    crypto = Encryption()
+    assert derivations == []
+    token = crypto.encrypt("sk-secret")
+    assert crypto.decrypt(token) == "sk-secret"
+    assert len(derivations) == 1
+
+
+def test_concurrent_first_use_derives_once(derivations):
+    crypto = Encryption()
+    barrier = threading.Barrier(8)
+    tokens = []
+
+    def encrypt():
+        barrier.wait()
+        tokens.append(crypto.encrypt("sk-secret"))
+
+    threads = [threading.Thread(target=encrypt) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(tokens) == 8
+    assert len(derivations) == 1
+
+
+def test_lazy_key_matches_across_instances(derivations):
+    token = Encryption().encrypt("sk-secret")
+    assert Encryption().decrypt(token) == "sk-secret"
+
+
+def test_file_storage_connects_on_first_use(monkeypatch):
+    opened = []
+
+    class FakeDatabase:
+        def __init__(self, name):
+            opened.append(name)
+
+        def get_database(self):
+            return {"pdfs.files": "files"}
+
+    monkeypatch.setattr(file_storage, "Database", FakeDatabase)
+    monkeypatch.setattr(file_storage, "GridFSBucket", lambda database, bucket_name: bucket_name)
+    storage = FileStorage()
+    assert opened == []
+    assert (storage.files, storage.bucket) == ("files", "pdfs")
+    assert opened == ["users"]
+
+
+def test_heavy_dependencies_are_not_imported_up_front():
+    # A fresh interpreter, so modules other tests imported don't count
+    script = (
+        "import sys, ai, authentication, file_storage, pdf_renderer\n"
+        "print(sorted(m for m in ('reportlab', 'openai', 'tiktoken', 'mutagen') if m in sys.modules))"
+    )
+    env = {**os.environ, "JWT_SECRET": os.environ.get("JWT_SECRET", "x")}
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
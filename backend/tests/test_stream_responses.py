@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from main import ClosingStreamingResponse
+
+SCOPE = {"type": "http", "asgi": {"spec_version": "2.4"}}
+
+
+async def receive():
+    return {"type": "http.disconnect"}
+
+
+def respond(send, calls):
+    async def body():
+        calls.append("started")
+        try:
+            yield "one"
+            yield "two"
+        finally:
+            calls.append("body closed")
+
+    async def cleanup():
+        calls.append("cleanup")
+
+    asyncio.run(ClosingStreamingResponse(body(), cleanup)(SCOPE, receive, send))
+
+
+def test_cleanup_runs_after_the_stream_ends():
+    calls, sent = [], []
+
+    async def send(message):
+        sent.append(message.get("body"))
+
+    respond(send, calls)
+    assert calls == ["started", "body closed", "cleanup"]
+    assert sent == [None, b"one", b"two", b""]
+
+
+def test_cleanup_runs_when_the_client_leaves_before_the_body_starts():
+    calls = []
+
+    async def send(message):
+        raise OSError("connection reset")
+
+    with pytest.raises(ClientDisconnect):
+        respond(send, calls)
+    assert calls == ["cleanup"]
+
+
+def test_cleanup_runs_when_the_client_leaves_mid_stream():
+    calls = []
+
+    async def send(message):
+        if message.get("body") == b"two":
+            raise OSError("connection reset")
+
+    with pytest.raises(ClientDisconnect):
+        respond(send, calls)
+    assert calls == ["started", "body closed", "cleanup"]
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from ai_providers.streaming import MinutesStreamParser, minutes_events, normalize_minutes
+
+MINUTES = {
+    "title": "Weekly \"sync\" {draft}",
+    "date": "2024-05-01",
+    "attendees": ["Ana", "Bo, Jr."],
+    "summary": "Line one\nline two, with [brackets] and a \\ backslash",
+    "discussion_points": [{"topic": "Budget", "details": "Over by 5%"}, {"topic": "Hiring", "details": ""}],
+    "decisions": [],
+    "action_items": [{"task": "Send notes", "owner": "Ana", "due_date": None}],
+    "next_steps": ["Review"]
+}
+
+
+def _feed(text: str, size: int) -> tuple[MinutesStreamParser, list]:
+    parser = MinutesStreamParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 10000])
+def test_events_do_not_depend_on_how_the_text_is_split(size):
+    parser, events = _feed(json.dumps(MINUTES, indent=2), size)
+    assert events == list(minutes_events(MINUTES))
+    assert parser.result() == MINUTES
+
+
+def test_fields_are_reported_as_soon_as_they_end():
+    parser = MinutesStreamParser()
+    assert parser.feed('{"title": "Sy') == []
+    assert parser.feed('nc", "attendees": ["A"') == [{"event": "field", "name": "title", "value": "Sync"}]
+    assert parser.feed(', "B"') == [{"event": "item", "name": "attendees", "index": 0, "value": "A"}]
+    assert parser.feed("]") == [{"event": "item", "name": "attendees", "index": 1, "value": "B"}]
+
+
+def test_scalar_values_other_than_strings():
+    _, events = _feed('{"count": 12, "done": true, "owner": null}', 1)
+    assert events == [
+        {"event": "field", "name": "count", "value": 12},
+        {"event": "field", "name": "done", "value": True},
+        {"event": "field", "name": "owner", "value": None}
+    ]
+
+
+def test_escaped_quotes_do_not_end_a_string():
+    _, events = _feed(r'{"summary": "He said \"a, b]\" twice\\", "decisions": ["x"]}', 4)
+    assert events[0] == {"event": "field", "name": "summary", "value": 'He said "a, b]" twice\\'}
+    assert events[1] == {"event": "item", "name": "decisions", "index": 0, "value": "x"}
+
+
+def test_invalid_stream_raises_on_result():
+    parser, _ = _feed('{"title": "Cut off', 3)
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+def test_normalize_fills_defaults_and_fixes_types():
+    minutes = normalize_minutes({"title": "", "attendees": "Ana", "extra": 1})
+    assert minutes["title"] == "Meeting Minutes"
+    assert minutes["date"] == "Not specified"
+    assert minutes["attendees"] == []
+    assert minutes["action_items"] == []
+    assert minutes["extra"] == 1
+    with pytest.raises(ValueError):
+        normalize_minutes(["not", "an", "object"])
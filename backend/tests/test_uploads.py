@@ -0,0 +1,88 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile as StarletteUpload
+
+from uploads import RequestTooLarge, UploadLimitMiddleware, UploadTooLarge, spool_upload
+
+MAX_BYTES = 3 * 1024 * 1024
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_BYTES)
+
+    @app.exception_handler(RequestTooLarge)
+    async def too_large(request: Request, e: RequestTooLarge) -> JSONResponse:
+        return JSONResponse({"success": False, "message": e.detail}, status_code=413)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        try:
+            spooled = await spool_upload(file, 2 * 1024 * 1024)
+        except UploadTooLarge:
+            return {"success": False}
+        with spooled:
+            # A child process must be able to open the path, as ffmpeg does
+            read = subprocess.run(
+                [sys.executable, "-c", "import sys; print(len(open(sys.argv[1], 'rb').read()))", spooled.path],
+                capture_output=True, text=True, check=True
+            )
+            with open(spooled.path, "rb") as f:
+                content = f.read()
+            return {"success": True, "size": spooled.size, "child_size": int(read.stdout), "head": content[:4].decode()}
+
+    return TestClient(app)
+
+
+def test_small_upload_is_copied():
+    response = _client().post("/upload", files={"file": ("a.txt", b"abcd" * 10)})
+    assert response.json() == {"success": True, "size": 40, "child_size": 40, "head": "abcd"}
+
+
+def test_large_upload_is_copied_in_chunks():
+    data = b"wxyz" * (400 * 1024)
+    response = _client().post("/upload", files={"file": ("a.mp3", data)})
+    assert response.json() == {"success": True, "size": len(data), "child_size": len(data), "head": "wxyz"}
+
+
+def test_upload_over_its_own_limit():
+    response = _client().post("/upload", files={"file": ("a.mp3", b"x" * (2 * 1024 * 1024 + 1))})
+    assert response.json() == {"success": False}
+
+
+def test_body_over_the_limit_is_refused_on_content_length():
+    response = _client().post("/upload", files={"file": ("a.mp3", b"x" * (MAX_BYTES + 1))})
+    assert response.status_code == 413
+    assert response.json()["success"] is False
+
+
+def test_streamed_body_over_the_limit_is_refused():
+    def body():
+        for _ in range(4):
+            yield b"x" * (1024 * 1024)
+
+    response = _client().post(
+        "/upload", content=body(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+    assert response.json()["success"] is False
+
+
+def test_spooled_file_is_removed_on_close():
+    source = tempfile.SpooledTemporaryFile(max_size=10)
+    source.write(b"x" * 100)
+    source.seek(0)
+    upload = StarletteUpload(source, size=100, filename="a.wav")
+    spooled = asyncio.run(spool_upload(upload))
+    path = spooled.path
+    assert os.path.getsize(path) == 100
+    spooled.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,111 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import usage_stats
+from fake_mongo import AsyncFakeCollection, FakeCollection
+from usage_stats import UsageAggregator
+
+RESULT = {"transcript_length": 100, "audio_duration": 30}
+
+
+class BulkCollection(AsyncFakeCollection):
+    """Applies bulk_write batches and counts them; fail_next makes the next batch raise."""
+
+    def __init__(self, name, documents=()):
+        super().__init__(documents)
+        self.name = name
+        self.batches = 0
+        self.fail_next = None
+
+    async def bulk_write(self, operations, ordered=True):
+        self.batches += 1
+        error, self.fail_next = self.fail_next, None
+        failed = set()
+        if isinstance(error, BulkWriteError):
+            failed = {entry["index"] for entry in error.details["writeErrors"]}
+        elif error is not None:
+            raise error
+        for index, (query, update, upsert) in enumerate(operations):
+            if index not in failed:
+                FakeCollection.update_one(self, query, update, upsert)
+        if error is not None:
+            raise error
+
+
+@pytest.fixture
+def aggregator(monkeypatch):
+    # Plain tuples instead of pymongo's UpdateOne, so the fake can apply them
+    monkeypatch.setattr(usage_stats, "UpdateOne", lambda query, update, upsert=False: (query, update, upsert))
+    aggregator = UsageAggregator()
+    aggregator._users_collection = BulkCollection("users", [
+        {"username": "ana", "stats": {"characters_processed": 5}},
+        {"username": "bo"}
+    ])
+    aggregator._usage_collection = BulkCollection("usage")
+    return aggregator
+
+
+def _stats(aggregator, username):
+    return next(user.get("stats", {}) for user in aggregator.users.documents if user["username"] == username)
+
+
+def test_records_are_coalesced_into_one_write_per_collection(aggregator):
+    for _ in range(3):
+        aggregator.record("ana", "OpenAI", RESULT)
+    aggregator.record("bo", "Local", RESULT)
+    assert aggregator.pending("ana") == Counter(characters_processed=300, audio_seconds_processed=90, transcripts_generated=3)
+
+    asyncio.run(aggregator.flush())
+    assert aggregator.users.batches == 1 and aggregator.usage.batches == 1
+    assert _stats(aggregator, "ana") == {"characters_processed": 305, "audio_seconds_processed": 90, "transcripts_generated": 3}
+    assert _stats(aggregator, "bo")["transcripts_generated"] == 1
+    buckets = {(entry["username"], entry["provider"]): entry["transcripts_generated"] for entry in aggregator.usage.documents}
+    assert buckets == {("ana", "OpenAI"): 3, ("bo", "Local"): 1}
+    assert aggregator.pending("ana") == Counter()
+
+
+def test_failed_flush_is_retried_without_double_counting(aggregator):
+    aggregator.record("ana", "OpenAI", RESULT)
+    aggregator.users.fail_next = ConnectionError("down")
+    asyncio.run(aggregator.flush())
+    assert aggregator.pending("ana")["transcripts_generated"] == 1
+    assert aggregator.stats()["failed_flushes"] == 1
+
+    asyncio.run(aggregator.flush())
+    asyncio.run(aggregator.flush())
+    assert _stats(aggregator, "ana")["transcripts_generated"] == 1
+    assert len(aggregator.usage.documents) == 1
+    assert aggregator.usage.documents[0]["transcripts_generated"] == 1
+
+
+def test_only_the_failed_updates_of_a_batch_are_kept(aggregator):
+    aggregator.record("ana", "OpenAI", RESULT)
+    aggregator.record("bo", "OpenAI", RESULT)
+    aggregator.users.fail_next = BulkWriteError({"writeErrors": [{"index": 1}]})
+    asyncio.run(aggregator.flush())
+    assert aggregator.pending("ana") == Counter()
+    assert aggregator.pending("bo")["transcripts_generated"] == 1
+    assert aggregator.stats()["written"] == 3
+
+
+def test_report_includes_unwritten_usage(aggregator):
+    aggregator.record("ana", "OpenAI", RESULT)
+    asyncio.run(aggregator.flush())
+    aggregator.record("ana", "OpenAI", RESULT)
+    aggregator.record("bo", "OpenAI", RESULT)
+
+    row, = asyncio.run(aggregator.report("ana"))
+    assert row["provider"] == "OpenAI"
+    assert row["transcripts_generated"] == 2
+    assert row["characters_processed"] == 200
+
+
+def test_many_pending_users_wake_the_flusher(aggregator, monkeypatch):
+    monkeypatch.setattr(usage_stats, "USAGE_FLUSH_MAX_PENDING", 2)
+    aggregator.record("ana", "OpenAI", RESULT)
+    assert not aggregator._wake.is_set()
+    aggregator.record("bo", "OpenAI", RESULT)
+    assert aggregator._wake.is_set()
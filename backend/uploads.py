@@ -0,0 +1,144 @@
+"""
+Streaming ingest for uploaded files.
+
+Request bodies over REQUEST_MAX_BYTES are refused by UploadLimitMiddleware, on
+their Content-Length or while they stream in, before Starlette's multipart
+parser has spooled them. spool_upload then copies each file to a path of its
+own in UPLOAD_CHUNK_BYTES pieces, so memory use per upload stays constant
+whatever its size. Everything after that (duration probe, provider upload, job
+storage) reads from that file.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Optional
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from concurrency import run_blocking
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(500 * 1024 * 1024)))
+# Text transcripts are decoded in memory, so they get a much smaller cap
+TEXT_UPLOAD_MAX_BYTES = int(os.getenv("TEXT_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Whole request body, all files of a batch together; the extra MB covers form fields and multipart framing
+REQUEST_MAX_BYTES = int(os.getenv("REQUEST_MAX_BYTES", str(UPLOAD_MAX_BYTES + 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeds UPLOAD_MAX_BYTES."""
+
+
+class RequestTooLarge(HTTPException):
+    """The request body went over REQUEST_MAX_BYTES while it was being read."""
+
+    def __init__(self) -> None:
+        super().__init__(status_code=413, detail=request_too_large_message())
+
+
+class SpooledUpload:
+    """An upload stored in a private temporary directory; removed by close() or on leaving a with block."""
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.work_dir = tempfile.mkdtemp(prefix="upload-")
+        self.path = os.path.join(self.work_dir, "source" + os.path.splitext(filename)[1].lower())
+        self.size = 0
+
+    def read_bytes(self) -> bytes:
+        """The whole upload; only for inputs known to be small, like text files."""
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+async def spool_upload(upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """
+    The upload as a file on disk, copied chunk by chunk.
+
+    Raises:
+        UploadTooLarge: the upload is over max_bytes (nothing is left on disk)
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge()
+
+    spooled = SpooledUpload(upload.filename or "upload")
+    try:
+        with open(spooled.path, "wb") as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                spooled.size += len(chunk)
+                if spooled.size > max_bytes:
+                    raise UploadTooLarge()
+                await run_blocking(out.write, chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    finally:
+        await upload.close()
+    return spooled
+
+
+def spool_bytes(data: bytes, filename: str) -> SpooledUpload:
+    """Write bytes that are already in memory to a SpooledUpload, for callers of the bytes-based APIs."""
+    spooled = SpooledUpload(filename)
+    with open(spooled.path, "wb") as out:
+        out.write(data)
+    spooled.size = len(data)
+    return spooled
+
+
+def upload_limit(kind: Optional[str]) -> int:
+    """Size cap for an input kind as returned by ai.detect_input_kind."""
+    return TEXT_UPLOAD_MAX_BYTES if kind == "txt" else UPLOAD_MAX_BYTES
+
+
+def too_large_message(kind: Optional[str]) -> str:
+    return f"File is too large. The maximum size is {max(upload_limit(kind) // (1024 * 1024), 1)} MB."
+
+
+def request_too_large_message() -> str:
+    return f"Upload is too large. The maximum total size is {max(REQUEST_MAX_BYTES // (1024 * 1024), 1)} MB."
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware refusing request bodies over max_bytes with 413: up front
+    when Content-Length says so, else as soon as the streamed body goes over
+    (RequestTooLarge, raised to the endpoint's body parsing).
+    """
+
+    def __init__(self, app, max_bytes: int = REQUEST_MAX_BYTES) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            response = JSONResponse({"success": False, "message": request_too_large_message()}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise RequestTooLarge()
+            return message
+
+        await self.app(scope, limited_receive, send)
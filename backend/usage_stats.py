@@ -0,0 +1,178 @@
+"""
+Coalesced usage counters.
+
+Successful runs add to the user's stats (characters, audio seconds, transcripts)
+in memory instead of each issuing an $inc on the user document. The increments
+are written with one unordered bulk_write per collection every
+USAGE_FLUSH_SECONDS, or sooner once USAGE_FLUSH_MAX_PENDING users are waiting,
+and on shutdown. Alongside the user totals, the "usage" collection keeps one
+document per user, UTC day and provider, so usage reports read a few small
+bucket documents instead of scanning users.
+
+Each process (API, worker.py) has its own aggregator. A crash loses at most
+the last interval's increments.
+"""
+
+import asyncio
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import Database
+
+USAGE_FLUSH_SECONDS = float(os.getenv("USAGE_FLUSH_SECONDS", "5"))
+USAGE_FLUSH_MAX_PENDING = int(os.getenv("USAGE_FLUSH_MAX_PENDING", "500"))
+USAGE_REPORT_MAX_DAYS = 366
+
+STAT_FIELDS = ("characters_processed", "audio_seconds_processed", "transcripts_generated")
+
+
+def _increments(result: dict) -> Counter:
+    return Counter({
+        "characters_processed": result.get("transcript_length", 0),
+        "audio_seconds_processed": result.get("audio_duration", 0),  # in seconds
+        "transcripts_generated": 1
+    })
+
+
+class UsageAggregator:
+    """Collects per-user and per-day usage increments and writes them in bulk."""
+
+    def __init__(self) -> None:
+        self._users_collection = None
+        self._usage_collection = None
+        # username -> increments, and (username, day, provider) -> increments, not yet written
+        self._users: dict[str, Counter] = {}
+        self._buckets: dict[tuple[str, str, str], Counter] = {}
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.flushes = 0
+        self.written = 0
+        self.failed_flushes = 0
+
+    @property
+    def users(self):
+        if self._users_collection is None:
+            self._users_collection = Database("users").get_async_collection()
+        return self._users_collection
+
+    @property
+    def usage(self):
+        if self._usage_collection is None:
+            self._usage_collection = Database("usage").get_async_collection()
+        return self._usage_collection
+
+    async def ensure_indexes(self) -> None:
+        await self.usage.create_index([("username", 1), ("day", 1), ("provider", 1)], unique=True)
+        await self.usage.create_index([("day", 1), ("provider", 1)])
+
+    def record(self, username: str, provider: str, result: dict) -> None:
+        """Count a successful AI result (the dict returned by AI.ahandle_*) for the user."""
+        increments = _increments(result)
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        self._users.setdefault(username, Counter()).update(increments)
+        self._buckets.setdefault((username, day, provider), Counter()).update(increments)
+        if len(self._users) >= USAGE_FLUSH_MAX_PENDING:
+            self._wake.set()
+
+    def pending(self, username: str) -> Counter:
+        """Increments for the user that this process hasn't written yet. Call from the event loop."""
+        return Counter(self._users.get(username, {}))
+
+    async def _write(self, collection, keys: list, operations: list[UpdateOne]) -> list:
+        """bulk_write the operations; returns the keys whose update didn't apply."""
+        if not operations:
+            return []
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            logging.warning(f"Usage flush to {collection.name}: {len(failed)} of {len(operations)} updates failed")
+            self.written += len(operations) - len(failed)
+            return [keys[index] for index in sorted(failed)]
+        except Exception as e:
+            logging.warning(f"Usage flush to {collection.name} failed, will retry: {e}")
+            return keys
+        self.written += len(operations)
+        return []
+
+    async def flush(self) -> None:
+        """Write everything recorded so far. Updates that fail are kept for the next flush."""
+        async with self._flush_lock:
+            users, self._users = self._users, {}
+            buckets, self._buckets = self._buckets, {}
+            if not users and not buckets:
+                return
+            now = datetime.now(timezone.utc)
+
+            user_keys = list(users)
+            failed_users = await self._write(self.users, user_keys, [
+                UpdateOne(
+                    {"username": username},
+                    {"$inc": {f"stats.{field}": value for field, value in users[username].items()}}
+                )
+                for username in user_keys
+            ])
+            bucket_keys = list(buckets)
+            failed_buckets = await self._write(self.usage, bucket_keys, [
+                UpdateOne(
+                    {"username": username, "day": day, "provider": provider},
+                    {"$inc": dict(buckets[(username, day, provider)]), "$set": {"updated_at": now}},
+                    upsert=True
+                )
+                for username, day, provider in bucket_keys
+            ])
+
+            for username in failed_users:
+                self._users.setdefault(username, Counter()).update(users[username])
+            for key in failed_buckets:
+                self._buckets.setdefault(key, Counter()).update(buckets[key])
+            self.flushes += 1
+            if failed_users or failed_buckets:
+                self.failed_flushes += 1
+
+    async def run_forever(self) -> None:
+        """Flush every USAGE_FLUSH_SECONDS, or as soon as record() finds too much pending."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=USAGE_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Usage flush crashed:")
+
+    async def report(self, username: str, days: int = 30) -> list[dict]:
+        """The user's usage per UTC day and provider over the last `days` days, oldest first."""
+        days = max(1, min(days, USAGE_REPORT_MAX_DAYS))
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        cursor = self.usage.find(
+            {"username": username, "day": {"$gte": since}},
+            {"_id": 0, "day": 1, "provider": 1, **{field: 1 for field in STAT_FIELDS}}
+        ).sort([("day", 1), ("provider", 1)])
+        rows = await cursor.to_list(None)
+        # Include what this process hasn't written yet so a report is never behind the request that caused it
+        for (pending_user, day, provider), increments in self._buckets.items():
+            if pending_user != username or day < since:
+                continue
+            row = next((row for row in rows if row["day"] == day and row["provider"] == provider), None)
+            if row is None:
+                row = {"day": day, "provider": provider}
+                rows.append(row)
+            for field, value in increments.items():
+                row[field] = row.get(field, 0) + value
+        rows.sort(key=lambda row: (row["day"], row["provider"]))
+        return rows
+
+    def stats(self) -> dict:
+        return {
+            "pending_users": len(self._users),
+            "pending_buckets": len(self._buckets),
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed_flushes": self.failed_flushes
+        }
@@ -0,0 +1,40 @@
+"""
+Standalone job worker process.
+
+Run from the backend directory alongside (or instead of) the in-process
+workers started by the API:
+
+    python worker.py --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+from ai import close_providers
+from encryption import Encryption
+from jobs import JobQueue, JobWorker, JOB_WORKERS
+from usage_stats import UsageAggregator
+
+
+async def main(concurrency: int) -> None:
+    queue = JobQueue()
+    await queue.ensure_indexes()
+    encryption = Encryption()
+    usage = UsageAggregator()
+    workers = [JobWorker(queue, encryption, usage) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(usage.run_forever(), *(worker.run_forever() for worker in workers))
+    finally:
+        # Ctrl+C cancels the workers; write the usage they counted since the last flush
+        await usage.flush()
+        await close_providers()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process queued transcript jobs.")
+    parser.add_argument("--concurrency", type=int, default=max(JOB_WORKERS, 1),
+                        help="Number of jobs processed concurrently by this process")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.concurrency))
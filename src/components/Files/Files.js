@@ -1,7 +1,8 @@
 import React, { useState, useEffect } from 'react';
+import { useNavigate } from 'react-router-dom';
 import NavBar from '../NavBar/NavBar';
 import Footer from '../Footer/Footer';
-import { getUserFiles, getFile } from '../../useAPI';
+import { getUserFiles, getFile, searchMinutes } from '../../useAPI';
 import './Files.css';
 
 function Files() {
@@ -11,19 +12,34 @@ function Files() {
   const [selectedFile, setSelectedFile] = useState(null);
   const [fileData, setFileData] = useState(null);
   const [loadingFile, setLoadingFile] = useState(false);
+  // Paging and server-side filters
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [templateFilter, setTemplateFilter] = useState('');
+  const [titleFilter, setTitleFilter] = useState('');
+  // Full-text search over the minutes themselves
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
+  const [searchNextOffset, setSearchNextOffset] = useState(null);
+  const [searching, setSearching] = useState(false);
+  const navigate = useNavigate();
 
   useEffect(() => {
-    loadFiles();
-  }, []);
+    // Wait for typing to pause before asking the server again
+    const timer = setTimeout(() => loadFiles(), 300);
+    return () => clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [templateFilter, titleFilter]);
 
   const loadFiles = async () => {
     setLoading(true);
     setError('');
     
-    const result = await getUserFiles();
+    const result = await getUserFiles({ template: templateFilter, titlePrefix: titleFilter.trim() });
     
     if (result.success) {
       setFiles(result.files || []);
+      setNextCursor(result.nextCursor || null);
     } else {
       setError(result.error || 'Failed to load files');
     }
@@ -31,6 +47,45 @@ function Files() {
     setLoading(false);
   };
 
+  const loadMoreFiles = async () => {
+    setLoadingMore(true);
+
+    const result = await getUserFiles({ cursor: nextCursor, template: templateFilter, titlePrefix: titleFilter.trim() });
+
+    if (result.success) {
+      setFiles((previous) => [...previous, ...(result.files || [])]);
+      setNextCursor(result.nextCursor || null);
+    } else {
+      setError(result.error || 'Failed to load files');
+    }
+
+    setLoadingMore(false);
+  };
+
+  const handleSearch = async (e, offset = 0) => {
+    if (e) e.preventDefault();
+    if (!searchQuery.trim()) {
+      setSearchResults(null);
+      return;
+    }
+    setSearching(true);
+
+    const result = await searchMinutes({ query: searchQuery.trim(), offset });
+
+    if (result.success) {
+      setSearchResults((previous) => offset ? [...(previous || []), ...result.results] : result.results);
+      setSearchNextOffset(result.nextOffset ?? null);
+    } else {
+      setError(result.error || 'Search failed');
+    }
+
+    setSearching(false);
+  };
+
+  const handleOpenMinutes = (result) => {
+    navigate('/', { state: { minutesId: result.id } });
+  };
+
   const handleOpenFile = async (file) => {
     setLoadingFile(true);
     setSelectedFile(file);
@@ -49,6 +104,7 @@ function Files() {
   };
 
   const handleClosePreview = () => {
+    if (fileData) URL.revokeObjectURL(fileData);
     setSelectedFile(null);
     setFileData(null);
   };
@@ -56,20 +112,10 @@ function Files() {
   const handleDownload = () => {
     if (!fileData || !selectedFile) return;
     
-    const byteCharacters = atob(fileData);
-    const byteNumbers = new Array(byteCharacters.length);
-    for (let i = 0; i < byteCharacters.length; i++) {
-      byteNumbers[i] = byteCharacters.charCodeAt(i);
-    }
-    const byteArray = new Uint8Array(byteNumbers);
-    const blob = new Blob([byteArray], { type: 'application/pdf' });
-    
-    const url = URL.createObjectURL(blob);
     const a = document.createElement('a');
-    a.href = url;
+    a.href = fileData;
     a.download = selectedFile.filename;
     a.click();
-    URL.revokeObjectURL(url);
   };
 
   const formatDate = (dateString) => {
@@ -102,6 +148,57 @@ function Files() {
           <p className="files-subtitle">View and download your generated meeting minutes</p>
         </div>
 
+        <form className="minutes-search" onSubmit={handleSearch}>
+          <input
+            type="text"
+            className="files-filter-input"
+            placeholder="Search inside your meetings..."
+            value={searchQuery}
+            onChange={(e) => setSearchQuery(e.target.value)}
+          />
+          <button type="submit" className="minutes-search-btn" disabled={searching}>
+            {searching ? 'Searching...' : '🔍 Search'}
+          </button>
+        </form>
+
+        {searchResults && (
+          <div className="minutes-search-results">
+            {searchResults.length === 0 && <p className="minutes-search-empty">No meetings match "{searchQuery}"</p>}
+            {searchResults.map((result) => (
+              <div key={result.id} className="minutes-search-result" onClick={() => handleOpenMinutes(result)}>
+                <h3 className="file-title">{result.title || 'Meeting Minutes'}</h3>
+                <span className="file-date">{formatDate(result.created_at)}</span>
+                {result.summary && <p className="minutes-search-summary">{result.summary}</p>}
+              </div>
+            ))}
+            {searchNextOffset !== null && (
+              <button className="files-load-more" onClick={() => handleSearch(null, searchNextOffset)} disabled={searching}>
+                {searching ? 'Loading...' : 'More results'}
+              </button>
+            )}
+          </div>
+        )}
+
+        <div className="files-filters">
+          <input
+            type="text"
+            className="files-filter-input"
+            placeholder="Search by title..."
+            value={titleFilter}
+            onChange={(e) => setTitleFilter(e.target.value)}
+          />
+          <select
+            className="files-filter-select"
+            value={templateFilter}
+            onChange={(e) => setTemplateFilter(e.target.value)}
+          >
+            <option value="">All templates</option>
+            <option value="professional">Professional</option>
+            <option value="minimal">Minimal</option>
+            <option value="modern">Modern</option>
+          </select>
+        </div>
+
         {loading && (
           <div className="files-loading">
             <div className="loading-spinner"></div>
@@ -120,15 +217,21 @@ function Files() {
         {!loading && !error && files.length === 0 && (
           <div className="files-empty">
             <div className="empty-icon">📄</div>
-            <h3>No files yet</h3>
-            <p>When you create PDF meeting minutes, they'll appear here.</p>
+            {templateFilter || titleFilter.trim() ? (
+              <h3>No files match these filters</h3>
+            ) : (
+              <>
+                <h3>No files yet</h3>
+                <p>When you create PDF meeting minutes, they'll appear here.</p>
+              </>
+            )}
           </div>
         )}
 
         {!loading && files.length > 0 && (
           <div className="files-grid">
             {files.map((file, index) => (
-              <div key={index} className="file-card">
+              <div key={`${file.filename}-${file.created_at}-${index}`} className="file-card">
                 <div className="file-icon">📄</div>
                 <div className="file-info">
                   <h3 className="file-title">{file.title || 'Meeting Minutes'}</h3>
@@ -151,6 +254,12 @@ function Files() {
           </div>
         )}
 
+        {!loading && nextCursor && (
+          <button className="files-load-more" onClick={loadMoreFiles} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        )}
+
         {/* File Preview Modal */}
         {selectedFile && (
           <div className="modal-overlay">
@@ -168,7 +277,7 @@ function Files() {
                 ) : fileData ? (
                   <div className="pdf-preview-wrapper">
                     <iframe 
-                      src={`data:application/pdf;base64,${fileData}`}
+                      src={fileData}
                       className="pdf-preview-iframe"
                       title="PDF Preview"
                     />
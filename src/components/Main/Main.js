@@ -1,9 +1,9 @@
 import React, { useState, useEffect } from 'react';
-import { useNavigate } from 'react-router-dom';
+import { useNavigate, useLocation } from 'react-router-dom';
 import NavBar from '../NavBar/NavBar';
 import Footer from '../Footer/Footer';
 import Upload from '../Upload/Upload';
-import { getUser, getPdfTemplates, createPdf, getUserFiles } from '../../useAPI';
+import { getUser, getPdfTemplates, createPdf, getUserFiles, getMinutes } from '../../useAPI';
 import './Main.css';
 
 function Main() {
@@ -24,13 +24,15 @@ function Main() {
   const [showTemplateModal, setShowTemplateModal] = useState(false);
   const [showPdfModal, setShowPdfModal] = useState(false);
   const navigate = useNavigate();
+  const location = useLocation();
 
   useEffect(() => {
     const initialize = async () => {
       const userResult = await getUser();
       if (userResult.success) {
         const apiKey = userResult.ai_config?.api_key;
-        setHasApiKey(apiKey && apiKey.trim() !== '');
+        // The Local provider runs on the server and needs no key
+        setHasApiKey(userResult.ai_config?.ai_provider === 'Local' || (apiKey && apiKey.trim() !== ''));
         setUserStats(userResult.stats);
       }
       
@@ -39,14 +41,23 @@ function Main() {
         setTemplates(templateResult.templates);
       }
 
-      const filesResult = await getUserFiles();
+      const filesResult = await getUserFiles({ limit: 1, includeTotal: true });
       if (filesResult.success) {
-        setFilesCount(filesResult.files?.length || 0);
+        setFilesCount(filesResult.total || 0);
+      }
+
+      // Opened from a search result on the Files page
+      if (location.state?.minutesId) {
+        const minutesResult = await getMinutes(location.state.minutesId);
+        if (minutesResult.success) {
+          handleMinutesGenerated(minutesResult.minutes);
+        }
       }
       
       setLoading(false);
     };
     initialize();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
   const handleMinutesGenerated = (minutes) => {
@@ -7,6 +7,7 @@ import { getUser, updateUser } from '../../useAPI';
 
 const AI_PROVIDERS = [
   { value: 'OpenAI', label: 'OpenAI', enabled: true },
+  { value: 'Local', label: 'Local (offline, no API key)', enabled: true, needsKey: false },
   { value: 'Anthropic', label: 'Anthropic', enabled: false },
   { value: 'Google', label: 'Google Gemini', enabled: false },
   { value: 'Mistral', label: 'Mistral', enabled: false },
@@ -115,30 +116,36 @@ function Profile() {
                 </select>
               </div>
 
-              <div className="form-group">
-                <label htmlFor="apiKey">{aiProvider} API Key</label>
-                <div className="api-key-input">
-                  <input
-                    type={showApiKey ? 'text' : 'password'}
-                    id="apiKey"
-                    value={apiKey}
-                    onChange={(e) => setApiKey(e.target.value)}
-                    placeholder={aiProvider === 'OpenAI' ? 'sk-proj-...' : 'Enter your API key'}
-                  />
-                  <button
-                    type="button"
-                    className="toggle-visibility"
-                    onClick={() => setShowApiKey(!showApiKey)}
-                  >
-                    {showApiKey ? 'Hide' : 'Show'}
-                  </button>
-                </div>
+              {AI_PROVIDERS.find((provider) => provider.value === aiProvider)?.needsKey === false ? (
                 <p className="api-help">
-                  {aiProvider === 'OpenAI' && (
-                    <>Don't have an API key? <a href="https://platform.openai.com/api-keys" target="_blank" rel="noopener noreferrer">Get one from OpenAI →</a></>
-                  )}
+                  Transcripts and minutes are produced on the server itself; no API key is needed.
                 </p>
-              </div>
+              ) : (
+                <div className="form-group">
+                  <label htmlFor="apiKey">{aiProvider} API Key</label>
+                  <div className="api-key-input">
+                    <input
+                      type={showApiKey ? 'text' : 'password'}
+                      id="apiKey"
+                      value={apiKey}
+                      onChange={(e) => setApiKey(e.target.value)}
+                      placeholder={aiProvider === 'OpenAI' ? 'sk-proj-...' : 'Enter your API key'}
+                    />
+                    <button
+                      type="button"
+                      className="toggle-visibility"
+                      onClick={() => setShowApiKey(!showApiKey)}
+                    >
+                      {showApiKey ? 'Hide' : 'Show'}
+                    </button>
+                  </div>
+                  <p className="api-help">
+                    {aiProvider === 'OpenAI' && (
+                      <>Don't have an API key? <a href="https://platform.openai.com/api-keys" target="_blank" rel="noopener noreferrer">Get one from OpenAI →</a></>
+                    )}
+                  </p>
+                </div>
+              )}
             </div>
 
             <div className="profile-actions">
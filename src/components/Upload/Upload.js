@@ -1,6 +1,6 @@
 import React, { useState, useRef } from 'react';
 import './Upload.css';
-import { processTranscript } from '../../useAPI';
+import { processTranscriptStream } from '../../useAPI';
 
 const ACCEPTED_TYPES = {
   audio: ['audio/mpeg', 'audio/wav', 'audio/ogg', 'audio/mp3', 'audio/m4a', 'audio/webm'],
@@ -14,19 +14,22 @@ const Upload = ({ disabled = false, onMinutesGenerated }) => {
   const [inputMode, setInputMode] = useState('file'); // 'file' or 'text'
   const [transcriptText, setTranscriptText] = useState('');
   const [processing, setProcessing] = useState(false);
+  // Minutes received so far while the server is still writing them
+  const [preview, setPreview] = useState(null);
   const fileInputRef = useRef(null);
 
   const handleGenerate = async () => {
     setProcessing(true);
     setError('');
+    setPreview(null);
     
     let result;
     
     if (inputMode === 'file' && files.length > 0) {
       // Process first file (for now, single file)
-      result = await processTranscript({ file: files[0] });
+      result = await processTranscriptStream({ file: files[0] }, setPreview);
     } else if (inputMode === 'text' && transcriptText.trim()) {
-      result = await processTranscript({ text: transcriptText });
+      result = await processTranscriptStream({ text: transcriptText }, setPreview);
     } else {
       setError('No content to process');
       setProcessing(false);
@@ -44,6 +47,7 @@ const Upload = ({ disabled = false, onMinutesGenerated }) => {
       setError(result.error || 'Failed to generate minutes');
     }
     
+    setPreview(null);
     setProcessing(false);
   };
 
@@ -222,6 +226,21 @@ const Upload = ({ disabled = false, onMinutesGenerated }) => {
           )}
         </>
       )}
+
+      {processing && preview && (
+        <div className="minutes-preview">
+          <h3>{preview.title || 'Writing minutes...'}</h3>
+          {preview.summary && <p>{preview.summary}</p>}
+          {preview.discussion_points?.length > 0 && (
+            <ul>
+              {preview.discussion_points.map((point, i) => point && <li key={i}>{point.topic}</li>)}
+            </ul>
+          )}
+          {preview.action_items?.length > 0 && (
+            <p className="minutes-preview-count">{preview.action_items.length} action item(s) so far</p>
+          )}
+        </div>
+      )}
     </div>
   );
 };
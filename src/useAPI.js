@@ -202,6 +202,80 @@ export const processTranscript = async ({ text, file }) => {
   }
 };
 
+// Like processTranscript, but reads the server-sent events of /process_transcript/stream
+// and calls onPartial with the minutes assembled so far each time a part arrives.
+export const processTranscriptStream = async ({ text, file }, onPartial) => {
+  const token = getStoredToken();
+  if (!token) return { success: false, error: 'Not logged in' };
+
+  try {
+    const formData = new FormData();
+    formData.append('token', token);
+
+    if (file) {
+      formData.append('file', file);
+    } else if (text) {
+      formData.append('transcript_text', text);
+    } else {
+      return { success: false, error: 'No transcript or file provided' };
+    }
+
+    const response = await fetch(`${API_BASE_URL}/process_transcript/stream`, {
+      method: 'POST',
+      body: formData,
+    });
+
+    // Errors found before processing starts come back as plain JSON
+    if (!(response.headers.get('content-type') || '').startsWith('text/event-stream')) {
+      const result = await response.json();
+      return { success: false, error: result.message || 'Processing failed' };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const partial = {};
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+
+        if (event === 'field') {
+          partial[payload.name] = payload.value;
+          if (onPartial) onPartial({ ...partial });
+        } else if (event === 'item') {
+          partial[payload.name] = [...(partial[payload.name] || [])];
+          partial[payload.name][payload.index] = payload.value;
+          if (onPartial) onPartial({ ...partial });
+        } else if (event === 'minutes') {
+          return { success: true, minutes: payload.minutes, transcriptLength: payload.transcript_length };
+        } else if (event === 'error') {
+          return { success: false, error: payload.message || 'Processing failed' };
+        }
+      }
+    }
+
+    return { success: false, error: 'Processing was interrupted. Please try again.' };
+  } catch (error) {
+    console.error('Process transcript stream error:', error);
+    return { success: false, error: 'Network error. Please try again.' };
+  }
+};
+
 export const getPdfTemplates = async () => {
   try {
     const response = await fetch(`${API_BASE_URL}/pdf_templates`, {
@@ -255,12 +329,21 @@ export const createPdf = async ({ template, minutes, filename }) => {
   }
 };
 
-export const getUserFiles = async () => {
+// One page of the user's files, newest first. Pass the returned nextCursor back as `cursor`
+// for the following page; `template` and `titlePrefix` filter on the server.
+export const getUserFiles = async ({ cursor, limit, template, titlePrefix, includeTotal } = {}) => {
   const token = getStoredToken();
   if (!token) return { success: false, error: 'Not logged in' };
 
   try {
-    const response = await fetch(`${API_BASE_URL}/get_user_files?token=${encodeURIComponent(token)}`, {
+    const params = new URLSearchParams({ token });
+    if (cursor) params.append('cursor', cursor);
+    if (limit) params.append('limit', limit);
+    if (template) params.append('template', template);
+    if (titlePrefix) params.append('title_prefix', titlePrefix);
+    if (includeTotal) params.append('include_total', 'true');
+
+    const response = await fetch(`${API_BASE_URL}/get_user_files?${params}`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -270,7 +353,7 @@ export const getUserFiles = async () => {
     const data = await response.json();
 
     if (data.success) {
-      return { success: true, files: data.files };
+      return { success: true, files: data.files, nextCursor: data.next_cursor, total: data.total };
     } else {
       return { success: false, error: data.message || 'Failed to get files' };
     }
@@ -285,7 +368,34 @@ export const getFile = async (filename) => {
   if (!token) return { success: false, error: 'Not logged in' };
 
   try {
-    const response = await fetch(`${API_BASE_URL}/get_file?token=${encodeURIComponent(token)}&filename=${encodeURIComponent(filename)}`, {
+    // Raw PDF bytes; repeat downloads are revalidated by the browser cache via ETag
+    const response = await fetch(`${API_BASE_URL}/files/${encodeURIComponent(filename)}/download?token=${encodeURIComponent(token)}&inline=true`);
+
+    if (response.ok) {
+      const blob = await response.blob();
+      return { success: true, data: URL.createObjectURL(blob), filename };
+    } else {
+      const data = await response.json().catch(() => ({}));
+      return { success: false, error: data.message || 'Failed to get file' };
+    }
+  } catch (error) {
+    console.error('Get file error:', error);
+    return { success: false, error: 'Network error. Please try again.' };
+  }
+};
+
+// Ranked full-text search over the user's generated minutes and transcripts.
+// Pass the returned nextOffset back as `offset` for the following page.
+export const searchMinutes = async ({ query, offset, limit } = {}) => {
+  const token = getStoredToken();
+  if (!token) return { success: false, error: 'Not logged in' };
+
+  try {
+    const params = new URLSearchParams({ token, q: query });
+    if (offset) params.append('offset', offset);
+    if (limit) params.append('limit', limit);
+
+    const response = await fetch(`${API_BASE_URL}/search_minutes?${params}`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -295,12 +405,38 @@ export const getFile = async (filename) => {
     const data = await response.json();
 
     if (data.success) {
-      return { success: true, data: data.data, filename: data.filename };
+      return { success: true, results: data.results, nextOffset: data.next_offset };
     } else {
-      return { success: false, error: data.message || 'Failed to get file' };
+      return { success: false, error: data.message || 'Search failed' };
     }
   } catch (error) {
-    console.error('Get file error:', error);
+    console.error('Search minutes error:', error);
     return { success: false, error: 'Network error. Please try again.' };
   }
-};
\ No newline at end of file
+};
+
+export const getMinutes = async (minutesId) => {
+  const token = getStoredToken();
+  if (!token) return { success: false, error: 'Not logged in' };
+
+  try {
+    const params = new URLSearchParams({ token, minutes_id: minutesId });
+    const response = await fetch(`${API_BASE_URL}/get_minutes?${params}`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    const data = await response.json();
+
+    if (data.success) {
+      return { success: true, minutes: data.minutes, transcriptLength: data.transcript_length };
+    } else {
+      return { success: false, error: data.message || 'Failed to get minutes' };
+    }
+  } catch (error) {
+    console.error('Get minutes error:', error);
+    return { success: false, error: 'Network error. Please try again.' };
+  }
+};